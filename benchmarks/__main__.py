@@ -0,0 +1,115 @@
+"""Run the benchmark suites and compare against a stored baseline.
+
+python -m benchmarks                      # run everything, fail on regressions against the baseline
+python -m benchmarks --suite micro        # only the text processing micro benchmarks
+python -m benchmarks --suite startup      # only interpreter start up and CLI import time
+python -m benchmarks --update-baseline    # accept the current numbers as the new baseline
+"""
+
+# Standard Library
+import json
+import logging
+import platform
+import sys
+from pathlib import Path
+from typing import Any
+
+# Our Libraries
+from very_demure.utils import ISO8601_DATE_FORMAT, LOG_FORMAT, cli_handle_args
+
+from . import macro, micro, startup
+
+logger = logging.getLogger(__name__)
+
+BENCHMARKS_DIR = Path(__file__).parent
+BENCH_ARGS_CONFIG = {
+    "suite": {"default": "all", "choices": ["all", "micro", "macro", "startup"]},
+    "output": {"default": "bench_output.json", "help": "Where to write this run's results."},
+    "baseline": {"default": str(BENCHMARKS_DIR / "baseline.json"), "help": "Results to compare against."},
+    "tolerance": {"default": 0.5, "type": float, "help": "Allowed median slowdown as a fraction of the baseline."},
+    "min-delta": {"default": 0.001, "type": float, "help": "Slowdowns smaller than this many seconds are noise."},
+    "repeats": {"default": None, "type": int, "help": "Timed repeats per benchmark. Defaults per suite."},
+    "update-baseline": {"action": "store_true", "help": "Write the results to the baseline instead of comparing."},
+    "llm-latency": {"default": macro.DEFAULT_LLM_LATENCY, "type": float, "help": "Fake LLM latency in seconds."},
+    "polly-latency": {"default": macro.DEFAULT_POLLY_LATENCY, "type": float, "help": "Fake Polly latency."},
+}
+
+
+def run_suites(cli_args: dict[str, Any]) -> dict[str, Any]:
+    suite = cli_args["suite"]
+    repeats = {"repeats": cli_args["repeats"]} if cli_args["repeats"] else {}
+    results = []
+    if suite in ("all", "micro"):
+        results += micro.run(**repeats)
+    if suite in ("all", "startup"):
+        results += startup.run(**repeats)
+    if suite in ("all", "macro"):
+        results += macro.run(llm_latency=cli_args["llm_latency"], polly_latency=cli_args["polly_latency"], **repeats)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "llm_latency": cli_args["llm_latency"],
+            "polly_latency": cli_args["polly_latency"],
+        },
+        "benchmarks": {result.name: result.as_dict() for result in results},
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], tolerance: float, min_delta: float = 0.0) -> list[str]:
+    """Log a comparison table and return the names of benchmarks slower than the baseline allows.
+
+    A benchmark regresses when its median is more than `tolerance` slower than the baseline median
+    and also more than `min_delta` seconds slower, so microsecond scale jitter never fails a run.
+    """
+    regressions = []
+    baseline_benchmarks = baseline.get("benchmarks", {})
+    for name, result in current["benchmarks"].items():
+        median = result["median_seconds"]
+        if name not in baseline_benchmarks:
+            logger.info(f"{name:<45} {median:>10.4f}s  (no baseline)")
+            continue
+        baseline_median = baseline_benchmarks[name]["median_seconds"]
+        ratio = median / baseline_median if baseline_median else float("inf")
+        regressed = ratio > 1 + tolerance and median - baseline_median > min_delta
+        if regressed:
+            regressions.append(name)
+        status = "REGRESSION" if regressed else "ok"
+        logger.info(f"{name:<45} {median:>10.4f}s  baseline {baseline_median:>10.4f}s  x{ratio:5.2f}  {status}")
+    return regressions
+
+
+def main(args: list[str]) -> int:
+    cli_args = cli_handle_args(BENCH_ARGS_CONFIG, args)
+    current = run_suites(cli_args)
+
+    output = Path(cli_args["output"])
+    output.write_text(json.dumps(current, indent=2))
+    logger.info(f"Results written to {output}")
+
+    baseline_file = Path(cli_args["baseline"])
+    if cli_args["update_baseline"]:
+        baseline = json.loads(baseline_file.read_text()) if baseline_file.exists() else {"benchmarks": {}}
+        baseline["meta"] = current["meta"]
+        baseline["benchmarks"].update(current["benchmarks"])
+        baseline_file.write_text(json.dumps(baseline, indent=2) + "\n")
+        logger.info(f"Baseline updated at {baseline_file}")
+        return 0
+
+    if not baseline_file.exists():
+        logger.warning(f"No baseline at {baseline_file}, run with --update-baseline to create one.")
+        return 0
+
+    regressions = compare(current, json.loads(baseline_file.read_text()), cli_args["tolerance"], cli_args["min_delta"])
+    if regressions:
+        logger.error(f"{len(regressions)} benchmarks regressed beyond {cli_args['tolerance']:.0%}: {regressions}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, datefmt=ISO8601_DATE_FORMAT)
+    # Keep the pipeline's own per-request logging out of the results table
+    logging.getLogger("very_demure").setLevel(logging.WARNING)
+    sys.exit(main(sys.argv[1:]))
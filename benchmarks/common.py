@@ -0,0 +1,78 @@
+# Standard Library
+import statistics
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+SENTENCES = [
+    "Find a comfortable position, either sitting or lying down.",
+    "Close your eyes and take a few deep breaths, inhaling through your nose and exhaling through your mouth.",
+    "Notice the sensation of your breath as it moves in and out of your body.",
+    "Thank your inner self for showing up today & every day.",
+    "Allow any tension to soften and release with each exhale.",
+]
+PAUSES = ["[PAUSE 20s]", "[PAUSE 1m]", "[PAUSE 45s]"]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    repeats: int
+    min_seconds: float
+    median_seconds: float
+    mean_seconds: float
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "repeats": self.repeats,
+            "min_seconds": round(self.min_seconds, 6),
+            "median_seconds": round(self.median_seconds, 6),
+            "mean_seconds": round(self.mean_seconds, 6),
+        }
+
+
+def synthetic_script(size_bytes: int) -> str:
+    """A mindfulness style script of about `size_bytes` characters, with a pause marker every few sentences."""
+    parts = []
+    length = 0
+    index = 0
+    while length < size_bytes:
+        part = SENTENCES[index % len(SENTENCES)]
+        if index % 4 == 3:
+            part = f"\n\n{PAUSES[index % len(PAUSES)]}\n\n"
+        parts.append(part)
+        length += len(part) + 1
+        index += 1
+    return " ".join(parts)[:size_bytes]
+
+
+def human_size(size_bytes: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size_bytes < 1000 or unit == "MB":
+            return f"{size_bytes}{unit}"
+        size_bytes //= 1000
+    return f"{size_bytes}MB"  # pragma: no cover
+
+
+def measure(
+    name: str, function: Callable[[], Any], repeats: int = 5, setup: Callable[[], Any] | None = None
+) -> BenchmarkResult:
+    """Time `function` `repeats` times after one untimed warm up call. `setup` runs untimed before every call."""
+    if setup:
+        setup()
+    function()
+    timings = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return BenchmarkResult(
+        name=name,
+        repeats=repeats,
+        min_seconds=min(timings),
+        median_seconds=statistics.median(timings),
+        mean_seconds=statistics.fmean(timings),
+    )
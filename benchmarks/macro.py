@@ -0,0 +1,75 @@
+# Standard Library
+import itertools
+import json
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from unittest import mock
+
+# Our Libraries
+import very_demure.__main__ as cli
+from very_demure.ratelimit import reset_rate_limits
+
+from .common import BenchmarkResult, measure
+
+DEFAULT_LLM_LATENCY = 0.2
+DEFAULT_POLLY_LATENCY = 0.05
+BATCH_MANIFEST = [
+    {"provider": "fake", "matrix": {"flavours": ["sleepy", "morning"], "durations": [5, 10]}},
+    {"provider": "fake", "model": "gpt-4o", "matrix": {"voices": ["Amy", "Ruth", "Matthew"]}},
+]
+
+
+def run(
+    repeats: int = 3, llm_latency: float = DEFAULT_LLM_LATENCY, polly_latency: float = DEFAULT_POLLY_LATENCY
+) -> list[BenchmarkResult]:
+    """Time the real CLI entrypoints end to end against the built in fake providers with simulated latency."""
+    # The fakes have no quotas, pacing them to the real ones would only measure the rate limiter
+    reset_rate_limits({})
+    results = []
+    with tempfile.TemporaryDirectory(prefix="very-demure-bench-") as tmp:
+        workdir = Path(tmp)
+        manifest = workdir / "manifest.jsonl"
+        manifest.write_text("\n".join(json.dumps(entry) for entry in BATCH_MANIFEST))
+        fake_behaviour = workdir / "fake-behaviour.json"
+        fake_behaviour.write_text(
+            json.dumps(
+                {
+                    "llm": {"latency_seconds": llm_latency},
+                    "polly": {"latency_seconds": polly_latency, "seconds_per_1000_characters": polly_latency},
+                }
+            )
+        )
+        # The built in fakes need no patching, so these run exactly what `python -m very_demure` would
+        fake_args = ["--synthesis", "fake", "--fake-behaviour", str(fake_behaviour)]
+        run_ids = itertools.count()
+
+        def _fresh(name: str) -> Callable[[], list[str]]:
+            """Arguments for a run with its own empty output and cache directories."""
+
+            def _args() -> list[str]:
+                run_dir = workdir / f"{name}-{next(run_ids)}"
+                return ["--output-location", f"{run_dir}/", "--cache-dir", f"{run_dir}-cache/"]
+
+            return _args
+
+        def _shared(name: str) -> Callable[[], list[str]]:
+            """Arguments for runs that share caches, so every run after the first is warm."""
+            return lambda: ["--output-location", f"{workdir / name}/", "--cache-dir", f"{workdir / name}-cache/"]
+
+        scenarios = {
+            "macro.main.fake.cold": (["--provider", "fake", "--duration", "10", "--no-llm-cache"], _fresh("main")),
+            "macro.main.fake.warm": (["--provider", "fake", "--duration", "10"], _shared("warm")),
+            "macro.batch.threads": (["batch", str(manifest)], _fresh("batch-threads")),
+            "macro.batch.async": (["batch", str(manifest), "--async"], _fresh("batch-async")),
+        }
+        for name, (args, location_args) in scenarios.items():
+            results.append(measure(name, lambda a=args, la=location_args: _invoke(a + fake_args + la()), repeats))
+    reset_rate_limits()
+    return results
+
+
+def _invoke(args: list[str]) -> None:
+    """Run `python -m very_demure <args>` in process."""
+    with mock.patch("sys.argv", ["very_demure", *args]):
+        cli.main()
@@ -0,0 +1,33 @@
+# Standard Library
+from dataclasses import replace
+
+# Our Libraries
+from very_demure.polly import process_pause_markers, process_text_to_ssml
+from very_demure.prompt import generate_prompt
+from very_demure.schema import DEFAULT_SPEECH_CONFIG
+
+from .common import BenchmarkResult, human_size, measure, synthetic_script
+
+SCRIPT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def run(repeats: int = 5) -> list[BenchmarkResult]:
+    """Time the pure text processing steps over synthetic scripts from 1KB to 1MB."""
+    results = []
+    for size in SCRIPT_SIZES:
+        script = synthetic_script(size)
+        results.append(
+            measure(f"micro.process_text_to_ssml.{human_size(size)}", lambda s=script: process_text_to_ssml(s), repeats)
+        )
+        results.append(
+            measure(
+                f"micro.process_pause_markers.{human_size(size)}", lambda s=script: process_pause_markers(s), repeats
+            )
+        )
+
+    def _prompts() -> None:
+        for duration in range(1, 61):
+            generate_prompt(replace(DEFAULT_SPEECH_CONFIG, duration_minutes=str(duration)))
+
+    results.append(measure("micro.generate_prompt.x60", _prompts, repeats))
+    return results
@@ -0,0 +1,26 @@
+# Standard Library
+import subprocess
+import sys
+
+from .common import BenchmarkResult, measure
+
+# What a short lived container pays before doing any work
+STARTUP_IMPORTS = {
+    "startup.import_cli": "import very_demure.__main__",
+    "startup.import_cli_and_parse_args": (
+        "import very_demure.__main__ as cli; from very_demure.utils import CLI_ARGS_CONFIG, cli_handle_args; "
+        "cli_handle_args(CLI_ARGS_CONFIG, ['--duration', '10'])"
+    ),
+}
+
+
+def run(repeats: int = 5) -> list[BenchmarkResult]:
+    """Time fresh interpreters importing the CLI, like `python -X importtime` but end to end."""
+    results = [measure("startup.interpreter", lambda: _python("pass"), repeats)]
+    for name, code in STARTUP_IMPORTS.items():
+        results.append(measure(name, lambda c=code: _python(c), repeats))
+    return results
+
+
+def _python(code: str) -> None:
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -6,6 +6,54 @@ import aws_cdk.aws_cloudfront_origins as origins
 import aws_cdk.aws_s3 as s3
 import aws_cdk.aws_s3_deployment as s3deploy
 from constructs import Construct
+from very_demure.publish import (
+    ENTRY_POINT_CACHE_CONTROL,
+    ENTRY_POINT_PATTERNS,
+    IMMUTABLE_CACHE_CONTROL,
+)
+
+# Written by `make publish`, ie `python -m very_demure publish ./dist --publish-location ./publish`
+PUBLISH_SOURCE = "../publish"
+
+
+def publish_deployments(scope: Construct, bucket: s3.IBucket) -> None:
+    """Deploy the fingerprinted assets with year long caching, then the entry points that reference them.
+
+    Neither deployment prunes, so pages and players still holding an earlier manifest keep working. Only
+    changed assets are uploaded, as unchanged ones keep the same hashed key.
+    """
+    assets = s3deploy.BucketDeployment(
+        scope,
+        "DeployAssets",
+        sources=[s3deploy.Source.asset(PUBLISH_SOURCE, exclude=ENTRY_POINT_PATTERNS)],
+        destination_bucket=bucket,
+        cache_control=[s3deploy.CacheControl.from_string(IMMUTABLE_CACHE_CONTROL)],
+        prune=False,
+    )
+    entry_points = s3deploy.BucketDeployment(
+        scope,
+        "DeployEntryPoints",
+        sources=[s3deploy.Source.asset(PUBLISH_SOURCE, exclude=["*", *[f"!{name}" for name in ENTRY_POINT_PATTERNS]])],
+        destination_bucket=bucket,
+        cache_control=[s3deploy.CacheControl.from_string(ENTRY_POINT_CACHE_CONTROL)],
+        prune=False,
+    )
+    entry_points.node.add_dependency(assets)
+
+
+def hls_behaviors(origin: cloudfront.IOrigin) -> dict[str, cloudfront.BehaviorOptions]:
+    """Cache behaviours for the HLS renditions written by `--package`, allowing cross origin hls.js players.
+
+    Rendition directories are fingerprinted as a whole when published, so their playlists and segments
+    are cached for as long as their Cache-Control allows.
+    """
+    behavior = cloudfront.BehaviorOptions(
+        origin=origin,
+        viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+        cache_policy=cloudfront.CachePolicy.CACHING_OPTIMIZED,
+        response_headers_policy=cloudfront.ResponseHeadersPolicy.CORS_ALLOW_ALL_ORIGINS,
+    )
+    return {"*.m3u8": behavior, "*.hls/*": behavior}
 
 
 class VeryDemureFrontEndStack(cdk.Stack):
@@ -26,16 +74,16 @@ class VeryDemureFrontEndStack(cdk.Stack):
             block_public_access=s3.BlockPublicAccess.BLOCK_ACLS,  # Allow public access, block ACL modifications
         )
 
-        s3deploy.BucketDeployment(
-            self, "DeployFiles", sources=[s3deploy.Source.asset("../dist")], destination_bucket=my_bucket
-        )
+        publish_deployments(self, my_bucket)
+        website_origin = origins.S3StaticWebsiteOrigin(my_bucket)
         distribution = cloudfront.Distribution(
             self,
             "myDist",
             default_behavior=cloudfront.BehaviorOptions(
-                origin=origins.S3StaticWebsiteOrigin(my_bucket),
+                origin=website_origin,
                 viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
             ),
+            additional_behaviors=hls_behaviors(website_origin),
             default_root_object="index.html",
         )
 
@@ -67,10 +115,8 @@ class VeryDemureSecureFrontEndStack(cdk.Stack):
             block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
         )
 
-        # Deploy static website files to the S3 bucket
-        s3deploy.BucketDeployment(
-            self, "DeployFiles", sources=[s3deploy.Source.asset("../dist")], destination_bucket=my_bucket
-        )
+        # Deploy the published website files to the S3 bucket
+        publish_deployments(self, my_bucket)
 
         # Define Object Access Control
         oac = cloudfront.S3OriginAccessControl(
@@ -97,6 +143,7 @@ class VeryDemureSecureFrontEndStack(cdk.Stack):
             default_behavior=cloudfront.BehaviorOptions(
                 origin=s3_origin, viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS
             ),
+            additional_behaviors=hls_behaviors(s3_origin),
             default_root_object="index.html",
         )
 
@@ -126,10 +173,8 @@ class VeryDemureMoreSecureFrontEndStack(cdk.Stack):
             block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
         )
 
-        # Deploy static website files to the S3 bucket
-        s3deploy.BucketDeployment(
-            self, "DeployFiles", sources=[s3deploy.Source.asset("../dist")], destination_bucket=my_bucket
-        )
+        # Deploy the published website files to the S3 bucket
+        publish_deployments(self, my_bucket)
 
         # Define Object Access Control
         oac = cloudfront.S3OriginAccessControl(
@@ -158,6 +203,7 @@ class VeryDemureMoreSecureFrontEndStack(cdk.Stack):
             default_behavior=cloudfront.BehaviorOptions(
                 origin=s3_origin, viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS
             ),
+            additional_behaviors=hls_behaviors(s3_origin),
             default_root_object="index.html",
         )
 
@@ -1,49 +1,116 @@
 # Standard Library
 import logging
+import os
 import signal
 import sys
+from dataclasses import replace
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import Any
 
 # Third Party
-import boto3
 from dotenv import load_dotenv
-from openai import OpenAI
-
-if TYPE_CHECKING:
-    from mypy_boto3_bedrock_runtime import BedrockRuntimeClient
 
 # Our Libraries
-from very_demure.bedrock import (
-    generate_mindfulness_script as bedrock_generate_mindfulness_script,
-)
-from very_demure.openai import (
-    generate_mindfulness_script as openai_generate_mindfulness_script,
-)
-from very_demure.polly import process_text_to_ssml, synthesize_speech
-from very_demure.schema import LLMProviderConfig, SpeechSynthConfig
+from very_demure import logs, metrics
+from very_demure.schema import VALID_VOICES, LLMProviderConfig, SpeechSynthConfig
 from very_demure.utils import (
     CLI_ARGS_CONFIG,
-    ISO8601_DATE_FORMAT,
-    LOG_FORMAT,
     cli_handle_args,
     handleSigINTTERMKILL,
-    sanitise_model_name,
+    parse_voices,
 )
 
-load_dotenv()
-
 logger = logging.getLogger(__name__)
 
 signal.signal(signal.SIGTERM, handleSigINTTERMKILL)
 signal.signal(signal.SIGINT, handleSigINTTERMKILL)
 
 
+def batch(args: list[str]) -> None:
+    """Entrypoint for `python -m very_demure batch`."""
+    # Our Libraries
+    from very_demure import batch
+
+    batch.main(args)
+
+
+def serve(args: list[str]) -> None:
+    """Entrypoint for `python -m very_demure serve`, imported here so other commands never load the HTTP server."""
+    # Our Libraries
+    from very_demure import server
+
+    server.main(args)
+
+
+def publish(args: list[str]) -> None:
+    """Entrypoint for `python -m very_demure publish`."""
+    # Our Libraries
+    from very_demure import publish
+
+    publish.main(args)
+
+
+def calibrate(args: list[str]) -> None:
+    """Entrypoint for `python -m very_demure calibrate`."""
+    # Our Libraries
+    from very_demure import estimator
+
+    estimator.main(args)
+
+
+def assemble(args: list[str]) -> None:
+    """Entrypoint for `python -m very_demure assemble`."""
+    # Our Libraries
+    from very_demure import assemble
+
+    assemble.main(args)
+
+
+# python -m very_demure <subcommand> ...
+SUBCOMMANDS = {
+    "batch": batch,
+    "serve": serve,
+    "publish": publish,
+    "calibrate": calibrate,
+    "assemble": assemble,
+}
+
+
 def main() -> None:
     """Entrypoint for processing inference job."""
+    # The only place .env is read, before any client is constructed
+    load_dotenv()
+    if sys.argv[1:2] and sys.argv[1] in SUBCOMMANDS:
+        return SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+
     cli_args = cli_handle_args(CLI_ARGS_CONFIG, sys.argv[1:])
     logger.info(cli_args)
 
+    metrics.configure(cli_args.get("metrics_out"))
+    try:
+        with logs.job(os.urandom(6).hex()), metrics.span("render", command="session"):
+            render_session(cli_args)
+    finally:
+        metrics.shutdown()
+
+
+def render_session(cli_args: dict[str, Any]) -> None:
+    """Generate one script and synthesize it for every requested voice."""
+    # Imported here so subcommands, which share this module, never load the rendering pipeline
+    # Our Libraries
+    from very_demure.cache import DiskResponseCache, SynthesisCache
+    from very_demure.estimator import save_calibrations
+    from very_demure.pipeline import (
+        audio_output_name,
+        configure_services,
+        create_clients,
+        generate_script,
+        script_to_ssml,
+        write_transcript,
+    )
+    from very_demure.polly import DEFAULT_SYNTH_CONCURRENCY, synthesize_voices
+    from very_demure.renditions import package_session
+
     # Consume configuration
     llm_config = LLMProviderConfig(
         provider=cli_args.get("provider", "bedrock"), model_id=cli_args.get("model", "amazon.titan-text-premier-v1:0")
@@ -53,55 +120,64 @@ def main() -> None:
         engine=cli_args.get("engine", "neural"),
         voice=cli_args.get("voice", "Matthew"),  # voice_id = "Amy|Ruth|Matthew"
         voice_speed=cli_args.get("speed", "x-slow"),
-        duration_minutes=cli_args.get("duration", "1"),
+        duration_minutes=cli_args.get("duration") or "1",
         flavour=cli_args.get("flavour", "sleepy"),  # flavour = sleepy|morning|everyday
+        pause_mode=cli_args.get("pause_mode", "ssml"),  # pause_mode = ssml|silence
     )
 
-    # Prepare file outputs
-    model_name = sanitise_model_name(llm_config.model_id)
-    script_output_name = (
-        f"{llm_config.provider}-{model_name}-{ss_conf.engine}-{ss_conf.duration_minutes}-{ss_conf.flavour}"
-    )
-    audio_output_name = f"{llm_config.provider}-{model_name}-{ss_conf.engine}-{ss_conf.duration_minutes}-{ss_conf.voice}-{ss_conf.flavour}"  # noqa: E501
-
     output_location = cli_args.get("output_location", "./dist/assets/")
     output_location_path = Path(output_location)
     logger.info(output_location_path)
-    output_location_path.parent.mkdir(parents=True, exist_ok=True)
+    output_location_path.mkdir(parents=True, exist_ok=True)
 
-    # Setup API Clients. See `.env.sample` for assumed environment variables for credentials
-    openai_client = OpenAI()
-    boto3_session = boto3.Session()
-    polly_client = boto3_session.client("polly", region_name="us-east-1")
-    bedrock_runtime_client: BedrockRuntimeClient = boto3_session.client("bedrock-runtime", region_name="us-east-1")
+    concurrency = int(cli_args.get("concurrency", 3))
+    # Every voice can have a full set of SSML chunks in flight on the one Polly client
+    configure_services(cli_args, max_pool_connections=concurrency * DEFAULT_SYNTH_CONCURRENCY)
+    clients = create_clients()
     logger.info("Clients created...")
 
-    # Generate Script
-    if llm_config.provider == "openai":
-        script = openai_generate_mindfulness_script(client=openai_client, speech_synth_config=ss_conf)
+    cache_dir = Path(cli_args.get("cache_dir", ".cache/very_demure/"))
+    response_cache = DiskResponseCache(cache_dir / "llm")
+    bypass_cache = cli_args.get("no_llm_cache", False)
 
-    elif llm_config.provider == "bedrock":
-        script = bedrock_generate_mindfulness_script(
-            client=bedrock_runtime_client, model=llm_config.model_id, speech_synth_config=ss_conf
-        )
+    # Generate Script
+    with metrics.span("script.generate", provider=llm_config.provider, model=llm_config.model_id):
+        script = generate_script(llm_config, ss_conf, clients, response_cache=response_cache, bypass_cache=bypass_cache)
 
-    exact_ssml_script = process_text_to_ssml(script).replace('pitch="medium" volume="medium"', "")
-    logger.info(exact_ssml_script)
+    with metrics.span("ssml.compile", characters=len(script)):
+        exact_ssml_script = script_to_ssml(script, ss_conf)
+    logger.info(f"Compiled {len(exact_ssml_script)} characters of SSML")
+    logs.log_payload(logger, "ssml", exact_ssml_script)
 
     # Save a copy of the transcript
-    transcript_file = output_location_path / f"{script_output_name}.ssml.xml"
-    transcript_file.write_text(exact_ssml_script)
-
-    # Synth all voices
-    for voice in ["Amy", "Matthew", "Ruth"]:
-        audio_output_name = (
-            f"{llm_config.provider}-{model_name}-{ss_conf.engine}-{ss_conf.duration_minutes}-{voice}-{ss_conf.flavour}"
-        )
-        output_audio_path = output_location_path / f"{audio_output_name}.mp3"
-        ss_conf.voice = voice
-        synthesize_speech(
-            exact_ssml_script, speech_synth_config=ss_conf, output_file=output_audio_path, polly_client=polly_client
+    with metrics.span("transcript.write"):
+        write_transcript(exact_ssml_script, llm_config, ss_conf, output_location_path)
+
+    # Synth all voices concurrently, one immutable config per voice
+    voices = parse_voices(cli_args.get("voices"), default=VALID_VOICES)
+    synth_jobs = []
+    for voice in voices:
+        voice_conf = replace(ss_conf, voice=voice)
+        output_audio_path = output_location_path / f"{audio_output_name(llm_config, voice_conf)}.mp3"
+        synth_jobs.append((voice_conf, output_audio_path))
+
+    synthesis_cache = SynthesisCache(cache_dir / "polly")
+    with metrics.span("synthesis", voices=len(synth_jobs)):
+        results = synthesize_voices(
+            exact_ssml_script,
+            synth_jobs,
+            polly_client=clients.polly,
+            max_workers=concurrency,
+            cache=synthesis_cache,
         )
+    save_calibrations()
+    failures = [result for result in results if not result.ok]
+    if cli_args.get("package"):
+        for result in results:
+            if result.ok:
+                package_session(result.output_file, output_location_path)
+    if failures:
+        raise RuntimeError(f"Synthesis failed for voices: {', '.join(result.voice for result in failures)}")
 
 
 def graceful_shutdown_handler(e: Exception) -> None:
@@ -110,7 +186,7 @@ def graceful_shutdown_handler(e: Exception) -> None:
 
 
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, datefmt=ISO8601_DATE_FORMAT)
+    logs.configure_logging_from_env()
     try:
         main()
     except KeyboardInterrupt:  # SIGINT
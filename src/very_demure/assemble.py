@@ -0,0 +1,119 @@
+# Standard Library
+import contextlib
+import logging
+import mmap
+import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+# Our Libraries
+from very_demure import metrics
+from very_demure.mp3 import FrameHeader, id3v2_tag, info_frame, iter_frames, silence
+from very_demure.utils import ASSEMBLE_CLI_ARGS_CONFIG, cli_handle_args
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Assembly:
+    """Audio frames written so far, and the format every later frame must match."""
+
+    template: FrameHeader | None = None
+    frames: int = 0
+    audio_bytes: int = 0
+    seconds: float = 0.0
+    bitrates: set[int] = field(default_factory=set)
+
+    def add(self, header: FrameHeader, length: int) -> None:
+        if self.template is None:
+            self.template = header
+        elif (header.version, header.sample_rate, header.channel_mode) != (
+            self.template.version,
+            self.template.sample_rate,
+            self.template.channel_mode,
+        ):
+            raise ValueError(
+                f"Unfortunately a {header.sample_rate}Hz frame cannot follow {self.template.sample_rate}Hz audio, "
+                "MP3s can only be joined without re-encoding when their sample rates and channels match"
+            )
+        self.frames += 1
+        self.audio_bytes += length
+        self.seconds += header.duration_seconds
+        self.bitrates.add(header.bitrate_kbps)
+
+
+def _copy_frames(data: bytes | memoryview, write: Callable[[bytes | memoryview], Any], assembly: Assembly) -> None:
+    for header, frame in iter_frames(data):
+        if assembly.template is None:
+            # Reserve room for the info frame, whose size only depends on the format of the first audio frame
+            write(info_frame(header, 0, 0))
+        assembly.add(header, len(frame))
+        write(frame)
+
+
+def _copy_file(path: Path, write: Callable[[bytes | memoryview], Any], assembly: Assembly) -> None:
+    """Copy the audio frames of an MP3, mapped into memory rather than read, leaving its tags behind."""
+    with path.open("rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise ValueError(f"Unfortunately {path} is empty")
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        _copy_frames(mapped, write, assembly)
+    finally:
+        # The traceback of an error may still hold views of the mapping, which then closes once they are released
+        with contextlib.suppress(BufferError):
+            mapped.close()
+
+
+def assemble(inputs: list[Path], output_file: Path, gap_ms: int = 0, title: str | None = None) -> Assembly:
+    """Join finished MP3s at frame boundaries into one, with `gap_ms` of silence between them, without decoding.
+
+    ID3 tags and Xing/Info frames of the inputs are dropped. The output starts with a new Xing/Info frame
+    carrying the total frame and byte counts, so players show its exact length, after an ID3 title if given.
+    The output is written next to `output_file` and renamed into place, so it may also be one of the inputs.
+    """
+    if not inputs:
+        raise ValueError("Unfortunately there is nothing to assemble")
+    assembly = Assembly()
+    tag = id3v2_tag(title) if title else b""
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    partial = output_file.with_name(f".{output_file.name}.partial")
+    try:
+        with partial.open("wb") as file:
+            file.write(tag)
+            for i, path in enumerate(inputs):
+                if i and gap_ms:
+                    template = assembly.template
+                    gap = silence(gap_ms, template.sample_rate, template.channel_mode, template.bitrate_kbps)
+                    _copy_frames(gap, file.write, assembly)
+                _copy_file(path, file.write, assembly)
+                if assembly.template is None:
+                    raise ValueError(f"Unfortunately {path} has no MP3 audio frames")
+            file.seek(len(tag))
+            file.write(
+                info_frame(assembly.template, assembly.frames, assembly.audio_bytes, vbr=len(assembly.bitrates) > 1)
+            )
+        partial.replace(output_file)
+    finally:
+        partial.unlink(missing_ok=True)
+    return assembly
+
+
+def main(args: list[str]) -> None:
+    """Entrypoint for `python -m very_demure assemble morning.mp3 everyday.mp3 --output session.mp3`."""
+    cli_args: dict[str, Any] = cli_handle_args(ASSEMBLE_CLI_ARGS_CONFIG, args)
+    logger.info(cli_args)
+
+    start = time.perf_counter()
+    output_file = Path(cli_args["output"])
+    with metrics.span("assemble", inputs=len(cli_args["inputs"])):
+        assembly = assemble(
+            [Path(path) for path in cli_args["inputs"]], output_file, cli_args["gap"], cli_args["title"]
+        )
+    logger.info(
+        f"Assembled {assembly.seconds:.1f}s of audio in {assembly.frames} frames into {output_file} "
+        f"in {(time.perf_counter() - start) * 1000:.0f}ms"
+    )
@@ -0,0 +1,178 @@
+# Standard Library
+import asyncio
+import logging
+import time
+from pathlib import Path
+
+# Our Libraries
+from very_demure.batch import (
+    BatchSession,
+    SessionResult,
+    failed_session,
+    synthesize_session,
+)
+from very_demure.cache import ResponseCache, SynthesisCache
+from very_demure.estimator import duration_fit
+from very_demure.hedging import hedger
+from very_demure.openai import agenerate_mindfulness_script
+from very_demure.pipeline import (
+    Clients,
+    generate_script,
+    script_group_key,
+    script_to_ssml,
+    write_transcript,
+)
+from very_demure.schema import LLMProviderConfig, SpeechSynthConfig
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 4
+DEFAULT_SCRIPT_CONCURRENCY = 2
+DEFAULT_SYNTH_CONCURRENCY = 4
+
+# Marks the end of a queue for the workers consuming it
+_DONE = object()
+
+
+async def agenerate_script(
+    llm_config: LLMProviderConfig,
+    speech_synth_config: SpeechSynthConfig,
+    clients: Clients,
+    response_cache: ResponseCache | None = None,
+    bypass_cache: bool = False,
+) -> str:
+    """Generate a script without blocking the event loop.
+
+    OpenAI uses the native `AsyncOpenAI` client when available, everything else, and hedged or duration
+    fitted generation, runs in the default executor.
+    """
+    native = hedger() is None and duration_fit() is None
+    if llm_config.provider == "openai" and clients.async_openai is not None and native:
+        return await agenerate_mindfulness_script(
+            client=clients.async_openai,
+            model=llm_config.model_id,
+            speech_synth_config=speech_synth_config,
+            cache=response_cache,
+            bypass_cache=bypass_cache,
+        )
+    return await asyncio.to_thread(
+        generate_script,
+        llm_config,
+        speech_synth_config,
+        clients,
+        response_cache=response_cache,
+        bypass_cache=bypass_cache,
+    )
+
+
+async def render_sessions(
+    sessions: list[BatchSession],
+    clients: Clients,
+    output_location: Path,
+    response_cache: ResponseCache | None = None,
+    synthesis_cache: SynthesisCache | None = None,
+    bypass_cache: bool = False,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    script_concurrency: int = DEFAULT_SCRIPT_CONCURRENCY,
+    synth_concurrency: int = DEFAULT_SYNTH_CONCURRENCY,
+) -> list[SessionResult]:
+    """Render sessions through a two stage pipeline so scripts are generated while earlier ones are synthesized.
+
+    The stages are joined by a bounded queue. When synthesis falls behind, script generation blocks on the full
+    queue instead of piling up scripts in memory. Cancelling this coroutine (eg the SystemExit raised by the
+    SIGINT/SIGTERM handler inside `asyncio.run`) cancels every stage. Executor threads already talking to Polly
+    or Bedrock finish their current request.
+    """
+    output_location.mkdir(parents=True, exist_ok=True)
+    script_concurrency = max(1, script_concurrency)
+    synth_concurrency = max(1, synth_concurrency)
+
+    groups: dict[tuple[LLMProviderConfig, SpeechSynthConfig], list[BatchSession]] = {}
+    for session in sessions:
+        groups.setdefault(script_group_key(session.llm_config, session.speech_synth_config), []).append(session)
+
+    group_queue: asyncio.Queue = asyncio.Queue()
+    synth_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+    results: dict[BatchSession, SessionResult] = {}
+
+    for item in groups.items():
+        group_queue.put_nowait(item)
+    for _ in range(script_concurrency):
+        group_queue.put_nowait(_DONE)
+
+    async def _generate_then_close() -> None:
+        await asyncio.gather(
+            *(
+                _script_worker(
+                    group_queue, synth_queue, results, clients, output_location, response_cache, bypass_cache
+                )
+                for _ in range(script_concurrency)
+            )
+        )
+        for _ in range(synth_concurrency):
+            await synth_queue.put(_DONE)
+
+    tasks = [asyncio.create_task(_generate_then_close())]
+    tasks += [
+        asyncio.create_task(_synth_worker(synth_queue, results, clients, output_location, synthesis_cache))
+        for _ in range(synth_concurrency)
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return [results[session] for session in sessions]
+
+
+async def _script_worker(
+    group_queue: asyncio.Queue,
+    synth_queue: asyncio.Queue,
+    results: dict[BatchSession, SessionResult],
+    clients: Clients,
+    output_location: Path,
+    response_cache: ResponseCache | None,
+    bypass_cache: bool,
+) -> None:
+    """Stage 1: generate a script per group and queue one synthesis job per voice."""
+    while (item := await group_queue.get()) is not _DONE:
+        (llm_config, group_conf), group = item
+        start = time.perf_counter()
+        try:
+            script = await agenerate_script(
+                llm_config, group_conf, clients, response_cache=response_cache, bypass_cache=bypass_cache
+            )
+            ssml_script = script_to_ssml(script, group_conf)
+            await asyncio.to_thread(write_transcript, ssml_script, llm_config, group_conf, output_location)
+        except Exception as e:
+            logger.error(f"Script generation failed for {llm_config} {group_conf}: {e}")
+            for session in group:
+                results[session] = failed_session(session, e, script_seconds=time.perf_counter() - start)
+            continue
+
+        script_seconds = time.perf_counter() - start
+        for session in group:
+            await synth_queue.put((session, ssml_script, script_seconds))  # Backpressure
+
+
+async def _synth_worker(
+    synth_queue: asyncio.Queue,
+    results: dict[BatchSession, SessionResult],
+    clients: Clients,
+    output_location: Path,
+    synthesis_cache: SynthesisCache | None,
+) -> None:
+    """Stage 2: synthesize queued sessions until the end of queue marker."""
+    while (item := await synth_queue.get()) is not _DONE:
+        session, ssml_script, script_seconds = item
+        results[session] = await asyncio.to_thread(
+            synthesize_session,
+            session,
+            ssml_script,
+            clients,
+            output_location,
+            synthesis_cache,
+            script_seconds=script_seconds,
+        )
@@ -0,0 +1,344 @@
+# Standard Library
+import itertools
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Any
+
+# Our Libraries
+from very_demure import logs, metrics
+from very_demure.cache import DiskResponseCache, ResponseCache, SynthesisCache
+from very_demure.estimator import save_calibrations
+from very_demure.pipeline import (
+    Clients,
+    audio_output_name,
+    configure_services,
+    create_clients,
+    generate_script,
+    script_group_key,
+    script_output_name,
+    script_to_ssml,
+    write_transcript,
+)
+from very_demure.polly import DEFAULT_SYNTH_CONCURRENCY, synthesize_speech
+from very_demure.renditions import package_session
+from very_demure.schema import LLMProviderConfig, SpeechSynthConfig
+from very_demure.segments import segment_store
+from very_demure.utils import BATCH_CLI_ARGS_CONFIG, CLI_ARGS_CONFIG, cli_handle_args
+
+logger = logging.getLogger(__name__)
+
+# Manifest matrix keys and the session key each one expands
+MATRIX_KEYS = {"voices": "voice", "flavours": "flavour", "durations": "duration"}
+# Session keys named like the single session CLI flags and the config field each one sets
+SESSION_KEYS = {
+    "provider": "provider",
+    "model": "model_id",
+    "engine": "engine",
+    "voice": "voice",
+    "speed": "voice_speed",
+    "duration": "duration_minutes",
+    "flavour": "flavour",
+    "pause-mode": "pause_mode",
+}
+LLM_FIELDS = [field.name for field in fields(LLMProviderConfig)]
+SPEECH_FIELDS = [field.name for field in fields(SpeechSynthConfig)]
+# Strings like every session flag, except these may also be JSON numbers, eg `"durations": [5, 10]`
+NUMERIC_FIELDS = {"duration_minutes", "sample_rate"}
+DEFAULT_PROVIDER_CONCURRENCY = {"bedrock": 4, "openai": 4, "polly": 8}
+
+
+@dataclass(frozen=True)
+class BatchSession:
+    llm_config: LLMProviderConfig
+    speech_synth_config: SpeechSynthConfig
+
+    @property
+    def name(self) -> str:
+        return audio_output_name(self.llm_config, self.speech_synth_config)
+
+
+@dataclass
+class SessionResult:
+    name: str
+    voice: str
+    ok: bool
+    output_file: str | None = None
+    error: str | None = None
+    script_seconds: float = 0.0
+    synth_seconds: float = 0.0
+
+
+def session_from_entry(entry: dict[str, Any]) -> BatchSession:
+    """Build a session from a manifest entry or render request.
+
+    Keys are the single session CLI flags, eg `speed`, or the config fields they set, eg `voice_speed`.
+    Any other key, or a value that is not a string as on the command line, raises `ValueError` rather than
+    rendering a misspelt setting with its default or failing later on an unhashable value.
+    """
+    values: dict[str, Any] = {field: CLI_ARGS_CONFIG[key] for key, field in SESSION_KEYS.items()}
+    given: dict[str, Any] = {}
+    for key, value in entry.items():
+        field = SESSION_KEYS.get(key, key)
+        if field not in LLM_FIELDS and field not in SPEECH_FIELDS:
+            raise ValueError(f"Unfortunately {key} is not one of {sorted(SESSION_KEYS)} or a config field.")
+        if field in given:
+            raise ValueError(f"Unfortunately {field} is set more than once.")
+        if field in NUMERIC_FIELDS and isinstance(value, int | float) and not isinstance(value, bool):
+            value = str(value)
+        if not isinstance(value, str):
+            raise ValueError(f"Unfortunately {key} must be a string, not {type(value).__name__}.")
+        given[field] = value
+    values.update(given)
+    values["duration_minutes"] = str(values["duration_minutes"] or "1")
+    return BatchSession(
+        llm_config=LLMProviderConfig(**{field: values[field] for field in LLM_FIELDS}),
+        speech_synth_config=SpeechSynthConfig(**{field: values[field] for field in SPEECH_FIELDS if field in values}),
+    )
+
+
+def expand_manifest_entry(entry: dict[str, Any]) -> list[BatchSession]:
+    """Expand one manifest line into sessions, taking the cartesian product of any `matrix` lists.
+
+    eg `{"provider": "openai", "matrix": {"voices": ["Amy", "Ruth"], "durations": [5, 10]}}` is 4 sessions.
+    """
+    base = {key: value for key, value in entry.items() if key != "matrix"}
+    matrix = entry.get("matrix", {})
+    unknown = set(matrix) - set(MATRIX_KEYS)
+    if unknown:
+        raise ValueError(f"Unfortunately {sorted(unknown)} are not one of {sorted(MATRIX_KEYS)}.")
+
+    keys = [MATRIX_KEYS[key] for key in matrix]
+    return [
+        session_from_entry({**base, **dict(zip(keys, combination, strict=True))})
+        for combination in itertools.product(*matrix.values())
+    ]
+
+
+def load_manifest(manifest: Path) -> list[BatchSession]:
+    """Read a JSON lines manifest into a de-duplicated list of sessions, in manifest order."""
+    sessions = []
+    for line in manifest.read_text().splitlines():
+        if line.strip():
+            sessions.extend(expand_manifest_entry(json.loads(line)))
+    return list(dict.fromkeys(sessions))
+
+
+def run_batch(
+    sessions: list[BatchSession],
+    clients: Clients,
+    output_location: Path,
+    response_cache: ResponseCache | None = None,
+    synthesis_cache: SynthesisCache | None = None,
+    provider_concurrency: dict[str, int] | None = None,
+    bypass_cache: bool = False,
+) -> list[SessionResult]:
+    """Render every session over shared clients and worker pools.
+
+    Sessions that only differ by voice share one generated script. Script generation is limited per LLM provider
+    and synthesis is limited by the `polly` concurrency. Failures are recorded per session, never raised.
+    """
+    limits = {**DEFAULT_PROVIDER_CONCURRENCY, **(provider_concurrency or {})}
+    output_location.mkdir(parents=True, exist_ok=True)
+
+    groups: dict[tuple[LLMProviderConfig, SpeechSynthConfig], list[BatchSession]] = {}
+    for session in sessions:
+        groups.setdefault(script_group_key(session.llm_config, session.speech_synth_config), []).append(session)
+    logger.info(f"Batch of {len(sessions)} sessions needs {len(groups)} scripts")
+
+    llm_providers = {llm_config.provider for llm_config, _ in groups}
+    llm_semaphores = {provider: threading.Semaphore(limits.get(provider, 1)) for provider in llm_providers}
+    results: dict[BatchSession, SessionResult] = {}
+
+    def _synthesize(
+        session: BatchSession, ssml_script: str, script_seconds: float
+    ) -> tuple[BatchSession, SessionResult]:
+        with logs.job(session.name):
+            result = synthesize_session(
+                session, ssml_script, clients, output_location, synthesis_cache, script_seconds=script_seconds
+            )
+        return session, result
+
+    def _render_group(
+        key: tuple[LLMProviderConfig, SpeechSynthConfig], group: list[BatchSession]
+    ) -> list[Future[tuple[BatchSession, SessionResult]]]:
+        llm_config, group_conf = key
+        start = time.perf_counter()
+        try:
+            with logs.job(script_output_name(llm_config, group_conf)), llm_semaphores[llm_config.provider]:
+                script = generate_script(
+                    llm_config, group_conf, clients, response_cache=response_cache, bypass_cache=bypass_cache
+                )
+            ssml_script = script_to_ssml(script, group_conf)
+            write_transcript(ssml_script, llm_config, group_conf, output_location)
+        except Exception as e:
+            logger.error(f"Script generation failed for {llm_config} {group_conf}: {e}")
+            for session in group:
+                results[session] = failed_session(session, e, script_seconds=time.perf_counter() - start)
+            return []
+        script_seconds = time.perf_counter() - start
+        synthesize = metrics.in_current_context(_synthesize)
+        return [synth_pool.submit(synthesize, session, ssml_script, script_seconds) for session in group]
+
+    script_workers = max(1, sum(limits.get(provider, 1) for provider in llm_providers))
+    with (
+        ThreadPoolExecutor(max_workers=script_workers, thread_name_prefix="batch-llm") as script_pool,
+        ThreadPoolExecutor(max_workers=max(1, limits["polly"]), thread_name_prefix="batch-polly") as synth_pool,
+    ):
+        render_group = metrics.in_current_context(_render_group)
+        script_futures = [script_pool.submit(render_group, key, group) for key, group in groups.items()]
+        synth_futures = [future for done in as_completed(script_futures) for future in done.result()]
+        for future in as_completed(synth_futures):
+            session, result = future.result()
+            results[session] = result
+
+    return [results[session] for session in sessions]
+
+
+def synthesize_session(
+    session: BatchSession,
+    ssml_script: str,
+    clients: Clients,
+    output_location: Path,
+    synthesis_cache: SynthesisCache | None = None,
+    script_seconds: float = 0.0,
+) -> SessionResult:
+    """Synthesize one session's audio, recording a failure rather than raising."""
+    output_file = output_location / f"{session.name}.mp3"
+    start = time.perf_counter()
+    try:
+        synthesize_speech(
+            ssml_script,
+            speech_synth_config=session.speech_synth_config,
+            output_file=output_file,
+            polly_client=clients.polly,
+            cache=synthesis_cache,
+        )
+    except Exception as e:
+        logger.error(f"Synthesis failed for {session.name}: {e}")
+        return failed_session(e=e, session=session, script_seconds=script_seconds, start=start)
+    return SessionResult(
+        name=session.name,
+        voice=session.speech_synth_config.voice,
+        ok=True,
+        output_file=str(output_file),
+        script_seconds=script_seconds,
+        synth_seconds=time.perf_counter() - start,
+    )
+
+
+def failed_session(
+    session: BatchSession, e: Exception, script_seconds: float = 0.0, start: float | None = None
+) -> SessionResult:
+    """Result for a session that failed, `start` being when synthesis began if it got that far."""
+    return SessionResult(
+        name=session.name,
+        voice=session.speech_synth_config.voice,
+        ok=False,
+        error=repr(e),
+        script_seconds=script_seconds,
+        synth_seconds=time.perf_counter() - start if start is not None else 0.0,
+    )
+
+
+def package_results(results: list[SessionResult], output_location: Path) -> None:
+    """Write HLS renditions for each rendered session, recording a failure rather than raising."""
+    for result in results:
+        if not result.ok:
+            continue
+        try:
+            package_session(Path(result.output_file), output_location)
+        except Exception as e:
+            logger.error(f"Packaging failed for {result.name}: {e}")
+            result.ok, result.error = False, repr(e)
+
+
+def summarise(results: list[SessionResult], wall_seconds: float) -> dict[str, Any]:
+    return {
+        "sessions": len(results),
+        "succeeded": sum(result.ok for result in results),
+        "failed": sum(not result.ok for result in results),
+        "wall_seconds": round(wall_seconds, 3),
+        "results": [asdict(result) for result in results],
+    }
+
+
+def main(args: list[str]) -> None:
+    """Entrypoint for `python -m very_demure batch manifest.jsonl`."""
+    cli_args = cli_handle_args(BATCH_CLI_ARGS_CONFIG, args)
+    logger.info(cli_args)
+
+    sessions = load_manifest(Path(cli_args["manifest"]))
+    output_location = Path(cli_args["output_location"])
+    cache_dir = Path(cli_args["cache_dir"])
+
+    configure_services(
+        cli_args,
+        max_pool_connections=max(
+            int(cli_args["polly_concurrency"]) * DEFAULT_SYNTH_CONCURRENCY, int(cli_args["bedrock_concurrency"])
+        ),
+    )
+    render_kwargs = dict(
+        clients=create_clients(),
+        output_location=output_location,
+        response_cache=DiskResponseCache(cache_dir / "llm"),
+        synthesis_cache=SynthesisCache(cache_dir / "polly"),
+        bypass_cache=cli_args["no_llm_cache"],
+    )
+
+    metrics.configure(cli_args["metrics_out"])
+    start = time.perf_counter()
+    try:
+        with metrics.span(
+            "render", command="batch", sessions=len(sessions), runner="async" if cli_args["async"] else "threads"
+        ):
+            results = render_batch(sessions, cli_args, render_kwargs)
+            if cli_args["package"]:
+                package_results(results, output_location)
+    finally:
+        save_calibrations()
+        metrics.shutdown()
+    summary = summarise(results, time.perf_counter() - start)
+    if segment_store() is not None:
+        summary["segment_cache"] = segment_store().stats.as_dict()
+
+    summary_file = Path(cli_args["summary"] or output_location / "batch-summary.json")
+    summary_file.write_text(json.dumps(summary, indent=2))
+    logger.info(f"Batch complete: {summary['succeeded']} succeeded, {summary['failed']} failed -> {summary_file}")
+    if summary["failed"]:
+        raise RuntimeError(f"{summary['failed']} of {summary['sessions']} batch sessions failed. See {summary_file}")
+
+
+def render_batch(
+    sessions: list[BatchSession], cli_args: dict[str, Any], render_kwargs: dict[str, Any]
+) -> list[SessionResult]:
+    """Render with the asyncio pipeline or the thread pool runner depending on `--async`."""
+    if cli_args["async"]:
+        # Imported here as the async pipeline builds on this module, and asyncio is only needed for --async
+        # Standard Library
+        import asyncio
+
+        # Our Libraries
+        from very_demure.async_pipeline import render_sessions
+
+        return asyncio.run(
+            render_sessions(
+                sessions,
+                script_concurrency=int(cli_args["bedrock_concurrency"]) + int(cli_args["openai_concurrency"]),
+                synth_concurrency=int(cli_args["polly_concurrency"]),
+                **render_kwargs,
+            )
+        )
+    return run_batch(
+        sessions,
+        provider_concurrency={
+            "bedrock": int(cli_args["bedrock_concurrency"]),
+            "openai": int(cli_args["openai_concurrency"]),
+            "polly": int(cli_args["polly_concurrency"]),
+        },
+        **render_kwargs,
+    )
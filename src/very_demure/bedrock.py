@@ -1,15 +1,21 @@
 # Standard Library
 import json
 import logging
-from typing import Any
-
-# Third Party
-from mypy_boto3_bedrock_runtime import BedrockRuntimeClient
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any
 
 # Our Libraries
+from very_demure import metrics
+from very_demure.cache import ResponseCache, cached_script, response_cache_key
+from very_demure.logs import log_payload
 from very_demure.prompt import generate_prompt
+from very_demure.ratelimit import limited_call, rate_limiter
 from very_demure.schema import SpeechSynthConfig
 
+if TYPE_CHECKING:
+    # Third Party
+    from mypy_boto3_bedrock_runtime import BedrockRuntimeClient
+
 logger = logging.getLogger(__name__)
 DEFAULT_SPEECH_CONFIG = SpeechSynthConfig(duration_minutes="10")
 # https://github.com/awsdocs/aws-doc-sdk-examples/tree/main/python/example_code/bedrock-runtime/models
@@ -26,38 +32,91 @@ MODEL_DEFAULT_CONFIG = {
 
 
 def generate_mindfulness_script(
-    client: BedrockRuntimeClient,
+    client: "BedrockRuntimeClient",
     model: str = "amazon.titan-text-premier-v1:0",
     speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG,
     config: dict[str, Any] = None,
+    cache: ResponseCache | None = None,
+    bypass_cache: bool = False,
 ) -> Any:
-    """Generate a guided mindfulness meditation using an Amazon Bedrock Foundation Model."""
+    """Generate a guided mindfulness meditation using an Amazon Bedrock Foundation Model.
+
+    Identical prompts for the same model and generation config are served from `cache` when provided.
+    """
     textConfig = config if config else MODEL_DEFAULT_CONFIG[model]
 
     prompt = generate_prompt(speech_synth_config)
 
+    def _invoke() -> str:
+        native_request = {
+            "inputText": prompt,
+            "textGenerationConfig": textConfig,
+        }
+
+        logger.debug(f"Invoking {model} with a {len(prompt)} character prompt")
+
+        response = limited_call(
+            "bedrock",
+            model,
+            lambda: client.invoke_model(
+                body=json.dumps(native_request),
+                contentType="application/json",
+                accept="application/json",
+                modelId=model,
+                trace="DISABLED",  # 'ENABLED'|'DISABLED'
+            ),
+        )
+
+        # Decode the response body.
+        model_response = json.loads(response["body"].read())
+        input_tokens = model_response.get("inputTextTokenCount", 0)
+        output_tokens = sum(result.get("tokenCount", 0) for result in model_response["results"])
+        limiter = rate_limiter("bedrock", model)
+        if limiter is not None:
+            limiter.record_tokens(input_tokens + output_tokens)
+        if metrics.enabled():
+            metrics.increment(
+                "retries", response.get("ResponseMetadata", {}).get("RetryAttempts", 0), service="bedrock"
+            )
+            metrics.increment("llm.tokens", input_tokens, model=model, kind="input")
+            metrics.increment("llm.tokens", output_tokens, model=model, kind="output")
+
+        # Extract the response text.
+        response_text = model_response["results"][0]["outputText"]
+        logger.debug(f"Bedrock response of {len(response_text)} characters")
+        log_payload(logger, "bedrock response", response_text)
+        return response_text
+
+    cache_key = response_cache_key("bedrock", model, prompt, textConfig)
+    with metrics.span("llm.generate", provider="bedrock", model=model):
+        return cached_script(cache, cache_key, _invoke, bypass_cache=bypass_cache)
+
+
+def stream_mindfulness_script(
+    client: "BedrockRuntimeClient",
+    model: str = "amazon.titan-text-premier-v1:0",
+    speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG,
+    config: dict[str, Any] = None,
+) -> Iterator[str]:
+    """Stream the raw model output text as Bedrock generates it, including the `[SCRIPT]` markers."""
     native_request = {
-        "inputText": prompt,
-        "textGenerationConfig": textConfig,
+        "inputText": generate_prompt(speech_synth_config),
+        "textGenerationConfig": config if config else MODEL_DEFAULT_CONFIG[model],
     }
 
-    logger.info(native_request)
-
-    response = client.invoke_model(
-        body=json.dumps(native_request),
-        contentType="application/json",
-        accept="application/json",
-        modelId=model,
-        trace="DISABLED",  # 'ENABLED'|'DISABLED'
+    response = limited_call(
+        "bedrock",
+        model,
+        lambda: client.invoke_model_with_response_stream(
+            body=json.dumps(native_request),
+            contentType="application/json",
+            accept="application/json",
+            modelId=model,
+            trace="DISABLED",  # 'ENABLED'|'DISABLED'
+        ),
     )
-    logger.info(response)
-
-    # Decode the response body.
-    model_response = json.loads(response["body"].read())
 
-    # Extract and print the response text.
-    response_text = model_response["results"][0]["outputText"]
-    logger.info(response_text)
-    response_text = response_text.split("[SCRIPT]")[1]
-    logger.info(response_text)
-    return response_text
+    for event in response["body"]:
+        chunk = event.get("chunk")
+        if chunk:
+            yield json.loads(chunk["bytes"]).get("outputText", "")
@@ -0,0 +1,314 @@
+# Standard Library
+import abc
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, BinaryIO
+
+# Our Libraries
+from very_demure import metrics
+from very_demure.clients import SDK_BACKEND
+from very_demure.schema import SpeechSynthConfig
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(".cache/very_demure")
+DEFAULT_SYNTHESIS_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB
+DEFAULT_RESPONSE_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60  # 1 week
+DEFAULT_RESPONSE_CACHE_MAX_ENTRIES = 1000
+SCRIPT_MARKER = "[SCRIPT]"
+
+_response_cache_hits: ContextVar[list[str] | None] = ContextVar("very_demure_response_cache_hits", default=None)
+
+
+def synthesis_cache_key(ssml_text: str, speech_synth_config: SpeechSynthConfig, backend: str = SDK_BACKEND) -> str:
+    """Content address for a synthesis request. Anything that changes the audio must be part of the key.
+
+    `backend` is what synthesized it, see `providers.client_backend`, so fake audio never answers a real request.
+    """
+    key_material = {
+        "ssml": ssml_text,
+        "backend": backend,
+        "engine": speech_synth_config.engine,
+        "voice": speech_synth_config.voice,
+        "sample_rate": speech_synth_config.sample_rate,
+        "output_format": speech_synth_config.output_format,
+        "pause_mode": speech_synth_config.pause_mode,
+    }
+    return hashlib.sha256(json.dumps(key_material, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SynthesisCache:
+    """On-disk content addressed cache of synthesized audio files.
+
+    Entries are written atomically (temp file + rename) and evicted least recently used first
+    once the cache grows past `max_bytes`. A hit's modification time is bumped so it counts as recently used.
+    The size of the entries is tracked as they are stored, so the directory is only scanned when over the limit.
+    """
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_CACHE_DIR / "polly",
+        max_bytes: int = DEFAULT_SYNTHESIS_CACHE_MAX_BYTES,
+        hardlink: bool = True,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hardlink = hardlink
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.total_bytes: int | None = None  # Unknown until the first eviction scans the directory
+
+    def path(self, key: str) -> Path:
+        return self.directory / key
+
+    def __contains__(self, key: str) -> bool:
+        return self.path(key).is_file()
+
+    def get(self, key: str, output_file: Path) -> bool:
+        """Materialise a cached entry at `output_file`. Returns False on a cache miss."""
+        entry = self.path(key)
+        try:
+            os.utime(entry)  # LRU bookkeeping
+        except FileNotFoundError:
+            return False
+        try:
+            self._materialise(entry, output_file)
+        except FileNotFoundError:  # Evicted between the touch and the link
+            return False
+        logger.info(f"Synthesis cache hit {key[:12]} -> {output_file}")
+        return True
+
+    def read(self, key: str) -> bytes | None:
+        """A cached entry's bytes, or None on a cache miss."""
+        entry = self.path(key)
+        try:
+            os.utime(entry)  # LRU bookkeeping
+            return entry.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def store(self, key: str, evict: bool = True) -> Iterator[BinaryIO]:
+        """Open a temp file to write an entry into. It only becomes visible under `key` once fully written.
+
+        Pass `evict=False` when storing many entries at once and call `evict` after the last one.
+        """
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        tmp_path = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                yield file
+            added_bytes = tmp_path.stat().st_size
+            with suppress(FileNotFoundError):
+                added_bytes -= self.path(key).stat().st_size
+            tmp_path.replace(self.path(key))
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes += added_bytes
+        if evict:
+            self.evict()
+
+    def put(self, key: str, source_file: Path) -> Path:
+        """Copy an existing file into the cache."""
+        with self.store(key) as file, source_file.open("rb") as source:
+            shutil.copyfileobj(source, file)
+        return self.path(key)
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits in `max_bytes`.
+
+        Scans the directory only when the tracked size is over `max_bytes` or not known yet. The scan also
+        corrects the tracked size for entries other processes stored or removed.
+        """
+        with self.lock:
+            if self.total_bytes is not None and self.total_bytes <= self.max_bytes:
+                return
+        entries = []
+        for entry in self.directory.iterdir():
+            if entry.name.startswith(".tmp-"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total_bytes <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total_bytes -= size
+            logger.info(f"Synthesis cache evicted {entry.name[:12]}")
+        with self.lock:
+            self.total_bytes = total_bytes
+
+    def _materialise(self, entry: Path, output_file: Path) -> None:
+        # Always replace rather than overwrite the output so we never write through a hardlink into the cache.
+        output_file.unlink(missing_ok=True)
+        if self.hardlink:
+            try:
+                os.link(entry, output_file)
+                return
+            except OSError:  # Cross device or unsupported filesystem
+                pass
+        shutil.copyfile(entry, output_file)
+
+
+def response_cache_key(provider: str, model: str, prompt: str, generation_config: dict[str, Any] | None) -> str:
+    """Cache key for an LLM response. The prompt is hashed so keys stay a fixed size."""
+    key_material = {
+        "provider": provider,
+        "model": model,
+        "prompt_sha256": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        "generation_config": generation_config or {},
+    }
+    return hashlib.sha256(json.dumps(key_material, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseCache(abc.ABC):
+    """Interface for LLM response caches. Subclass and implement `get` and `set` to plug in another backend."""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> str | None:
+        """The response stored under `key`, or None when there is none or it expired."""
+
+    @abc.abstractmethod
+    def set(self, key: str, value: str) -> None:
+        """Store `value` under `key`, replacing any previous response."""
+
+
+class DiskResponseCache(ResponseCache):
+    """Stores one JSON document per response, expiring after `ttl_seconds` and keeping at most `max_entries`."""
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_CACHE_DIR / "llm",
+        ttl_seconds: float | None = DEFAULT_RESPONSE_CACHE_TTL_SECONDS,
+        max_entries: int = DEFAULT_RESPONSE_CACHE_MAX_ENTRIES,
+    ):
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> str | None:
+        entry = self.path(key)
+        try:
+            document = json.loads(entry.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if self.ttl_seconds is not None and time.time() - document["created_at"] > self.ttl_seconds:
+            entry.unlink(missing_ok=True)
+            return None
+
+        with suppress(FileNotFoundError):
+            os.utime(entry)  # LRU bookkeeping
+        return document["value"]
+
+    def set(self, key: str, value: str) -> None:
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        tmp_path = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump({"created_at": time.time(), "value": value}, file)
+            tmp_path.replace(self.path(key))
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries beyond `max_entries`."""
+        entries = []
+        for entry in self.directory.glob("*.json"):
+            try:
+                entries.append((entry.stat().st_mtime, entry))
+            except FileNotFoundError:
+                continue
+
+        excess = len(entries) - self.max_entries
+        for _, entry in sorted(entries, key=lambda e: e[0])[: max(0, excess)]:
+            entry.unlink(missing_ok=True)
+
+
+@contextmanager
+def recording_cache_hits() -> Iterator[list[str]]:
+    """Collect the keys of LLM responses served from the cache in this context, eg to tell them from real calls."""
+    hits: list[str] = []
+    token = _response_cache_hits.set(hits)
+    try:
+        yield hits
+    finally:
+        _response_cache_hits.reset(token)
+
+
+def extract_script(response_text: str) -> str:
+    """The script between the `[SCRIPT]` markers of an LLM response, or after the only one."""
+    parts = response_text.split(SCRIPT_MARKER)
+    if len(parts) < 2:
+        raise ValueError(f"Unfortunately the LLM response has no {SCRIPT_MARKER} marker: {response_text[:80]!r}")
+    return parts[1]
+
+
+def lookup_script(cache: ResponseCache | None, key: str, bypass_cache: bool = False) -> str | None:
+    """The script of the cached response for `key`, or None when it has to be generated."""
+    if cache is None or bypass_cache:
+        return None
+    cached = cache.get(key)
+    # Responses are validated before they are stored, this only skips entries of older versions
+    if cached is None or SCRIPT_MARKER not in cached:
+        metrics.increment("cache.miss", cache="llm")
+        return None
+    logger.info(f"LLM response cache hit {key[:12]}")
+    metrics.increment("cache.hit", cache="llm")
+    if (hits := _response_cache_hits.get()) is not None:
+        hits.append(key)
+    return extract_script(cached)
+
+
+def store_script(cache: ResponseCache | None, key: str, response_text: str) -> str:
+    """Extract the script from a fresh response, caching the response only when it has one."""
+    script = extract_script(response_text)
+    if cache is not None:
+        cache.set(key, response_text)
+    return script
+
+
+def cached_script(cache: ResponseCache | None, key: str, produce: Callable[[], str], bypass_cache: bool = False) -> str:
+    """Return the script of the cached response for `key`, or call `produce` and cache its response if valid.
+
+    `bypass_cache` skips the lookup but still refreshes the stored entry. A response without a script raises
+    `ValueError` and is not cached, so the next attempt asks the LLM again.
+    """
+    script = lookup_script(cache, key, bypass_cache)
+    if script is not None:
+        return script
+    return store_script(cache, key, produce())
+
+
+async def acached_script(
+    cache: ResponseCache | None, key: str, produce: Callable[[], Awaitable[str]], bypass_cache: bool = False
+) -> str:
+    """Async version of `cached_script` for a coroutine `produce`."""
+    script = lookup_script(cache, key, bypass_cache)
+    if script is not None:
+        return script
+    return store_script(cache, key, await produce())
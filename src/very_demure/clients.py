@@ -0,0 +1,116 @@
+# Standard Library
+import logging
+import threading
+from dataclasses import dataclass, replace
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGION = "us-east-1"
+SDK_BACKEND = "sdk"  # What answers a client that was not overridden, see `providers.client_backend`
+VALID_RETRY_MODES = ["legacy", "standard", "adaptive"]
+
+
+@dataclass(frozen=True)
+class AWSClientSettings:
+    """Connection tuning shared by every AWS client in the process.
+
+    botocore only keeps 10 connections per client by default, which silently queues requests once
+    more threads than that share a client. Size `max_pool_connections` to the peak concurrency.
+    """
+
+    max_pool_connections: int = 16
+    connect_timeout: float = 5
+    read_timeout: float = 60
+    tcp_keepalive: bool = True
+    retry_mode: str = "standard"  # legacy|standard|adaptive
+    max_attempts: int = 3  # Including the first request
+
+    def __post_init__(self):
+        if self.retry_mode not in VALID_RETRY_MODES:
+            raise ValueError(f"Unfortunately {self.retry_mode} is not one of {VALID_RETRY_MODES}")
+        if self.max_pool_connections < 1:
+            raise ValueError("max_pool_connections must be at least 1")
+
+
+_lock = threading.Lock()
+_settings = AWSClientSettings()
+_sessions: dict[str | None, Any] = {}
+_clients: dict[tuple[str, str, str | None, AWSClientSettings], Any] = {}
+
+
+def configure_aws_clients(**changes: Any) -> AWSClientSettings:
+    """Change the settings used for clients created from now on.
+
+    eg `configure_aws_clients(max_pool_connections=32)`. Clients that already exist keep their settings.
+    """
+    global _settings
+    with _lock:
+        _settings = replace(_settings, **changes)
+        return _settings
+
+
+def aws_client_settings() -> AWSClientSettings:
+    return _settings
+
+
+def ensure_pool_size(max_pool_connections: int) -> AWSClientSettings:
+    """Grow the connection pool for clients created from now on to at least `max_pool_connections`."""
+    if max_pool_connections > _settings.max_pool_connections:
+        return configure_aws_clients(max_pool_connections=max_pool_connections)
+    return _settings
+
+
+def botocore_config(client_settings: AWSClientSettings) -> Any:
+    # Third Party
+    from botocore.config import Config
+
+    return Config(
+        max_pool_connections=client_settings.max_pool_connections,
+        connect_timeout=client_settings.connect_timeout,
+        read_timeout=client_settings.read_timeout,
+        tcp_keepalive=client_settings.tcp_keepalive,
+        # botocore's `max_attempts` excludes the first request, `total_max_attempts` includes it
+        retries={"mode": client_settings.retry_mode, "total_max_attempts": client_settings.max_attempts},
+    )
+
+
+def aws_client(
+    service_name: str,
+    region_name: str = DEFAULT_REGION,
+    profile_name: str | None = None,
+    max_attempts: int | None = None,
+) -> Any:
+    """The process wide client for a service, region and credentials profile, created on first use.
+
+    Reusing one client reuses its resolved credentials and its pool of open TLS connections.
+    boto3 clients are thread-safe once created, creating them is not, so creation happens under a lock.
+    `max_attempts` overrides the configured attempts, eg 1 when the caller retries itself.
+    """
+    client_settings = _settings if max_attempts is None else replace(_settings, max_attempts=max_attempts)
+    key = (service_name, region_name, profile_name, client_settings)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            session = _sessions.get(profile_name)
+            if session is None:
+                # Third Party
+                import boto3
+
+                session = _sessions[profile_name] = boto3.Session(profile_name=profile_name)
+            logger.info(f"Creating {service_name} client in {region_name} with {client_settings}")
+            client = _clients[key] = session.client(
+                service_name, region_name=region_name, config=botocore_config(client_settings)
+            )
+    return client
+
+
+def clear_aws_clients() -> None:
+    """Forget every cached session and client, eg after credentials change."""
+    with _lock:
+        _clients.clear()
+        _sessions.clear()
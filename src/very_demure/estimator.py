@@ -0,0 +1,467 @@
+# Standard Library
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+
+# Our Libraries
+from very_demure import metrics
+from very_demure.mp3 import duration_seconds
+from very_demure.schema import VALID_VOICES, SpeechSynthConfig
+from very_demure.ssml import MAX_BREAK_SECONDS, PAUSE_MARKER_PATTERN, compile_ssml
+from very_demure.utils import CALIBRATE_CLI_ARGS_CONFIG, cli_handle_args
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SECONDS_PER_WORD = 60 / 170  # Neural voices at the medium rate
+DEFAULT_SECONDS_PER_SENTENCE = 0.35  # The pause Polly leaves after a sentence
+# Rough speed of each prosody rate relative to medium, until calibration replaces them
+RATE_MULTIPLIERS = {"x-slow": 0.75, "slow": 0.9, "medium": 1.0, "fast": 1.15, "x-fast": 1.35}
+MIN_FIT_SAMPLES = 3  # Fewer samples than this only scale the seconds per word
+
+BREAK_TIME_PATTERN = re.compile('<break time="(\\d+(?:\\.\\d+)?)(ms|s)"', re.IGNORECASE)
+PROSODY_RATE_PATTERN = re.compile('<prosody[^>]*\\srate="([^"]+)"')
+TAG_PATTERN = re.compile("<[^>]+>")
+SENTENCE_END_PATTERN = re.compile("[.!?]+(?=\\s|$)")
+ENTITY_PATTERN = re.compile("&\\w+;")
+
+
+@dataclass(frozen=True)
+class SsmlFeatures:
+    """What the length of a `<speak>` document depends on."""
+
+    words: int
+    sentences: int
+    break_seconds: float
+    rate: str = "medium"
+
+
+def ssml_features(ssml_text: str) -> SsmlFeatures:
+    rate = PROSODY_RATE_PATTERN.search(ssml_text)
+    break_seconds = sum(
+        float(numeric) / (1000 if unit.lower() == "ms" else 1)
+        for numeric, unit in BREAK_TIME_PATTERN.findall(ssml_text)
+    )
+    text = ENTITY_PATTERN.sub(" ", TAG_PATTERN.sub(" ", ssml_text))
+    return SsmlFeatures(
+        words=len(text.split()),
+        sentences=len(SENTENCE_END_PATTERN.findall(text)),
+        break_seconds=break_seconds,
+        rate=rate.group(1) if rate else "medium",
+    )
+
+
+def rate_multiplier(rate: str) -> float:
+    if rate.endswith("%"):
+        return float(rate[:-1]) / 100
+    return RATE_MULTIPLIERS.get(rate, 1.0)
+
+
+@dataclass
+class Calibration:
+    """Running least squares sums fitting `speech seconds = a * words + b * sentences` for one voice and rate."""
+
+    samples: int = 0
+    words_squared: float = 0.0
+    words_sentences: float = 0.0
+    sentences_squared: float = 0.0
+    words_seconds: float = 0.0
+    sentences_seconds: float = 0.0
+
+    def add(self, words: int, sentences: int, speech_seconds: float) -> None:
+        self.samples += 1
+        self.words_squared += words * words
+        self.words_sentences += words * sentences
+        self.sentences_squared += sentences * sentences
+        self.words_seconds += words * speech_seconds
+        self.sentences_seconds += sentences * speech_seconds
+
+    def coefficients(self, default_sentence_seconds: float) -> tuple[float, float] | None:
+        """Seconds per word and per sentence, or None before any samples with words."""
+        if not self.words_squared:
+            return None
+        determinant = self.words_squared * self.sentences_squared - self.words_sentences**2
+        if self.samples >= MIN_FIT_SAMPLES and determinant > 1e-9 * self.words_squared * self.sentences_squared:
+            per_word = (self.words_seconds * self.sentences_squared - self.sentences_seconds * self.words_sentences) / (
+                determinant
+            )
+            per_sentence = (self.sentences_seconds * self.words_squared - self.words_seconds * self.words_sentences) / (
+                determinant
+            )
+            if per_word > 0 and per_sentence >= 0:
+                return per_word, per_sentence
+        # Too few or too similar samples to separate the two, keep the sentence pause and fit the words
+        per_word = (self.words_seconds - default_sentence_seconds * self.words_sentences) / self.words_squared
+        return max(per_word, 0.01), default_sentence_seconds
+
+
+class DurationEstimator:
+    """Predicts how long Polly will take to speak some SSML without synthesizing it.
+
+    Breaks count for their full time, words and sentence endings for seconds learnt per engine, voice and
+    prosody rate from earlier renders or Polly speech marks. Calibrations are kept in `path` if given, and
+    voices without their own calibration borrow the pooled calibration of the other voices at that rate.
+    The SHA-256 of every MP3 learnt from is kept with them, so no render is counted twice.
+    """
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        calibrations: dict[str, Calibration] | None = None,
+        calibrated_audio: set[str] | None = None,
+    ):
+        self.path = Path(path) if path is not None else None
+        self.calibrations = calibrations or {}
+        self.calibrated_audio = calibrated_audio or set()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path) -> "DurationEstimator":
+        path = Path(path)
+        try:
+            stored = json.loads(path.read_text())
+        except FileNotFoundError:
+            stored = {}
+        except json.JSONDecodeError as e:
+            logger.warning(f"Ignoring unreadable duration calibrations in {path}: {e}")
+            stored = {}
+        # Files written before audio was tracked hold only the calibrations
+        calibrations = stored.get("calibrations", stored)
+        return cls(
+            path=path,
+            calibrations={key: Calibration(**values) for key, values in calibrations.items()},
+            calibrated_audio=set(stored.get("calibrated_audio", [])),
+        )
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock:
+            stored = {
+                "calibrations": {key: asdict(value) for key, value in sorted(self.calibrations.items())},
+                "calibrated_audio": sorted(self.calibrated_audio),
+            }
+            content = json.dumps(stored, indent=2)
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "w") as file:
+            file.write(content)
+        Path(tmp_name).replace(self.path)
+
+    @staticmethod
+    def _keys(speech_synth_config: SpeechSynthConfig, rate: str) -> tuple[str, str]:
+        engine = speech_synth_config.engine
+        return f"{engine}:{speech_synth_config.voice}:{rate}", f"{engine}:*:{rate}"
+
+    def coefficients(self, speech_synth_config: SpeechSynthConfig, rate: str) -> tuple[float, float]:
+        """Seconds per word and per sentence for a voice at a prosody rate."""
+        multiplier = rate_multiplier(rate)
+        default_sentence_seconds = DEFAULT_SECONDS_PER_SENTENCE / multiplier
+        with self.lock:
+            for key in self._keys(speech_synth_config, rate):
+                calibration = self.calibrations.get(key)
+                fitted = calibration.coefficients(default_sentence_seconds) if calibration else None
+                if fitted:
+                    return fitted
+        return DEFAULT_SECONDS_PER_WORD / multiplier, default_sentence_seconds
+
+    def estimate(self, ssml_text: str, speech_synth_config: SpeechSynthConfig) -> float:
+        """Predicted seconds of audio for `ssml_text`."""
+        features = ssml_features(ssml_text)
+        per_word, per_sentence = self.coefficients(speech_synth_config, features.rate)
+        return features.break_seconds + features.words * per_word + features.sentences * per_sentence
+
+    def estimate_script(self, script: str, speech_synth_config: SpeechSynthConfig) -> float:
+        """Predicted seconds of audio for a plain text script once compiled to SSML."""
+        ssml_text = "".join(
+            compile_ssml([script], rate=speech_synth_config.voice_speed, pause_mode=speech_synth_config.pause_mode)
+        )
+        return self.estimate(ssml_text, speech_synth_config)
+
+    def calibrate(
+        self, ssml_text: str, speech_synth_config: SpeechSynthConfig, actual_seconds: float, save: bool = True
+    ) -> None:
+        """Learn from `ssml_text` having taken `actual_seconds` to speak."""
+        features = ssml_features(ssml_text)
+        speech_seconds = actual_seconds - features.break_seconds
+        if features.words == 0 or speech_seconds <= 0:
+            return
+        with self.lock:
+            for key in self._keys(speech_synth_config, features.rate):
+                self.calibrations.setdefault(key, Calibration()).add(features.words, features.sentences, speech_seconds)
+        metrics.increment("estimator.calibrations", voice=speech_synth_config.voice)
+        if save:
+            self.save()
+
+    def calibrate_from_audio(
+        self, ssml_text: str, speech_synth_config: SpeechSynthConfig, audio_file: Path, save: bool = True
+    ) -> bool:
+        """Learn from a rendered MP3 of `ssml_text`, unless it was learnt from before. Returns whether it was new."""
+        audio = Path(audio_file).read_bytes()
+        digest = hashlib.sha256(audio).hexdigest()
+        with self.lock:
+            if digest in self.calibrated_audio:
+                return False
+            self.calibrated_audio.add(digest)
+        self.calibrate(ssml_text, speech_synth_config, duration_seconds(audio), save=save)
+        return True
+
+    def calibrate_from_speech_marks(
+        self, ssml_text: str, speech_synth_config: SpeechSynthConfig, speech_marks: list[dict]
+    ) -> None:
+        """Learn from Polly word speech marks for `ssml_text`, which give when each word starts.
+
+        The last word ends about one word after it starts, which is where the audio is taken to end.
+        """
+        times = [mark["time"] for mark in speech_marks if mark.get("type") == "word"]
+        if not times:
+            return
+        per_word, _ = self.coefficients(speech_synth_config, ssml_features(ssml_text).rate)
+        self.calibrate(ssml_text, speech_synth_config, max(times) / 1000 + per_word)
+
+
+def _renders(output_location: Path) -> Iterator[tuple[str, SpeechSynthConfig, Path | None]]:
+    """SSML, config and audio file, if rendered, of each transcript and voice in `output_location`.
+
+    Transcripts are named `<provider>-<model>-<engine>-<duration>-<speed>-<pause mode>-<flavour>.ssml.xml` and
+    their audio `<provider>-<model>-<engine>-<duration>-<speed>-<pause mode>-<voice>-<flavour>.mp3`.
+    """
+    for transcript in sorted(Path(output_location).glob("*.ssml.xml")):
+        name = transcript.name.removesuffix(".ssml.xml")
+        prefix, _, flavour = name.rpartition("-")
+        engine = prefix.split("-")[2] if prefix.count("-") >= 3 else "neural"
+        ssml_text = transcript.read_text()
+        for voice in VALID_VOICES:
+            audio_file = transcript.with_name(f"{prefix}-{voice}-{flavour}.mp3")
+            yield ssml_text, SpeechSynthConfig(engine=engine, voice=voice), audio_file if audio_file.exists() else None
+
+
+def calibrate_from_renders(estimator: DurationEstimator, output_location: Path) -> int:
+    """Calibrate from the transcripts and MP3s of past renders in `output_location`.
+
+    Returns:
+        The renders used, leaving out those the estimator already learnt from, eg in `record_render`.
+    """
+    used = 0
+    for ssml_text, speech_synth_config, audio_file in _renders(output_location):
+        if audio_file is not None:
+            used += estimator.calibrate_from_audio(ssml_text, speech_synth_config, audio_file, save=False)
+    estimator.save()
+    logger.info(f"Calibrated duration estimates from {used} renders in {output_location}")
+    return used
+
+
+@dataclass(frozen=True)
+class FitPolicy:
+    """How far a script may be from its target duration, and how to bring it within that before synthesis.
+
+    A script over the target has its pauses shortened and then lines dropped. One short by up to `pad_limit`
+    of the target has its pauses lengthened, and one shorter than that is extended with a continuation.
+    """
+
+    tolerance: float = 0.1
+    pad_limit: float = 0.25
+    max_continuations: int = 2
+    min_pause_seconds: int = MAX_BREAK_SECONDS
+
+    def __post_init__(self):
+        if not 0 < self.tolerance < 1:
+            raise ValueError(f"Unfortunately {self.tolerance} is not a tolerance between 0 and 1")
+        if self.pad_limit < 0:
+            raise ValueError("pad_limit must not be negative")
+
+
+DEFAULT_FIT_POLICY = FitPolicy()
+
+
+@dataclass(frozen=True)
+class DurationFit:
+    script: str
+    target_seconds: float
+    estimated_seconds: float
+    actions: tuple[str, ...] = ()  # continued, trimmed or padded, in order. Empty when accepted as is
+
+
+def _pause_granularity(speech_synth_config: SpeechSynthConfig) -> int:
+    # Polly breaks are emitted 10s at a time, silence can be any whole number of seconds
+    return 1 if speech_synth_config.pause_mode == "silence" else MAX_BREAK_SECONDS
+
+
+def pause_seconds(script: str) -> list[int]:
+    return [int(numeric) * (60 if unit.lower() == "m" else 1) for numeric, unit in PAUSE_MARKER_PATTERN.findall(script)]
+
+
+def rescale_pauses(script: str, total_seconds: float, granularity: int, min_seconds: int) -> str:
+    """Scale every pause marker so they add up to about `total_seconds`.
+
+    Rounding to `granularity` is carried over to the next pause so the errors do not add up.
+    """
+    current = sum(pause_seconds(script))
+    if not current:
+        return script
+    factor = max(total_seconds, 0) / current
+    carry = 0.0
+
+    def _scale(match: re.Match) -> str:
+        nonlocal carry
+        exact = int(match.group(1)) * (60 if match.group(2).lower() == "m" else 1) * factor + carry
+        scaled = max(min_seconds, round(exact / granularity) * granularity)
+        carry = exact - scaled
+        return f"[PAUSE {scaled}s]"
+
+    return PAUSE_MARKER_PATTERN.sub(_scale, script)
+
+
+def _speech_lines(lines: list[str]) -> list[int]:
+    return [i for i, line in enumerate(lines) if line.strip() and PAUSE_MARKER_PATTERN.sub("", line).strip()]
+
+
+def trim_script(
+    script: str, speech_synth_config: SpeechSynthConfig, estimator: DurationEstimator, target: float, policy: FitPolicy
+) -> str:
+    """Shorten pauses, then drop lines from the end of the body, keeping the opening and closing lines."""
+    excess = estimator.estimate_script(script, speech_synth_config) - target
+    pauses = sum(pause_seconds(script))
+    if pauses:
+        script = rescale_pauses(
+            script, pauses - excess, _pause_granularity(speech_synth_config), policy.min_pause_seconds
+        )
+
+    lines = script.splitlines()
+    while estimator.estimate_script("\n".join(lines), speech_synth_config) > target * (1 + policy.tolerance):
+        speech = _speech_lines(lines)
+        if len(speech) <= 2:
+            break
+        del lines[speech[-2]]
+    return "\n".join(lines)
+
+
+def pad_script(script: str, speech_synth_config: SpeechSynthConfig, shortfall: float, policy: FitPolicy) -> str:
+    """Lengthen pauses by `shortfall` seconds in total, adding them between lines when there are none."""
+    granularity = _pause_granularity(speech_synth_config)
+    pauses = sum(pause_seconds(script))
+    if pauses:
+        return rescale_pauses(script, pauses + shortfall, granularity, policy.min_pause_seconds)
+
+    lines = script.splitlines()
+    gaps = _speech_lines(lines)[:-1] or [len(lines) - 1]
+    seconds = max(granularity, round(shortfall / len(gaps) / granularity) * granularity)
+    for i in reversed(gaps):
+        lines.insert(i + 1, f"[PAUSE {seconds}s]")
+    return "\n".join(lines)
+
+
+def fit_script(
+    script: str,
+    speech_synth_config: SpeechSynthConfig,
+    estimator: DurationEstimator,
+    policy: FitPolicy = DEFAULT_FIT_POLICY,
+    continue_with: Callable[[SpeechSynthConfig], str] | None = None,
+) -> DurationFit:
+    """Bring a script within `policy.tolerance` of `duration_minutes` before any audio is synthesized.
+
+    Args:
+        continue_with: Generates a script for the config given, used to extend a script much too short
+            with one of the missing minutes. Without it short scripts are only padded.
+    """
+    target = float(speech_synth_config.duration_minutes) * 60
+    actions: list[str] = []
+    continuations = 0
+    while True:
+        estimate = estimator.estimate_script(script, speech_synth_config)
+        error = estimate - target
+        if abs(error) <= policy.tolerance * target:
+            break
+        if error > 0:
+            script = trim_script(script, speech_synth_config, estimator, target, policy)
+            actions.append("trimmed")
+            break
+        if -error > policy.pad_limit * target and continue_with and continuations < policy.max_continuations:
+            minutes = max(1, math.ceil(-error / 60))
+            continuation = continue_with(replace(speech_synth_config, duration_minutes=str(minutes)))
+            lines = script.rstrip().splitlines()
+            # Keep the closing line last
+            script = "\n".join([*lines[:-1], continuation.strip(), *lines[-1:]])
+            continuations += 1
+            actions.append("continued")
+            continue
+        script = pad_script(script, speech_synth_config, -error, policy)
+        actions.append("padded")
+        break
+
+    estimate = estimator.estimate_script(script, speech_synth_config)
+    for action in actions:
+        metrics.increment("estimator.fit", action=action)
+    logger.info(f"Script estimated at {estimate:.0f}s for a {target:.0f}s session {'/'.join(actions) or 'accepted'}")
+    return DurationFit(script=script, target_seconds=target, estimated_seconds=estimate, actions=tuple(actions))
+
+
+_estimator: DurationEstimator | None = None
+_policy: FitPolicy | None = None
+
+
+def configure_duration_fit(estimator: DurationEstimator | None, policy: FitPolicy | None = None) -> None:
+    """Fit generated scripts with `policy` and calibrate `estimator` from every render, or stop when None."""
+    global _estimator, _policy
+    _estimator = estimator
+    _policy = policy if estimator is not None else None
+
+
+def duration_fit() -> tuple[DurationEstimator, FitPolicy] | None:
+    if _estimator is None or _policy is None:
+        return None
+    return _estimator, _policy
+
+
+def record_render(ssml_text: str, speech_synth_config: SpeechSynthConfig, audio_file: Path) -> None:
+    """Calibrate the configured estimator from a freshly synthesized file, if there is one.
+
+    The calibration is kept in memory until `save_calibrations`, so synthesis never waits on writing it.
+    """
+    if _estimator is None:
+        return
+    try:
+        _estimator.calibrate_from_audio(ssml_text, speech_synth_config, audio_file, save=False)
+    except Exception as e:
+        logger.warning(f"Could not calibrate duration estimates from {audio_file}: {e}")
+
+
+def save_calibrations() -> None:
+    """Write what the configured estimator learnt from renders, once a session, job or batch is done."""
+    if _estimator is None:
+        return
+    try:
+        _estimator.save()
+    except OSError as e:
+        logger.warning(f"Could not save duration calibrations to {_estimator.path}: {e}")
+
+
+def main(args: list[str]) -> None:
+    """Entrypoint for `python -m very_demure calibrate ./output/`."""
+    # Our Libraries
+    from very_demure.polly import fetch_speech_marks
+
+    cli_args = cli_handle_args(CALIBRATE_CLI_ARGS_CONFIG, args)
+    logger.info(cli_args)
+
+    estimator = DurationEstimator.load(Path(cli_args["cache_dir"]) / "durations.json")
+    calibrate_from_renders(estimator, Path(cli_args["renders"]))
+    if cli_args["speech_marks"]:
+        # Every voice and engine each transcript was rendered with, as their speech marks differ
+        rendered = {
+            (ssml_text, config.voice, config.engine): config
+            for ssml_text, config, audio_file in _renders(Path(cli_args["renders"]))
+            if audio_file is not None
+        }
+        for (ssml_text, _, _), speech_synth_config in rendered.items():
+            chunk, marks = fetch_speech_marks(ssml_text, speech_synth_config)
+            estimator.calibrate_from_speech_marks(chunk, speech_synth_config, marks)
+    for key, calibration in sorted(estimator.calibrations.items()):
+        logger.info(f"{key}: {calibration.samples} samples")
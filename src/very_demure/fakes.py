@@ -0,0 +1,263 @@
+# Standard Library
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, fields
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+# Our Libraries
+from very_demure import metrics
+from very_demure.cache import ResponseCache, cached_script, response_cache_key
+from very_demure.estimator import DurationEstimator
+from very_demure.mp3 import (
+    BITRATES_KBPS,
+    SAMPLE_RATES,
+    encode_frame_header,
+    parse_frame_header,
+)
+from very_demure.providers import override_client
+from very_demure.ratelimit import limited_call
+from very_demure.schema import LLMProviderConfig, SpeechSynthConfig
+
+if TYPE_CHECKING:
+    # Our Libraries
+    from very_demure.pipeline import Clients
+
+logger = logging.getLogger(__name__)
+
+FAKE_BITRATE_KBPS = 48  # What Polly produces for 24kHz mp3, so fake renders write as many bytes as real ones
+FAKE_STREAM_CHUNK_WORDS = 8
+FAKE_SENTENCES = [
+    "Find a comfortable position and let your body settle into the support beneath you.",
+    "Take a slow breath in through your nose, and gently let it go through your mouth.",
+    "Notice the rise and fall of your chest as the breath moves on its own.",
+    "If your attention wanders, simply notice where it went and return to the breath.",
+    "Let your shoulders soften away from your ears.",
+    "Feel the weight of your hands resting where they are.",
+    "There is nothing you need to do in this moment except be here.",
+    "Allow any tension in your jaw to melt away with the next exhale.",
+    "Bring to mind something you are grateful for today, however small.",
+    "Rest in the quiet space between one breath and the next.",
+]
+FAKE_PAUSE_SECONDS = [10, 20, 30, 45, 60]
+# Share of a session spent speaking rather than in pauses, roughly what the real providers write
+FAKE_SPEECH_FRACTION = 0.4
+
+
+class FakeServiceError(Exception):
+    """An error shaped like a botocore `ClientError`, so throttles are retried like real ones."""
+
+    def __init__(self, code: str, status: int, operation: str):
+        super().__init__(f"An error occurred ({code}) when calling the {operation} operation: injected by a fake")
+        self.response = {
+            "Error": {"Code": code, "Message": "injected by a fake"},
+            "ResponseMetadata": {"HTTPStatusCode": status, "HTTPHeaders": {}},
+        }
+
+
+@dataclass(frozen=True)
+class FakeBehaviour:
+    """How a fake backend behaves under load.
+
+    Each call waits a log-normally distributed latency whose median is `latency_seconds` plus
+    `seconds_per_1000_characters` of its input, then fails with probability `throttle_rate` or `error_rate`.
+    """
+
+    latency_seconds: float = 0.0
+    latency_sigma: float = 0.0  # Spread of the log-normal latency, 0 for a constant latency
+    seconds_per_1000_characters: float = 0.0
+    throttle_rate: float = 0.0
+    error_rate: float = 0.0
+
+    def __post_init__(self):
+        if self.latency_seconds < 0 or self.latency_sigma < 0 or self.seconds_per_1000_characters < 0:
+            raise ValueError("Unfortunately fake latencies cannot be negative")
+        if not 0 <= self.throttle_rate + self.error_rate <= 1:
+            raise ValueError("Unfortunately fake throttle and error rates must add up to between 0 and 1")
+
+    @classmethod
+    def from_dict(cls, values: dict[str, Any]) -> "FakeBehaviour":
+        unknown = set(values) - {field.name for field in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unfortunately {sorted(unknown)} are not fake behaviour settings")
+        return cls(**values)
+
+
+DEFAULT_FAKE_BEHAVIOUR = FakeBehaviour()
+
+
+class FakeBackend:
+    """Applies a `FakeBehaviour` to calls, drawing latencies and failures from one seeded generator."""
+
+    def __init__(self, name: str, behaviour: FakeBehaviour = DEFAULT_FAKE_BEHAVIOUR, seed: int = 0):
+        self.name = name
+        self.behaviour = behaviour
+        self.random = random.Random(f"{name}:{seed}")
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def call(self, operation: str, characters: int = 0) -> None:
+        """Wait as long as the call takes, then raise if it was chosen to fail."""
+        behaviour = self.behaviour
+        with self.lock:
+            self.calls += 1
+            spread = self.random.gauss(0, behaviour.latency_sigma) if behaviour.latency_sigma else 0.0
+            outcome = self.random.random()
+        latency = behaviour.latency_seconds * math.exp(spread)
+        latency += behaviour.seconds_per_1000_characters * characters / 1000
+        if latency:
+            time.sleep(latency)
+        if outcome < behaviour.throttle_rate:
+            metrics.increment("fake.injected", backend=self.name, kind="throttle")
+            raise FakeServiceError("ThrottlingException", 400, operation)
+        if outcome < behaviour.throttle_rate + behaviour.error_rate:
+            metrics.increment("fake.injected", backend=self.name, kind="error")
+            raise FakeServiceError("ServiceUnavailableException", 503, operation)
+
+
+def fake_script(speech_synth_config: SpeechSynthConfig, seed: int = 0) -> str:
+    """A script in the shape the real providers write, the same for the same session settings and seed.
+
+    About `FAKE_SPEECH_FRACTION` of the duration is spoken, the rest is `[PAUSE ..]` markers between sentences.
+    """
+    config = speech_synth_config
+    generator = random.Random(f"{seed}:{config.duration_minutes}:{config.flavour}:{config.voice_speed}")
+    total_seconds = float(config.duration_minutes) * 60
+    estimator = DurationEstimator()
+    lines = []
+    spoken = paused = 0.0
+    while spoken + paused < total_seconds:
+        sentence = generator.choice(FAKE_SENTENCES)
+        lines.append(sentence)
+        spoken += estimator.estimate_script(sentence, config)
+        if paused < total_seconds * (1 - FAKE_SPEECH_FRACTION) and generator.random() < 0.5:
+            pause = generator.choice(FAKE_PAUSE_SECONDS)
+            lines.append(f"[PAUSE {pause}s]")
+            paused += pause
+    body = "\n".join(lines)
+    return f"Here is a {config.duration_minutes} minute {config.flavour} meditation.\n[SCRIPT]\n{body}\n[SCRIPT]"
+
+
+class FakeLLM:
+    """Writes `fake_script`s, with the latency and failures of its behaviour."""
+
+    def __init__(self, behaviour: FakeBehaviour = DEFAULT_FAKE_BEHAVIOUR, seed: int = 0):
+        self.backend = FakeBackend("llm", behaviour, seed)
+        self.seed = seed
+
+    def generate(
+        self,
+        llm_config: LLMProviderConfig,
+        speech_synth_config: SpeechSynthConfig,
+        response_cache: ResponseCache | None = None,
+        bypass_cache: bool = False,
+    ) -> str:
+        def _invoke() -> str:
+            return limited_call("fake", llm_config.model_id, lambda: self._respond(speech_synth_config))
+
+        # Cached like the real providers, so warm runs measure the same work
+        config = speech_synth_config
+        prompt = f"{config.duration_minutes}:{config.flavour}:{config.voice_speed}"
+        cache_key = response_cache_key("fake", llm_config.model_id, prompt, {"seed": self.seed})
+        with metrics.span("llm.generate", provider="fake", model=llm_config.model_id):
+            return cached_script(response_cache, cache_key, _invoke, bypass_cache=bypass_cache)
+
+    def stream(self, llm_config: LLMProviderConfig, speech_synth_config: SpeechSynthConfig) -> Iterator[str]:
+        """The raw output with its `[SCRIPT]` markers, a few words at a time once the first token latency passed."""
+        words = limited_call("fake", llm_config.model_id, lambda: self._respond(speech_synth_config)).split(" ")
+        for i in range(0, len(words), FAKE_STREAM_CHUNK_WORDS):
+            yield " ".join(words[i : i + FAKE_STREAM_CHUNK_WORDS]) + (
+                " " if i + FAKE_STREAM_CHUNK_WORDS < len(words) else ""
+            )
+
+    def _respond(self, speech_synth_config: SpeechSynthConfig) -> str:
+        script = fake_script(speech_synth_config, self.seed)
+        self.backend.call("InvokeModel", len(script))
+        return script
+
+
+def fake_mp3(duration_seconds: float, sample_rate: int, bitrate_kbps: int = FAKE_BITRATE_KBPS) -> bytes:
+    """Valid mp3 of silence lasting `duration_seconds`, in frames of the bitrate Polly uses."""
+    version = next(version for version, rates in SAMPLE_RATES.items() if sample_rate in rates)
+    header_bytes = encode_frame_header(
+        version, BITRATES_KBPS[version].index(bitrate_kbps), SAMPLE_RATES[version].index(sample_rate)
+    )
+    header = parse_frame_header(header_bytes)
+    # All zero side info decodes to silence, see `mp3.silent_frame`
+    frame = header_bytes + bytes(header.frame_length - 4)
+    return frame * max(1, round(duration_seconds / header.duration_seconds))
+
+
+class FakePollyClient:
+    """Polly stand in whose mp3 lasts as long as the SSML would be spoken, per `DurationEstimator`."""
+
+    def __init__(self, behaviour: FakeBehaviour = DEFAULT_FAKE_BEHAVIOUR, seed: int = 0):
+        self.backend = FakeBackend("polly", behaviour, seed)
+        self.estimator = DurationEstimator()
+
+    def synthesize_speech(self, Text: str, VoiceId: str, Engine: str, OutputFormat: str, SampleRate: str, **kwargs):
+        if OutputFormat != "mp3":
+            raise ValueError(f"Unfortunately the fake Polly only produces mp3, not {OutputFormat}")
+        self.backend.call("SynthesizeSpeech", len(Text))
+        config = SpeechSynthConfig(engine=Engine, voice=VoiceId, sample_rate=SampleRate)
+        audio = fake_mp3(self.estimator.estimate(Text, config), int(SampleRate))
+        return {"AudioStream": BytesIO(audio), "ContentType": "audio/mpeg", "RequestCharacters": len(Text)}
+
+
+@dataclass(frozen=True)
+class FakeConfig:
+    """Behaviour of the fake backends, read from `--fake-behaviour`, eg
+
+    `{"seed": 7, "llm": {"latency_seconds": 2, "latency_sigma": 0.5}, "polly": {"throttle_rate": 0.01}}`
+    """
+
+    llm: FakeBehaviour = DEFAULT_FAKE_BEHAVIOUR
+    polly: FakeBehaviour = DEFAULT_FAKE_BEHAVIOUR
+    seed: int = 0
+
+
+def load_fake_config(path: str | Path | None) -> FakeConfig:
+    if not path:
+        return FakeConfig()
+    values = json.loads(Path(path).read_text())
+    unknown = set(values) - {"llm", "polly", "seed"}
+    if unknown:
+        raise ValueError(f"Unfortunately {sorted(unknown)} are not fake backends")
+    return FakeConfig(
+        llm=FakeBehaviour.from_dict(values.get("llm", {})),
+        polly=FakeBehaviour.from_dict(values.get("polly", {})),
+        seed=int(values.get("seed", 0)),
+    )
+
+
+_llm = FakeLLM()
+
+
+def configure_fakes(config: FakeConfig, synthesis: bool = False) -> None:
+    """Behave as `config` says from now on, and construct the fake Polly client instead of boto3's when `synthesis`."""
+    global _llm
+    _llm = FakeLLM(config.llm, config.seed)
+    polly_client = FakePollyClient(config.polly, config.seed) if synthesis else None
+    override_client("polly", (lambda region_name: polly_client) if polly_client else None, backend="fake")
+
+
+def fake_generate(
+    llm_config: LLMProviderConfig,
+    speech_synth_config: SpeechSynthConfig,
+    clients: "Clients",
+    response_cache: ResponseCache | None = None,
+    bypass_cache: bool = False,
+) -> str:
+    return _llm.generate(llm_config, speech_synth_config, response_cache=response_cache, bypass_cache=bypass_cache)
+
+
+def fake_stream(
+    llm_config: LLMProviderConfig, speech_synth_config: SpeechSynthConfig, clients: "Clients"
+) -> Iterator[str]:
+    return _llm.stream(llm_config, speech_synth_config)
@@ -0,0 +1,218 @@
+# Standard Library
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any
+
+# Our Libraries
+from very_demure import metrics
+from very_demure.cache import recording_cache_hits
+from very_demure.schema import LLMProviderConfig
+
+logger = logging.getLogger(__name__)
+
+# Primaries and secondaries of concurrent sessions, plus losers still finishing in the background
+DEFAULT_HEDGE_WORKERS = 32
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """When to race a second provider or model against slow or failing script generation.
+
+    Once `min_samples` primary latencies have been seen, the secondary is launched when the primary takes
+    longer than their `percentile`, before that after `initial_delay` seconds. Hedges are capped at `budget`
+    of all requests. A primary that fails always falls back to the secondary, which costs no budget.
+    """
+
+    secondary: LLMProviderConfig
+    percentile: float = 0.95
+    initial_delay: float = 30.0
+    min_samples: int = 20
+    window: int = 200  # Most recent primary latencies kept per provider and model
+    budget: float = 0.1
+
+    def __post_init__(self):
+        if not 0 < self.percentile < 1:
+            raise ValueError(f"Unfortunately {self.percentile} is not a percentile between 0 and 1")
+        if not 0 <= self.budget <= 1:
+            raise ValueError(f"Unfortunately {self.budget} is not a budget between 0 and 1")
+        if self.initial_delay < 0:
+            raise ValueError("initial_delay must not be negative")
+
+
+def parse_llm(value: str) -> LLMProviderConfig:
+    """Parse `provider:model`, eg `openai:gpt-4o` or `bedrock:amazon.titan-text-premier-v1:0`."""
+    provider, _, model_id = value.partition(":")
+    if not provider or not model_id:
+        raise ValueError(f"Unfortunately {value} is not in the form provider:model")
+    return LLMProviderConfig(provider=provider, model_id=model_id)
+
+
+def policy_from_args(cli_args: dict[str, Any]) -> HedgePolicy | None:
+    if not cli_args.get("secondary_llm"):
+        return None
+    return HedgePolicy(
+        secondary=parse_llm(cli_args["secondary_llm"]),
+        percentile=float(cli_args.get("secondary_percentile", 0.95)),
+        budget=float(cli_args.get("secondary_budget", 0.1)),
+    )
+
+
+class LatencyWindow:
+    """The most recent latencies of one provider and model."""
+
+    def __init__(self, size: int):
+        self.latencies: deque[float] = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def percentile(self, percentile: float) -> float | None:
+        with self.lock:
+            ordered = sorted(self.latencies)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+
+class Hedger:
+    """Runs script generation under a `HedgePolicy`, keeping the latency windows, budget and threads between calls."""
+
+    def __init__(self, policy: HedgePolicy, max_workers: int = DEFAULT_HEDGE_WORKERS):
+        self.policy = policy
+        self.lock = threading.Lock()
+        self.windows: dict[str, LatencyWindow] = {}
+        self.requests = 0
+        self.hedges = 0
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def close(self) -> None:
+        """Stop the threads once calls still running in the background have finished."""
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def applies_to(self, llm_config: LLMProviderConfig) -> bool:
+        return llm_config != self.policy.secondary
+
+    def _window(self, name: str) -> LatencyWindow:
+        with self.lock:
+            if name not in self.windows:
+                self.windows[name] = LatencyWindow(self.policy.window)
+            return self.windows[name]
+
+    def deadline(self, name: str) -> float:
+        """Seconds to wait for the primary before hedging."""
+        window = self._window(name)
+        if len(window.latencies) < self.policy.min_samples:
+            return self.policy.initial_delay
+        return window.percentile(self.policy.percentile)
+
+    def _count_request(self) -> None:
+        with self.lock:
+            self.requests += 1
+
+    def _spend_budget(self) -> bool:
+        """Take a hedge from the budget, which allows `budget` of requests rounded up."""
+        with self.lock:
+            if self.hedges >= self.policy.budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def call(
+        self,
+        primary: LLMProviderConfig,
+        generate: Callable[[LLMProviderConfig], str],
+        is_valid: Callable[[str], bool] = lambda script: bool(script and script.strip()),
+    ) -> str:
+        """Return the first valid script from `generate(primary)` or, if that is slow or fails, `generate(secondary)`.
+
+        A running SDK call cannot be interrupted, so the loser is cancelled if it has not started and
+        otherwise left to finish in the background with its result discarded.
+        """
+        name = f"{primary.provider}:{primary.model_id}"
+        secondary_name = f"{self.policy.secondary.provider}:{self.policy.secondary.model_id}"
+        self._count_request()
+        deadline = self.deadline(name)
+        window = self._window(name)
+
+        def _timed_primary(config: LLMProviderConfig) -> str:
+            # Includes primaries that lost, so slow outliers keep raising the deadline. Cache hits are not
+            # provider latencies and would drag the deadline towards zero.
+            start = time.monotonic()
+            with recording_cache_hits() as hits:
+                script = generate(config)
+            if not hits:
+                window.add(time.monotonic() - start)
+            return script
+
+        def _launch(config: LLMProviderConfig, role: str) -> Future:
+            function = _timed_primary if role == "primary" else generate
+            future = self.pool.submit(metrics.in_current_context(function), config)
+            futures[future] = role
+            return future
+
+        futures: dict[Future, str] = {}
+        try:
+            _launch(primary, "primary")
+            done, _ = wait(futures, timeout=deadline)
+            if not done:
+                if self._spend_budget():
+                    logger.info(f"{name} slower than {deadline:.1f}s, hedging with {secondary_name}")
+                    metrics.increment("hedge.fired", primary=name, secondary=secondary_name)
+                    _launch(self.policy.secondary, "secondary")
+                else:
+                    metrics.increment("hedge.budget_exhausted", primary=name)
+            return self._first_valid(futures, _launch, is_valid, name, secondary_name)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _first_valid(
+        self,
+        futures: dict[Future, str],
+        launch: Callable[[LLMProviderConfig, str], Future],
+        is_valid: Callable[[str], bool],
+        name: str,
+        secondary_name: str,
+    ) -> str:
+        errors: list[Exception] = []
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                role = futures[future]
+                try:
+                    script = future.result()
+                    if is_valid(script):
+                        metrics.increment("hedge.won", primary=name, winner=role)
+                        return script
+                    raise ValueError(f"{role} returned an invalid script")
+                except Exception as e:
+                    logger.warning(f"{role} script generation failed: {e}")
+                    errors.append(e)
+                if role == "primary" and "secondary" not in futures.values():
+                    metrics.increment("hedge.fallback", primary=name, secondary=secondary_name)
+                    pending.add(launch(self.policy.secondary, "secondary"))
+        raise errors[0]
+
+
+_hedger: Hedger | None = None
+
+
+def configure_hedging(policy: HedgePolicy | None) -> Hedger | None:
+    """Hedge script generation with `policy` from now on, or stop hedging when it is None."""
+    global _hedger
+    if _hedger is not None:
+        _hedger.close()
+    _hedger = Hedger(policy) if policy is not None else None
+    return _hedger
+
+
+def hedger() -> Hedger | None:
+    return _hedger
@@ -0,0 +1,197 @@
+# Standard Library
+import atexit
+import contextlib
+import hashlib
+import json
+import logging
+import queue
+import random
+import sys
+from collections.abc import Iterator
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, TextIO
+
+# Our Libraries
+from very_demure.utils import ISO8601_DATE_FORMAT, LOG_FORMAT, cli_resolve_env_var
+
+if TYPE_CHECKING:
+    # Standard Library
+    from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_MODES = ["off", "sampled", "full"]
+DEFAULT_PAYLOAD_SAMPLE_RATE = 0.01
+DEFAULT_PAYLOAD_MAX_CHARACTERS = 512
+# Attributes every LogRecord has, anything else was passed as `extra`
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_job_id: ContextVar[str | None] = ContextVar("very_demure_job_id", default=None)
+
+
+@contextlib.contextmanager
+def job(job_id: str) -> Iterator[str]:
+    """Tag every log record in this context, and in thread pools via `metrics.in_current_context`, with `job_id`."""
+    token = _job_id.set(job_id)
+    try:
+        yield job_id
+    finally:
+        _job_id.reset(token)
+
+
+def current_job_id() -> str | None:
+    return _job_id.get()
+
+
+class JobIdFilter(logging.Filter):
+    """Stamps records with the job id of the thread that logged them, before they cross the queue."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.job_id = _job_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the job id and any `extra` fields such as a payload summary."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+@dataclass(frozen=True)
+class PayloadPolicy:
+    """Whether prompts, responses and SSML are logged: never, for a random `sample_rate` of them, or always.
+
+    Logged payloads are cut to `max_characters` and identified by their length and SHA-256.
+    """
+
+    mode: str = "sampled"
+    sample_rate: float = DEFAULT_PAYLOAD_SAMPLE_RATE
+    max_characters: int = DEFAULT_PAYLOAD_MAX_CHARACTERS
+
+    def __post_init__(self):
+        if self.mode not in PAYLOAD_MODES:
+            raise ValueError(f"Unfortunately {self.mode} is not one of {PAYLOAD_MODES}.")
+        if not 0 <= self.sample_rate <= 1:
+            raise ValueError("Unfortunately the payload sample rate must be between 0 and 1")
+
+
+PRODUCTION_PAYLOAD_POLICY = PayloadPolicy(mode="off")
+_payload_policy = PayloadPolicy()
+
+
+def configure_payload_logging(policy: PayloadPolicy) -> None:
+    global _payload_policy
+    _payload_policy = policy
+
+
+def payload_policy() -> PayloadPolicy:
+    return _payload_policy
+
+
+def log_payload(payload_logger: logging.Logger, name: str, text: str, level: int = logging.DEBUG) -> None:
+    """Log a large payload, eg a prompt, truncated and hashed, if the policy and level allow it.
+
+    Checks are ordered cheapest first so payloads that are not logged cost no hashing or formatting.
+    """
+    policy = _payload_policy
+    if policy.mode == "off" or not payload_logger.isEnabledFor(level):
+        return
+    if policy.mode == "sampled" and random.random() >= policy.sample_rate:
+        return
+    sha256 = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    excerpt = text[: policy.max_characters]
+    payload_logger.log(
+        level,
+        "%s of %d characters sha256 %s: %r%s",
+        name,
+        len(text),
+        sha256[:12],
+        excerpt,
+        "..." if len(excerpt) < len(text) else "",
+        extra={"payload": {"name": name, "characters": len(text), "sha256": sha256, "excerpt": excerpt}},
+        stacklevel=2,
+    )
+
+
+_listener: "QueueListener | None" = None
+_queue_handler: "QueueHandler | None" = None
+
+
+def configure_logging(
+    level: int | str = logging.INFO,
+    json_format: bool = False,
+    payloads: PayloadPolicy | None = None,
+    stream: TextIO | None = None,
+) -> "QueueListener":
+    """Send records through a queue to a background thread that formats and writes them.
+
+    Logging threads only stamp the job id and enqueue, so slow terminals, pipes and log agents never stall a render.
+    Calling it again replaces the previous configuration, other handlers on the root logger are left alone.
+    """
+    # Standard Library
+    from logging.handlers import QueueHandler, QueueListener
+
+    global _listener, _queue_handler
+    shutdown_logging()
+    configure_payload_logging(payloads or PayloadPolicy())
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT, ISO8601_DATE_FORMAT))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(records)
+    _queue_handler.addFilter(JobIdFilter())
+    _listener = QueueListener(records, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Write every queued record and stop the background thread."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def configure_logging_from_env() -> "QueueListener":
+    """Configure logging from `VERYDEMURE_` environment variables, so it applies before arguments are parsed.
+
+    `VERYDEMURE_ENV=production` switches to JSON logs without payloads unless `VERYDEMURE_LOG_FORMAT` (text|json)
+    or `VERYDEMURE_LOG_PAYLOADS` (off|sampled|full) say otherwise. `VERYDEMURE_LOG_LEVEL` and
+    `VERYDEMURE_LOG_PAYLOAD_SAMPLE_RATE` tune the rest.
+    """
+    production = (cli_resolve_env_var("env") or "").lower() == "production"
+    default_policy = PRODUCTION_PAYLOAD_POLICY if production else PayloadPolicy()
+    sample_rate = cli_resolve_env_var("log_payload_sample_rate")
+    payloads = PayloadPolicy(
+        mode=cli_resolve_env_var("log_payloads") or default_policy.mode,
+        sample_rate=float(sample_rate) if sample_rate else default_policy.sample_rate,
+    )
+    log_format = cli_resolve_env_var("log_format") or ("json" if production else "text")
+    return configure_logging(
+        level=(cli_resolve_env_var("log_level") or "INFO").upper(), json_format=log_format == "json", payloads=payloads
+    )
@@ -0,0 +1,195 @@
+# Standard Library
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+# Our Libraries
+from very_demure import logs
+
+logger = logging.getLogger(__name__)
+
+# The span enclosing the current code, so nested spans record their parent
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed stage of a render. Attributes can be added while it is open with `set`."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "attributes", "start_ns", "status")
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.status = "OK"
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+class _NoopSpan:
+    """Shared stand in for `Span` while metrics are disabled."""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JsonLinesExporter:
+    """Append spans and counters to a JSON lines file.
+
+    Records use OpenTelemetry field names (`trace_id`, `span_id`, `parent_span_id`, `start_time_unix_nano`,
+    `end_time_unix_nano`, `attributes`, `status`) so they can be loaded by OTLP/JSON tooling with light mapping.
+    Counters are aggregated in memory per name and attribute set and written on `flush`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.counters: Counter[tuple[str, tuple[tuple[str, Any], ...]]] = Counter()
+        self.file = self.path.open("a")
+
+    def export_span(self, span: Span, end_ns: int) -> None:
+        record = {
+            "type": "span",
+            "name": span.name,
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_span_id": span.parent_span_id,
+            "start_time_unix_nano": span.start_ns,
+            "end_time_unix_nano": end_ns,
+            "duration_seconds": (end_ns - span.start_ns) / 1e9,
+            "attributes": span.attributes,
+            "status": span.status,
+        }
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            if not self.file.closed:  # Spans still open in other threads after shutdown are dropped
+                self.file.write(line)
+
+    def add(self, name: str, value: float, attributes: dict[str, Any]) -> None:
+        with self.lock:
+            self.counters[(name, tuple(sorted(attributes.items())))] += value
+
+    def flush(self) -> None:
+        with self.lock:
+            now = time.time_ns()
+            for (name, attributes), value in sorted(self.counters.items()):
+                record = {
+                    "type": "counter",
+                    "name": name,
+                    "value": value,
+                    "attributes": dict(attributes),
+                    "time_unix_nano": now,
+                }
+                self.file.write(json.dumps(record, default=str) + "\n")
+            self.counters.clear()
+            self.file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.file.close()
+
+
+_exporter: JsonLinesExporter | None = None
+
+
+def configure(metrics_out: str | Path | None) -> JsonLinesExporter | None:
+    """Send spans and counters to a JSON lines file, or disable metrics entirely when `metrics_out` is empty."""
+    global _exporter
+    shutdown()
+    if metrics_out:
+        _exporter = JsonLinesExporter(Path(metrics_out))
+        logger.info(f"Writing metrics to {metrics_out}")
+    return _exporter
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def flush() -> None:
+    """Write the counters aggregated so far, for long running processes that never shut down between renders."""
+    exporter = _exporter
+    if exporter is not None:
+        exporter.flush()
+
+
+def shutdown() -> None:
+    """Write aggregated counters and close the exporter. Metrics are disabled afterwards."""
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+        _exporter = None
+
+
+@contextmanager
+def _span(exporter: JsonLinesExporter, name: str, attributes: dict[str, Any]) -> Iterator[Span]:
+    span = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "ERROR"
+        span.attributes["exception"] = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        exporter.export_span(span, time.time_ns())
+
+
+class _NoopSpanContext:
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopSpan:
+        return NOOP_SPAN
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NOOP_SPAN_CONTEXT = _NoopSpanContext()
+
+
+def span(name: str, **attributes: Any):
+    """Time the enclosed block as a stage named `name`, eg `with span("polly.synthesize", voice="Amy"):`.
+
+    While metrics are disabled this returns a shared no-op context manager.
+    """
+    exporter = _exporter
+    if exporter is None:
+        return _NOOP_SPAN_CONTEXT
+    return _span(exporter, name, attributes)
+
+
+def in_current_context(function: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap `function` so it runs in a copy of the caller's context, keeping span parents and job ids across pools."""
+    if _exporter is None and logs.current_job_id() is None:
+        return function
+    context = contextvars.copy_context()
+    # Each call gets its own copy as one context cannot be entered by several threads at once
+    return lambda *args, **kwargs: context.copy().run(function, *args, **kwargs)
+
+
+def increment(name: str, value: float = 1, **attributes: Any) -> None:
+    """Add `value` to the counter `name` for this combination of attributes."""
+    exporter = _exporter
+    if exporter is None or not value:
+        return
+    exporter.add(name, value, attributes)
@@ -0,0 +1,228 @@
+# Standard Library
+import logging
+import struct
+from collections.abc import Iterator
+from dataclasses import dataclass
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Only MPEG Layer III is supported as that is all Polly produces.
+# http://www.mp3-tech.org/programmer/frame_header.html
+MPEG1 = 3
+MPEG2 = 2
+MPEG25 = 0
+LAYER3 = 1
+MONO = 3
+
+BITRATES_KBPS = {
+    MPEG1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    MPEG2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    MPEG25: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+SAMPLE_RATES = {
+    MPEG1: [44100, 48000, 32000],
+    MPEG2: [22050, 24000, 16000],
+    MPEG25: [11025, 12000, 8000],
+}
+
+ID3V2_HEADER_SIZE = 10
+ID3V1_TAG_SIZE = 128
+# Xing/Info header flags for the fields written after the tag, the frame count and then the byte count
+XING_FRAMES_FLAG = 0x1
+XING_BYTES_FLAG = 0x2
+
+
+@dataclass(frozen=True)
+class FrameHeader:
+    version: int
+    bitrate_kbps: int
+    sample_rate: int
+    padding: int
+    channel_mode: int
+
+    @property
+    def samples_per_frame(self) -> int:
+        return 1152 if self.version == MPEG1 else 576
+
+    @property
+    def frame_length(self) -> int:
+        coefficient = 144 if self.version == MPEG1 else 72
+        return coefficient * self.bitrate_kbps * 1000 // self.sample_rate + self.padding
+
+    @property
+    def side_info_length(self) -> int:
+        if self.version == MPEG1:
+            return 17 if self.channel_mode == MONO else 32
+        return 9 if self.channel_mode == MONO else 17
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.samples_per_frame / self.sample_rate
+
+
+def parse_frame_header(data: bytes | memoryview, offset: int = 0) -> FrameHeader | None:
+    """Decode the 4 byte MPEG audio frame header at `offset`, or None if it is not a valid Layer III header."""
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset], data[offset + 1], data[offset + 2], data[offset + 3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = (b1 >> 3) & 0b11
+    layer = (b1 >> 1) & 0b11
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0b11
+    if version not in BITRATES_KBPS or layer != LAYER3 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    return FrameHeader(
+        version=version,
+        bitrate_kbps=BITRATES_KBPS[version][bitrate_index],
+        sample_rate=SAMPLE_RATES[version][sample_rate_index],
+        padding=(b2 >> 1) & 0b1,
+        channel_mode=b3 >> 6,
+    )
+
+
+def id3v2_length(data: bytes | memoryview) -> int:
+    """Length of a leading ID3v2 tag including its header, or 0 if there is none."""
+    if len(data) < ID3V2_HEADER_SIZE or bytes(data[:3]) != b"ID3":
+        return 0
+    # Tag size is a 28 bit "synchsafe" integer, 7 bits per byte.
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = ID3V2_HEADER_SIZE if data[5] & 0x10 else 0
+    return ID3V2_HEADER_SIZE + size + footer
+
+
+def synchsafe(value: int) -> bytes:
+    """Encode a 28 bit integer 7 bits per byte, as ID3v2 sizes are."""
+    return bytes((value >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def id3v2_tag(title: str) -> bytes:
+    """A minimal ID3v2.4 tag holding only the UTF-8 title."""
+    text = b"\x03" + title.encode("utf-8")  # 3 marks UTF-8 text
+    frame = b"TIT2" + synchsafe(len(text)) + b"\x00\x00" + text
+    return b"ID3\x04\x00\x00" + synchsafe(len(frame)) + frame
+
+
+def is_info_frame(frame: bytes | memoryview, header: FrameHeader) -> bool:
+    """True if the frame carries a Xing/Info or VBRI metadata header rather than audio."""
+    xing_offset = 4 + header.side_info_length
+    tag = bytes(frame[xing_offset : xing_offset + 4])
+    return tag in (b"Xing", b"Info") or bytes(frame[36:40]) == b"VBRI"
+
+
+def iter_frames(data: bytes | memoryview) -> Iterator[tuple[FrameHeader, memoryview]]:
+    """Yield each audio frame in an MP3 byte string without decoding it.
+
+    ID3v2/ID3v1 tags and Xing/Info/VBRI metadata frames are skipped, as is any junk
+    between frames, so the yielded frames can be concatenated with frames from other files.
+    """
+    view = memoryview(data)
+    end = len(view)
+    if end >= ID3V1_TAG_SIZE and bytes(view[end - ID3V1_TAG_SIZE : end - ID3V1_TAG_SIZE + 3]) == b"TAG":
+        end -= ID3V1_TAG_SIZE
+
+    offset = id3v2_length(view)
+    first_frame = True
+    while offset + 4 <= end:
+        header = parse_frame_header(view, offset)
+        if header is None or offset + header.frame_length > end:
+            offset += 1  # Resynchronise on the next frame header
+            continue
+
+        frame = view[offset : offset + header.frame_length]
+        offset += header.frame_length
+        if first_frame:
+            first_frame = False
+            if is_info_frame(frame, header):
+                continue
+        yield header, frame
+
+
+def duration_seconds(data: bytes | memoryview) -> float:
+    """Exact duration of an MP3 computed from its frame headers."""
+    return sum(header.duration_seconds for header, _ in iter_frames(data))
+
+
+def encode_frame_header(version: int, bitrate_index: int, sample_rate_index: int, channel_mode: int = MONO) -> bytes:
+    """Build a Layer III frame header without CRC protection or padding."""
+    return bytes(
+        [
+            0xFF,
+            0xE0 | (version << 3) | (LAYER3 << 1) | 0b1,
+            (bitrate_index << 4) | (sample_rate_index << 2),
+            channel_mode << 6,
+        ]
+    )
+
+
+def info_frame(template: FrameHeader, frame_count: int, byte_count: int, vbr: bool = False) -> bytes:
+    """A Xing (or for constant bitrate audio, Info) metadata frame giving players the exact length of a file.
+
+    Args:
+        template: Header of the audio frames, whose version, sample rate and channel mode the frame shares.
+        frame_count: Number of audio frames, not counting this one.
+        byte_count: Size of the audio in bytes, counting this frame but not any ID3 tags.
+        vbr: Whether the audio frames have more than one bitrate.
+    """
+    sample_rate_index = SAMPLE_RATES[template.version].index(template.sample_rate)
+    body = struct.pack(">4sIII", b"Xing" if vbr else b"Info", XING_FRAMES_FLAG | XING_BYTES_FLAG, frame_count, 0)
+    bitrates = BITRATES_KBPS[template.version]
+    # Players estimating constant bitrate audio read the bitrate from this frame, so prefer the audio's own
+    for bitrate_index in [bitrates.index(template.bitrate_kbps), *range(1, len(bitrates))]:
+        header_bytes = encode_frame_header(template.version, bitrate_index, sample_rate_index, template.channel_mode)
+        header = parse_frame_header(header_bytes)
+        if header.frame_length >= 4 + header.side_info_length + len(body):
+            body = body[:-4] + struct.pack(">I", byte_count + header.frame_length)
+            frame = header_bytes + bytes(header.side_info_length) + body
+            return frame + bytes(header.frame_length - len(frame))
+    raise ValueError(f"No bitrate can hold an info frame at {template.sample_rate}Hz.")  # pragma: no cover
+
+
+@lru_cache
+def silent_frame(sample_rate: int, channel_mode: int = MONO, bitrate_kbps: int | None = None) -> bytes:
+    """A valid frame at `sample_rate` that decodes to silence, the smallest one unless `bitrate_kbps` is given.
+
+    An all zero side info block means no Huffman coded data and a global gain of zero,
+    so every decoder outputs digital silence for the frame.
+    """
+    version = next((version for version, rates in SAMPLE_RATES.items() if sample_rate in rates), None)
+    if version is None:
+        raise ValueError(f"{sample_rate}Hz is not a valid MPEG audio sample rate.")
+    bitrates = BITRATES_KBPS[version]
+    if bitrate_kbps is not None and bitrate_kbps not in bitrates[1:]:
+        raise ValueError(f"Unfortunately {bitrate_kbps}kbps is not one of {bitrates[1:]} at {sample_rate}Hz.")
+
+    sample_rate_index = SAMPLE_RATES[version].index(sample_rate)
+    candidates = range(1, len(bitrates)) if bitrate_kbps is None else [bitrates.index(bitrate_kbps)]
+    for bitrate_index in candidates:
+        header_bytes = encode_frame_header(version, bitrate_index, sample_rate_index, channel_mode)
+        header = parse_frame_header(header_bytes)
+        if header.frame_length >= 4 + header.side_info_length:
+            return header_bytes + bytes(header.frame_length - 4)
+    raise ValueError(f"No bitrate can hold a frame at {sample_rate}Hz.")  # pragma: no cover
+
+
+@lru_cache(maxsize=256)
+def silence(duration_ms: int, sample_rate: int, channel_mode: int = MONO, bitrate_kbps: int | None = None) -> bytes:
+    """Precomputed MP3 silence of (to the nearest frame) `duration_ms` milliseconds.
+
+    Splice silence into audio at that audio's `bitrate_kbps`. Frames of another bitrate make the file variable
+    bitrate, which players estimating its length from the first frame's bitrate get wrong.
+    """
+    frame = silent_frame(sample_rate, channel_mode, bitrate_kbps)
+    samples_per_frame = parse_frame_header(frame).samples_per_frame
+    frame_count = round(duration_ms * sample_rate / (1000 * samples_per_frame))
+    return frame * frame_count
+
+
+def first_bitrate_kbps(data: bytes | memoryview) -> int | None:
+    """Bitrate of the first audio frame in `data`, or None when there is none."""
+    for header, _ in iter_frames(data):
+        return header.bitrate_kbps
+    return None
@@ -1,33 +1,115 @@
 # Standard Library
+import json
 import logging
-
-# Third Party
-from openai import OpenAI
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any
 
 # Our Libraries
+from very_demure import metrics
+from very_demure.cache import (
+    ResponseCache,
+    acached_script,
+    cached_script,
+    response_cache_key,
+)
+from very_demure.logs import log_payload
 from very_demure.prompt import generate_prompt
+from very_demure.ratelimit import alimited_call, limited_call, rate_limiter
 from very_demure.schema import DEFAULT_SPEECH_CONFIG, SpeechSynthConfig
 
+if TYPE_CHECKING:
+    # Third Party
+    from openai import AsyncOpenAI, OpenAI
+
 logger = logging.getLogger(__name__)
 
 
 def generate_mindfulness_script(
-    client: OpenAI, model: str = "gpt-4o", speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG
+    client: "OpenAI",
+    model: str = "gpt-4o",
+    speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG,
+    cache: ResponseCache | None = None,
+    bypass_cache: bool = False,
 ) -> str:
-    """Use the OpenAI models to generate a guided mindfulness script."""
+    """Use the OpenAI models to generate a guided mindfulness script.
+
+    Identical prompts for the same model are served from `cache` when provided.
+    """
+    messages = build_messages(speech_synth_config)
+
+    def _create() -> str:
+        completion = limited_call(
+            "openai", model, lambda: client.chat.completions.create(model=model, messages=messages)
+        )
+        return _response_text(completion, model)
+
+    cache_key = response_cache_key("openai", model, json.dumps(messages), None)
+    with metrics.span("llm.generate", provider="openai", model=model):
+        return cached_script(cache, cache_key, _create, bypass_cache=bypass_cache)
+
+
+async def agenerate_mindfulness_script(
+    client: "AsyncOpenAI",
+    model: str = "gpt-4o",
+    speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG,
+    cache: ResponseCache | None = None,
+    bypass_cache: bool = False,
+) -> str:
+    """Async version of `generate_mindfulness_script` using the `AsyncOpenAI` client."""
+    messages = build_messages(speech_synth_config)
+
+    async def _create() -> str:
+        with metrics.span("llm.generate", provider="openai", model=model):
+            completion = await alimited_call(
+                "openai", model, lambda: client.chat.completions.create(model=model, messages=messages)
+            )
+        return _response_text(completion, model)
+
+    cache_key = response_cache_key("openai", model, json.dumps(messages), None)
+    return await acached_script(cache, cache_key, _create, bypass_cache=bypass_cache)
+
+
+def _response_text(completion: Any, model: str) -> str:
+    record_usage(completion, model)
+    response_text = completion.choices[0].message.content
+    log_payload(logger, "openai response", response_text)
+    return response_text
+
+
+def stream_mindfulness_script(
+    client: "OpenAI", model: str = "gpt-4o", speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG
+) -> Iterator[str]:
+    """Stream the raw completion text as the model generates it, including the `[SCRIPT]` markers."""
+    messages = build_messages(speech_synth_config)
+    stream = limited_call(
+        "openai", model, lambda: client.chat.completions.create(model=model, messages=messages, stream=True)
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def record_usage(completion: Any, model: str) -> None:
+    """Count the prompt and completion tokens OpenAI reports for a completion against metrics and the token quota."""
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    metrics.increment("llm.tokens", prompt_tokens, model=model, kind="input")
+    metrics.increment("llm.tokens", completion_tokens, model=model, kind="output")
+    limiter = rate_limiter("openai", model)
+    if limiter is not None:
+        limiter.record_tokens(prompt_tokens + completion_tokens)
+
+
+def build_messages(speech_synth_config: SpeechSynthConfig) -> list[dict[str, str]]:
     prompt = generate_prompt(speech_synth_config=speech_synth_config)
 
-    messages = [
+    return [
         {"role": "system", "content": "You are a helpful assistant."},
         {
             "role": "user",
             "content": prompt,
         },
     ]
-
-    completion = client.chat.completions.create(
-        model=model,
-        messages=messages,
-    )
-
-    return completion.choices[0].message.content.split("[SCRIPT]")[1]
@@ -0,0 +1,214 @@
+# Standard Library
+import logging
+import threading
+from collections.abc import Callable, Iterator
+from dataclasses import replace
+from pathlib import Path
+from typing import Any
+
+# Our Libraries
+from very_demure import metrics
+from very_demure.cache import ResponseCache
+from very_demure.clients import configure_aws_clients, ensure_pool_size
+from very_demure.estimator import (
+    DurationEstimator,
+    FitPolicy,
+    configure_duration_fit,
+    duration_fit,
+    fit_script,
+)
+from very_demure.hedging import configure_hedging, hedger, policy_from_args
+from very_demure.polly import SynthesisTaskConfig, configure_synthesis_tasks
+from very_demure.providers import (
+    DEFAULT_REGION,
+    create_client,
+    get_llm_provider,
+    override_client,
+)
+from very_demure.ratelimit import configure_rate_limits, load_rate_limits
+from very_demure.schema import (
+    DEFAULT_SPEECH_CONFIG,
+    LLMProviderConfig,
+    SpeechSynthConfig,
+)
+from very_demure.segments import SegmentStore, configure_segment_store
+from very_demure.ssml import compile_ssml
+from very_demure.utils import sanitise_model_name
+
+logger = logging.getLogger(__name__)
+
+CLIENT_NAMES = ("openai", "polly", "bedrock_runtime", "async_openai")
+
+
+class Clients:
+    """API clients shared by every render in a process. boto3 and OpenAI clients are thread-safe.
+
+    Clients passed in are used as is. With a `factory`, any client not passed in is constructed on
+    first use, so a run only pays for the SDKs and connections it actually needs.
+    """
+
+    def __init__(
+        self,
+        openai: Any = None,
+        polly: Any = None,
+        bedrock_runtime: Any = None,
+        async_openai: Any = None,
+        factory: Callable[[str], Any] | None = None,
+    ):
+        self._clients = {
+            "openai": openai,
+            "polly": polly,
+            "bedrock_runtime": bedrock_runtime,
+            "async_openai": async_openai,
+        }
+        self._factory = factory
+        self._lock = threading.Lock()
+
+    def _get(self, name: str) -> Any:
+        client = self._clients[name]
+        if client is None and self._factory is not None:
+            # Constructing boto3 clients from a shared session is not thread-safe
+            with self._lock:
+                client = self._clients[name]
+                if client is None:
+                    client = self._clients[name] = self._factory(name)
+        return client
+
+    @property
+    def openai(self) -> Any:
+        return self._get("openai")
+
+    @property
+    def polly(self) -> Any:
+        return self._get("polly")
+
+    @property
+    def bedrock_runtime(self) -> Any:
+        return self._get("bedrock_runtime")
+
+    @property
+    def async_openai(self) -> Any:
+        return self._get("async_openai")
+
+
+def create_clients(region_name: str = DEFAULT_REGION) -> Clients:
+    """Clients constructed on first use. See `.env.sample` for assumed environment variables for credentials."""
+    return Clients(factory=lambda name: create_client(name, region_name=region_name))
+
+
+def configure_services(cli_args: dict[str, Any], max_pool_connections: int) -> None:
+    """Apply the client tuning, rate limit, hedging and synthesis options every command shares."""
+    configure_aws_clients(retry_mode=cli_args.get("retry_mode", "standard"))
+    ensure_pool_size(max_pool_connections)
+    if cli_args.get("rate_limits"):
+        configure_rate_limits(load_rate_limits(cli_args["rate_limits"]))
+    configure_hedging(policy_from_args(cli_args))
+    if cli_args.get("synthesis") == "fake" or cli_args.get("fake_behaviour"):
+        # Our Libraries
+        from very_demure.fakes import configure_fakes, load_fake_config
+
+        configure_fakes(load_fake_config(cli_args.get("fake_behaviour")), synthesis=cli_args.get("synthesis") == "fake")
+    else:
+        override_client("polly", None)
+    if cli_args.get("synthesis", "sync") == "task":
+        if not cli_args.get("task_bucket"):
+            raise ValueError("Unfortunately --synthesis task needs a --task-bucket to write to")
+        configure_synthesis_tasks(SynthesisTaskConfig(output_bucket=cli_args["task_bucket"]))
+    else:
+        configure_synthesis_tasks(None)
+    if cli_args.get("segment_cache"):
+        segments_dir = Path(cli_args.get("cache_dir", ".cache/very_demure/")) / "segments"
+        configure_segment_store(SegmentStore(segments_dir))
+    else:
+        configure_segment_store(None)
+    if cli_args.get("fit_duration"):
+        estimator = DurationEstimator.load(Path(cli_args.get("cache_dir", ".cache/very_demure/")) / "durations.json")
+        configure_duration_fit(estimator, FitPolicy(tolerance=float(cli_args.get("duration_tolerance", 0.1))))
+    else:
+        configure_duration_fit(None)
+
+
+def _session_name(llm_config: LLMProviderConfig, speech_synth_config: SpeechSynthConfig) -> str:
+    """Everything but the voice and flavour that changes a render, with each part free of `-`."""
+    ss_conf = speech_synth_config
+    model_name = sanitise_model_name(llm_config.model_id)
+    speed = sanitise_model_name(ss_conf.voice_speed)
+    return (
+        f"{llm_config.provider}-{model_name}-{ss_conf.engine}-{ss_conf.duration_minutes}-{speed}-{ss_conf.pause_mode}"
+    )
+
+
+def script_output_name(llm_config: LLMProviderConfig, speech_synth_config: SpeechSynthConfig) -> str:
+    return f"{_session_name(llm_config, speech_synth_config)}-{speech_synth_config.flavour}"
+
+
+def audio_output_name(llm_config: LLMProviderConfig, speech_synth_config: SpeechSynthConfig) -> str:
+    ss_conf = speech_synth_config
+    return f"{_session_name(llm_config, ss_conf)}-{ss_conf.voice}-{ss_conf.flavour}"
+
+
+def script_group_key(
+    llm_config: LLMProviderConfig, speech_synth_config: SpeechSynthConfig
+) -> tuple[LLMProviderConfig, SpeechSynthConfig]:
+    """Sessions that only differ by voice share the same generated script."""
+    return llm_config, replace(speech_synth_config, voice=DEFAULT_SPEECH_CONFIG.voice)
+
+
+def generate_script(
+    llm_config: LLMProviderConfig,
+    speech_synth_config: SpeechSynthConfig,
+    clients: Clients,
+    response_cache: ResponseCache | None = None,
+    bypass_cache: bool = False,
+) -> str:
+    """Generate a mindfulness script with whichever LLM provider is configured.
+
+    With hedging configured, a slow or failed generation is raced against or replaced by the secondary provider.
+    With duration fitting configured, the script is trimmed, padded or continued to its duration before returning.
+    """
+
+    def _generate(ss_config: SpeechSynthConfig) -> str:
+        def _generate_with(config: LLMProviderConfig) -> str:
+            return get_llm_provider(config.provider).generate(
+                config, ss_config, clients, response_cache=response_cache, bypass_cache=bypass_cache
+            )
+
+        active_hedger = hedger()
+        if active_hedger is None or not active_hedger.applies_to(llm_config):
+            return _generate_with(llm_config)
+        return active_hedger.call(llm_config, _generate_with)
+
+    script = _generate(speech_synth_config)
+    fitting = duration_fit()
+    if fitting is None:
+        return script
+    estimator, policy = fitting
+    with metrics.span("script.fit", duration=speech_synth_config.duration_minutes):
+        return fit_script(script, speech_synth_config, estimator, policy, continue_with=_generate).script
+
+
+def stream_script(
+    llm_config: LLMProviderConfig, speech_synth_config: SpeechSynthConfig, clients: Clients
+) -> Iterator[str]:
+    """Stream the raw LLM output for a script from whichever provider is configured."""
+    return get_llm_provider(llm_config.provider).stream(llm_config, speech_synth_config, clients)
+
+
+def script_to_ssml(script: str, speech_synth_config: SpeechSynthConfig) -> str:
+    """Convert a generated script into the exact SSML sent to Polly.
+
+    Only the speaking rate is set, pitch and volume are left at the voice defaults.
+    """
+    return "".join(
+        compile_ssml([script], rate=speech_synth_config.voice_speed, pause_mode=speech_synth_config.pause_mode)
+    )
+
+
+def write_transcript(
+    ssml_script: str, llm_config: LLMProviderConfig, speech_synth_config: SpeechSynthConfig, output_location: Path
+) -> Path:
+    transcript_file = output_location / f"{script_output_name(llm_config, speech_synth_config)}.ssml.xml"
+    transcript_file.write_text(ssml_script)
+    if metrics.enabled():
+        metrics.increment("output.bytes_written", len(ssml_script.encode()), kind="transcript")
+    return transcript_file
@@ -1,81 +1,863 @@
 # Standard Library
+import itertools
+import json
 import logging
+import random
 import re
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
 from pathlib import Path
-
-# Third Party
-import boto3
-from ssml_builder.core import Speech
+from typing import Any, BinaryIO
+from urllib.parse import unquote, urlparse
 
 # Our Libraries
+from very_demure import metrics
+from very_demure.cache import SynthesisCache, synthesis_cache_key
+from very_demure.clients import SDK_BACKEND
+from very_demure.estimator import record_render
+from very_demure.mp3 import first_bitrate_kbps, iter_frames, silence
+from very_demure.providers import client_backend, create_client
+from very_demure.ratelimit import limited_call
 from very_demure.schema import DEFAULT_SPEECH_CONFIG, SpeechSynthConfig
+from very_demure.segments import (
+    SegmentStore,
+    segment_key,
+    segment_store,
+    split_sentences,
+)
+from very_demure.ssml import PAUSE_MARKER_PATTERN, compile_ssml, pause_marker_to_ssml
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SYNTH_CONCURRENCY = 3
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# https://docs.aws.amazon.com/polly/latest/dg/limits.html
+MAX_SSML_CHARACTERS = 6000  # Total characters per SynthesizeSpeech request, including tags
+MAX_BILLED_CHARACTERS = 3000  # Spoken characters per SynthesizeSpeech request, excluding tags
+# Per StartSpeechSynthesisTask request
+MAX_TASK_SSML_CHARACTERS = 200_000
+MAX_TASK_BILLED_CHARACTERS = 100_000
+DEFAULT_RANGE_SIZE = 8 * 1024 * 1024
+SSML_TAG_PATTERN = re.compile("<[^>]+>")
+SSML_WRAPPER_PATTERN = re.compile(
+    "^\\s*(<speak>\\s*(?:<prosody[^>]*>)?)(.*?)((?:</prosody>)?\\s*</speak>)\\s*$", re.DOTALL
+)
+# Split after runs of breaks, blank lines or sentence endings, keeping the separator with the preceding text.
+SSML_SPLIT_PATTERN = re.compile("((?:<break[^>]*/>\\s*)+|\\n\\s*\\n|(?<=[.!?])\\s+)")
+SSML_BREAKS_PATTERN = re.compile("((?:<break[^>]*/>\\s*)+)")
+SSML_BREAK_TIME_PATTERN = re.compile('<break time="(\\d+(?:\\.\\d+)?)(ms|s)"', re.IGNORECASE)
+SSML_TOKEN_PATTERN = re.compile("<[^>]+>\\s*|[^<\\s]+\\s*|\\s+")
+
+AudioSink = Callable[[memoryview], Any]
+ProgressCallback = Callable[[int], None]
+
+
+@dataclass(frozen=True)
+class SynthesisResult:
+    voice: str
+    output_file: Path
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
 
 def synthesize_speech(
     ssml_text: str,
     speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG,
     output_file: Path = Path("output.mp3"),
     polly_client=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: ProgressCallback | None = None,
+    cache: SynthesisCache | None = None,
+    chunk_concurrency: int = DEFAULT_SYNTH_CONCURRENCY,
+    s3_client=None,
 ):
-    """Use AWS Polly Text to Speech Service to synthesize mp3 of the guided mindfulness audio."""
+    """Use AWS Polly Text to Speech Service to synthesize mp3 of the guided mindfulness audio.
+
+    When a `cache` is provided, identical requests are served from disk without calling Polly.
+    With `configure_synthesis_tasks`, the audio is rendered by an asynchronous task into S3 via `s3_client`.
+    With `configure_segment_store`, mp3 audio is assembled from per sentence audio instead.
+    """
+    stream_kwargs = dict(
+        speech_synth_config=speech_synth_config, polly_client=polly_client, chunk_size=chunk_size, progress=progress
+    )
+    if segment_store() is not None and speech_synth_config.output_format == "mp3":
+        stream_kwargs["max_workers"] = chunk_concurrency
+        render = stream_speech_segments
+    # Silence is spliced in locally so that mode keeps synthesizing spoken segments synchronously.
+    elif _task_waiter is not None and speech_synth_config.pause_mode != "silence":
+        stream_kwargs["s3_client"] = s3_client
+        render = stream_speech_task
+    elif speech_synth_config.pause_mode == "silence":
+        stream_kwargs["max_workers"] = chunk_concurrency
+        render = stream_speech_with_silence
+    # Scripts longer than a single Polly request allows are split and synthesized in parallel.
+    elif exceeds_request_limits(ssml_text):
+        stream_kwargs["max_workers"] = chunk_concurrency
+        render = stream_chunked_speech
+    else:
+        render = stream_speech
+
+    voice = speech_synth_config.voice
+    with metrics.span("polly.synthesize", voice=voice, render=render.__name__) as span:
+        if cache is None:
+            # Replace rather than truncate in case the output is a hardlink into a cache.
+            output_file.unlink(missing_ok=True)
+            # Save the audio stream returned by Amazon Polly on a file as it arrives
+            with output_file.open("wb") as file:
+                total_bytes = render(ssml_text, sink=file.write, **stream_kwargs)
+            metrics.increment("output.bytes_written", total_bytes, kind="audio")
+            _record_render(ssml_text, speech_synth_config, output_file)
+            return output_file
+
+        key = synthesis_cache_key(ssml_text, speech_synth_config, client_backend("polly"))
+        hit = cache.get(key, output_file)
+        span.set("cache_hit", hit)
+        metrics.increment("cache.hit" if hit else "cache.miss", cache="polly")
+        if not hit:
+            # Link the output before evicting, which may remove this entry when it alone exceeds the limit
+            with cache.store(key, evict=False) as file:
+                total_bytes = render(ssml_text, sink=file.write, **stream_kwargs)
+            metrics.increment("output.bytes_written", total_bytes, kind="audio")
+            stored = cache.get(key, output_file)
+            cache.evict()
+            if not stored:
+                raise RuntimeError(f"Unfortunately the audio for {output_file} was evicted from the cache before use")
+            _record_render(ssml_text, speech_synth_config, output_file)
+
+    return output_file
+
+
+def _record_render(ssml_text: str, speech_synth_config: SpeechSynthConfig, output_file: Path) -> None:
+    """Calibrate duration estimates from real audio only, fakes only last as long as the estimate said."""
+    if client_backend("polly") == SDK_BACKEND:
+        record_render(ssml_text, speech_synth_config, output_file)
+
+
+def stream_speech(
+    ssml_text: str,
+    sink: AudioSink,
+    speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG,
+    polly_client=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: ProgressCallback | None = None,
+) -> int:
+    """Synthesize speech and pass the audio to `sink` chunk by chunk as it arrives from Polly.
+
+    The sink can be anything accepting bytes-like chunks, eg a file, socket or pipe `write`.
+    Returns the total number of bytes streamed.
+    """
     # Create a Polly client
     if not polly_client:
-        polly_client = boto3.client("polly", region_name="us-east-1")
+        polly_client = create_client("polly")
 
     # Call the synthesize_speech API
     # https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/polly/client/synthesize_speech.html
-    response = polly_client.synthesize_speech(
+    voice = speech_synth_config.voice
+    with metrics.span("polly.request", voice=voice, engine=speech_synth_config.engine) as span:
+        # Polly quotas are per engine
+        response = limited_call(
+            "polly",
+            speech_synth_config.engine,
+            lambda: polly_client.synthesize_speech(
+                Engine=speech_synth_config.engine,
+                VoiceId=voice,
+                Text=ssml_text,
+                TextType="ssml",
+                OutputFormat=speech_synth_config.output_format,
+                SampleRate=speech_synth_config.sample_rate,
+            ),
+        )
+        if metrics.enabled():
+            metrics.increment("polly.requests", voice=voice)
+            metrics.increment("polly.billed_characters", billed_characters(ssml_text), voice=voice)
+            metrics.increment("retries", response.get("ResponseMetadata", {}).get("RetryAttempts", 0), service="polly")
+
+        audio_stream = response["AudioStream"]
+        try:
+            total_bytes = stream_audio(audio_stream, sink, chunk_size=chunk_size, progress=progress)
+        finally:
+            audio_stream.close()
+        span.set("bytes", total_bytes)
+        return total_bytes
+
+
+def fetch_speech_marks(
+    ssml_text: str, speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG, polly_client=None
+) -> tuple[str, list[dict]]:
+    """Word speech marks for the first request sized chunk of `ssml_text`, billed like synthesizing it.
+
+    Returns:
+        The SSML chunk the marks are for and the marks, eg `{"time": 370, "type": "word", "value": "Breathe"}`.
+    """
+    if not polly_client:
+        polly_client = create_client("polly")
+    chunk = split_ssml(ssml_text)[0]
+    response = limited_call(
+        "polly",
+        speech_synth_config.engine,
+        lambda: polly_client.synthesize_speech(
+            Engine=speech_synth_config.engine,
+            VoiceId=speech_synth_config.voice,
+            Text=chunk,
+            TextType="ssml",
+            OutputFormat="json",
+            SpeechMarkTypes=["word"],
+        ),
+    )
+    audio_stream = response["AudioStream"]
+    try:
+        lines = audio_stream.read().decode().splitlines()
+    finally:
+        audio_stream.close()
+    return chunk, [json.loads(line) for line in lines if line.strip()]
+
+
+def stream_chunked_speech(
+    ssml_text: str,
+    sink: AudioSink,
+    speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG,
+    polly_client=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: ProgressCallback | None = None,
+    max_workers: int = DEFAULT_SYNTH_CONCURRENCY,
+) -> int:
+    """Synthesize SSML of any length by splitting it into request sized chunks rendered in parallel.
+
+    The MP3 output of each chunk is joined at frame boundaries, in order, into `sink`.
+    Chunks are written as soon as they and every chunk before them are ready.
+    """
+    if speech_synth_config.output_format != "mp3":
+        raise ValueError(f"Chunked synthesis can only join mp3 output, not {speech_synth_config.output_format}.")
+
+    if not polly_client:
+        polly_client = create_client("polly")
+
+    chunks = split_ssml(ssml_text)
+    logger.info(f"Synthesizing {len(chunks)} SSML chunks with up to {max_workers} in parallel")
+
+    def _synthesize_chunk(chunk: str) -> bytes:
+        buffer = BytesIO()
+        stream_speech(
+            chunk,
+            sink=buffer.write,
+            speech_synth_config=speech_synth_config,
+            polly_client=polly_client,
+            chunk_size=chunk_size,
+        )
+        return buffer.getvalue()
+
+    total_bytes = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="polly-chunk") as pool:
+        for audio in pool.map(metrics.in_current_context(_synthesize_chunk), chunks):
+            for _, frame in iter_frames(audio):
+                sink(frame)
+                total_bytes += len(frame)
+            if progress:
+                progress(total_bytes)
+    return total_bytes
+
+
+def stream_speech_with_silence(
+    ssml_text: str,
+    sink: AudioSink,
+    speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG,
+    polly_client=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: ProgressCallback | None = None,
+    max_workers: int = DEFAULT_SYNTH_CONCURRENCY,
+) -> int:
+    """Synthesize only the spoken parts of the SSML and splice in locally generated silence for each pause.
+
+    Runs of `<break>` tags are never sent to Polly, so they cost no billed characters and can be any length.
+    Spoken segments are synthesized in parallel and written in order. The silence has the bitrate of the speech,
+    keeping the file constant bitrate so players estimate its length right.
+    """
+    if speech_synth_config.output_format != "mp3":
+        raise ValueError(f"Local silence can only be spliced into mp3 output, not {speech_synth_config.output_format}.")
+
+    if not polly_client:
+        polly_client = create_client("polly")
+
+    segments = split_ssml_pauses(ssml_text)
+    spoken = [segment for segment in segments if isinstance(segment, str)]
+    logger.info(f"Synthesizing {len(spoken)} spoken segments around {len(segments) - len(spoken)} pauses")
+
+    def _synthesize_segment(segment: str) -> bytes:
+        buffer = BytesIO()
+        render = stream_chunked_speech if exceeds_request_limits(segment) else stream_speech
+        render(
+            segment,
+            sink=buffer.write,
+            speech_synth_config=speech_synth_config,
+            polly_client=polly_client,
+            chunk_size=chunk_size,
+        )
+        return buffer.getvalue()
+
+    sample_rate = int(speech_synth_config.sample_rate)
+    total_bytes = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="polly-segment") as pool:
+        futures = [pool.submit(metrics.in_current_context(_synthesize_segment), segment) for segment in spoken]
+        spoken_audio = (future.result() for future in futures)
+        # A pause may come first, so the bitrate is read from the first spoken segment once it is ready
+        bitrate_kbps = None
+        for segment in segments:
+            if isinstance(segment, str):
+                for _, frame in iter_frames(next(spoken_audio)):
+                    sink(frame)
+                    total_bytes += len(frame)
+            else:
+                if bitrate_kbps is None and futures:
+                    bitrate_kbps = first_bitrate_kbps(futures[0].result())
+                audio = silence(round(segment * 1000), sample_rate, bitrate_kbps=bitrate_kbps)
+                sink(audio)
+                total_bytes += len(audio)
+            if progress:
+                progress(total_bytes)
+    return total_bytes
+
+
+def stream_speech_segments(
+    ssml_text: str,
+    sink: AudioSink,
+    speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG,
+    polly_client=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: ProgressCallback | None = None,
+    max_workers: int = DEFAULT_SYNTH_CONCURRENCY,
+    store: SegmentStore | None = None,
+) -> int:
+    """Assemble speech from the audio of each sentence, synthesizing only the sentences the store does not have.
+
+    Sentences are spoken inside the same `<speak>`/`<prosody>` tags as the whole script, the missing ones
+    synthesized once each and in parallel. Pauses become local silence, like `stream_speech_with_silence`,
+    and a short silence separates consecutive sentences.
+    """
+    if speech_synth_config.output_format != "mp3":
+        raise ValueError(f"Segments can only be joined as mp3 output, not {speech_synth_config.output_format}.")
+    store = store or segment_store()
+    if store is None:
+        raise ValueError("Unfortunately there is no segment store to assemble speech from")
+    wrapper = SSML_WRAPPER_PATTERN.match(ssml_text)
+    if not wrapper:
+        raise ValueError("Unfortunately only <speak> documents can be split into sentences")
+    if not polly_client:
+        polly_client = create_client("polly")
+
+    plan, documents = plan_segments(*wrapper.groups(), speech_synth_config)
+    audio = {key: store.get(key) for key in documents}
+    misses = [key for key, cached in audio.items() if cached is None]
+    logger.info(f"Synthesizing {len(misses)} of {len(documents)} distinct sentences missing from the segment store")
+
+    def _synthesize_sentence(key: str) -> bytes:
+        buffer = BytesIO()
+        render = stream_chunked_speech if exceeds_request_limits(documents[key]) else stream_speech
+        render(
+            documents[key],
+            sink=buffer.write,
+            speech_synth_config=speech_synth_config,
+            polly_client=polly_client,
+            chunk_size=chunk_size,
+        )
+        store.put(key, buffer.getvalue())
+        return buffer.getvalue()
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="polly-sentence") as pool:
+        audio.update(zip(misses, pool.map(metrics.in_current_context(_synthesize_sentence), misses), strict=True))
+    store.evict()
+
+    sentences = [item for item in plan if isinstance(item, str)]
+    saved = sum(billed_characters(documents[key]) for key in sentences) - sum(
+        billed_characters(documents[key]) for key in misses
+    )
+    store.record(len(sentences), len(misses), saved)
+
+    return write_segments(plan, audio, sink, int(speech_synth_config.sample_rate), store.sentence_gap_ms, progress)
+
+
+def write_segments(
+    plan: list[str | float],
+    audio: dict[str, bytes],
+    sink: AudioSink,
+    sample_rate: int,
+    sentence_gap_ms: int,
+    progress: ProgressCallback | None = None,
+) -> int:
+    """Write the frames of each planned sentence, with silence at their bitrate for the pauses and between them."""
+    bitrate_kbps = next((first_bitrate_kbps(audio[item]) for item in plan if isinstance(item, str)), None)
+    total_bytes = 0
+    for i, item in enumerate(plan):
+        if isinstance(item, str):
+            for _, frame in iter_frames(audio[item]):
+                sink(frame)
+                total_bytes += len(frame)
+            # Consecutive sentences were synthesized apart, so put back the pause Polly leaves between them
+            next_is_sentence = i + 1 < len(plan) and isinstance(plan[i + 1], str)
+            pause_ms = sentence_gap_ms if next_is_sentence else 0
+        else:
+            pause_ms = round(item * 1000)
+        if pause_ms:
+            pause = silence(pause_ms, sample_rate, bitrate_kbps=bitrate_kbps)
+            sink(pause)
+            total_bytes += len(pause)
+        if progress:
+            progress(total_bytes)
+    return total_bytes
+
+
+def plan_segments(
+    opening: str, body: str, closing: str, speech_synth_config: SpeechSynthConfig
+) -> tuple[list[str | float], dict[str, str]]:
+    """Split the body of a `<speak>` document into sentence segments and pauses.
+
+    Returns:
+        The segment keys and pause seconds in order, and the SSML document to synthesize for each key.
+    """
+    plan: list[str | float] = []
+    documents: dict[str, str] = {}
+    for i, piece in enumerate(SSML_BREAKS_PATTERN.split(body)):
+        if i % 2:  # Odd pieces are the captured runs of breaks
+            plan.append(break_seconds(piece))
+            continue
+        for sentence in split_sentences(piece):
+            key = segment_key(sentence, opening, speech_synth_config, client_backend("polly"))
+            documents.setdefault(key, f"{opening}{sentence}{closing}")
+            plan.append(key)
+    return plan, documents
+
+
+@dataclass(frozen=True)
+class SynthesisTaskConfig:
+    """Where and how asynchronous `StartSpeechSynthesisTask` renders are written, polled and downloaded."""
+
+    output_bucket: str
+    output_key_prefix: str = "very-demure/"
+    sns_topic_arn: str | None = None  # Completion notifications, see `SynthesisTaskWaiter.notify`
+    poll_interval: float = 2.0
+    max_poll_interval: float = 30.0
+    timeout: float = 3600.0
+    range_size: int = DEFAULT_RANGE_SIZE
+    download_concurrency: int = 4
+    keep_output: bool = False  # Otherwise the S3 object is deleted once downloaded
+
+    def __post_init__(self):
+        if not self.output_bucket:
+            raise ValueError("Synthesis tasks need an output_bucket")
+        if self.range_size < 1 or self.download_concurrency < 1:
+            raise ValueError("range_size and download_concurrency must be at least 1")
+
+
+class SynthesisTaskWaiter:
+    """Polls every outstanding synthesis task from one background thread.
+
+    Callers block in `wait` without holding a connection open, so hundreds of tasks can be in flight while
+    Polly only sees one status request at a time. Each task is polled with jittered exponential backoff,
+    and `notify` polls a task straight away, eg when its SNS completion notification arrives.
+    """
+
+    def __init__(self, task_config: SynthesisTaskConfig):
+        self.task_config = task_config
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        # task id -> (polly client, future, next poll time, current interval, deadline)
+        self.pending: dict[str, tuple[Any, Future, float, float, float]] = {}
+        self.thread: threading.Thread | None = None
+
+    def wait(self, task_id: str, polly_client) -> dict[str, Any]:
+        """Block until the task finishes and return it, raising if it failed or timed out."""
+        future: Future = Future()
+        now = time.monotonic()
+        interval = self.task_config.poll_interval
+        with self.lock:
+            self.pending[task_id] = (polly_client, future, now + interval, interval, now + self.task_config.timeout)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._poll_forever, name="polly-tasks", daemon=True)
+                self.thread.start()
+        self.wake.set()
+        return future.result()
+
+    def notify(self, task_id: str) -> None:
+        with self.lock:
+            if task_id in self.pending:
+                polly_client, future, _, interval, deadline = self.pending[task_id]
+                self.pending[task_id] = (polly_client, future, 0.0, interval, deadline)
+        self.wake.set()
+
+    def _poll_forever(self) -> None:
+        while True:
+            with self.lock:
+                if not self.pending:
+                    self.thread = None
+                    return
+                now = time.monotonic()
+                due = [task_id for task_id, (_, _, poll_at, _, _) in self.pending.items() if poll_at <= now]
+                next_poll = min(poll_at for _, _, poll_at, _, _ in self.pending.values())
+            for task_id in due:
+                self._poll(task_id)
+            if not due:
+                self.wake.wait(timeout=max(0.0, next_poll - time.monotonic()))
+                self.wake.clear()
+
+    def _poll(self, task_id: str) -> None:
+        with self.lock:
+            polly_client, future, _, interval, deadline = self.pending[task_id]
+        try:
+            task = limited_call("polly-task", None, lambda: polly_client.get_speech_synthesis_task(TaskId=task_id))[
+                "SynthesisTask"
+            ]
+            metrics.increment("polly.task_polls")
+            status = task["TaskStatus"]
+            if status == "failed":
+                raise RuntimeError(f"Synthesis task {task_id} failed: {task.get('TaskStatusReason')}")
+            if status != "completed" and time.monotonic() > deadline:
+                raise TimeoutError(f"Synthesis task {task_id} still {status} after {self.task_config.timeout}s")
+        except Exception as e:
+            with self.lock:
+                del self.pending[task_id]
+            future.set_exception(e)
+            return
+
+        with self.lock:
+            if status == "completed":
+                del self.pending[task_id]
+            else:
+                interval = min(self.task_config.max_poll_interval, interval * 2)
+                poll_at = time.monotonic() + random.uniform(interval / 2, interval)
+                self.pending[task_id] = (polly_client, future, poll_at, interval, deadline)
+        if status == "completed":
+            future.set_result(task)
+
+
+_task_waiter: SynthesisTaskWaiter | None = None
+
+
+def configure_synthesis_tasks(task_config: SynthesisTaskConfig | None) -> SynthesisTaskWaiter | None:
+    """Render with asynchronous synthesis tasks from now on, or with `synthesize_speech` when None."""
+    global _task_waiter
+    _task_waiter = SynthesisTaskWaiter(task_config) if task_config is not None else None
+    return _task_waiter
+
+
+def synthesis_task_waiter() -> SynthesisTaskWaiter | None:
+    return _task_waiter
+
+
+def stream_speech_task(
+    ssml_text: str,
+    sink: AudioSink,
+    speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG,
+    polly_client=None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: ProgressCallback | None = None,
+    s3_client=None,
+    waiter: SynthesisTaskWaiter | None = None,
+) -> int:
+    """Render the whole SSML with one asynchronous Polly task and stream the result from S3 into `sink`.
+
+    Tasks accept far longer text than `synthesize_speech`, so long sessions need no chunking, and no
+    connection is held open while Polly renders. Uses the waiter set up by `configure_synthesis_tasks`.
+    """
+    waiter = waiter or _task_waiter
+    if waiter is None:
+        raise ValueError("Unfortunately synthesis tasks are not configured, see configure_synthesis_tasks")
+    if len(ssml_text) > MAX_TASK_SSML_CHARACTERS or billed_characters(ssml_text) > MAX_TASK_BILLED_CHARACTERS:
+        raise ValueError(f"Unfortunately {len(ssml_text)} characters of SSML is too long for one synthesis task")
+    task_config = waiter.task_config
+
+    if not polly_client:
+        polly_client = create_client("polly")
+    if not s3_client:
+        s3_client = create_client("s3")
+
+    voice = speech_synth_config.voice
+    task_kwargs = dict(
         Engine=speech_synth_config.engine,
-        VoiceId=speech_synth_config.voice,
+        VoiceId=voice,
         Text=ssml_text,
         TextType="ssml",
-        OutputFormat="mp3",
-        SampleRate="24000",
+        OutputFormat=speech_synth_config.output_format,
+        SampleRate=speech_synth_config.sample_rate,
+        OutputS3BucketName=task_config.output_bucket,
+        OutputS3KeyPrefix=task_config.output_key_prefix,
     )
+    if task_config.sns_topic_arn:
+        task_kwargs["SnsTopicArn"] = task_config.sns_topic_arn
 
-    # Save the audio stream returned by Amazon Polly on a file
-    with output_file.open("wb") as file:
-        file.write(response["AudioStream"].read())
+    with metrics.span("polly.task", voice=voice, engine=speech_synth_config.engine) as span:
+        task = limited_call("polly-task", None, lambda: polly_client.start_speech_synthesis_task(**task_kwargs))
+        task_id = task["SynthesisTask"]["TaskId"]
+        metrics.increment("polly.requests", voice=voice)
+        metrics.increment("polly.billed_characters", billed_characters(ssml_text), voice=voice)
+        logger.info(f"Started synthesis task {task_id} for {voice}")
 
-    return output_file
+        task = waiter.wait(task_id, polly_client)
+        bucket, key = s3_location(task["OutputUri"], task_config.output_bucket)
+        total_bytes = download_s3_object(
+            s3_client,
+            bucket,
+            key,
+            sink,
+            range_size=task_config.range_size,
+            max_workers=task_config.download_concurrency,
+            chunk_size=chunk_size,
+            progress=progress,
+        )
+        if not task_config.keep_output:
+            try:
+                s3_client.delete_object(Bucket=bucket, Key=key)
+            except Exception as e:
+                logger.warning(f"Could not delete s3://{bucket}/{key}: {e}")
+        span.set("bytes", total_bytes)
+        return total_bytes
 
 
-def process_text_to_ssml(script: str, speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG) -> str:
-    speech = Speech()
-    logger.info(script)
-    sanitised_script = process_pause_markers(script)
-    speech.prosody(value=sanitised_script, rate=speech_synth_config.voice_speed)
+def s3_location(output_uri: str, bucket: str) -> tuple[str, str]:
+    """The bucket and key of a task's `OutputUri`, which Polly writes in path style."""
+    path = unquote(urlparse(output_uri).path).lstrip("/")
+    if path.startswith(f"{bucket}/"):
+        return bucket, path.removeprefix(f"{bucket}/")
+    return bucket, path  # Virtual hosted style, the bucket is in the host name
 
-    return speech.speak()
 
+def download_s3_object(
+    s3_client,
+    bucket: str,
+    key: str,
+    sink: AudioSink,
+    range_size: int = DEFAULT_RANGE_SIZE,
+    max_workers: int = 4,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: ProgressCallback | None = None,
+) -> int:
+    """Stream an S3 object into `sink`, fetching `range_size` byte ranges in parallel and writing them in order.
 
-def process_pause_markers(script):
-    """Process multiple pause markers in a longer multiline script."""
-    pattern = re.compile("\\[PAUSE (\\d+)(m|s)\\]", re.IGNORECASE)
-    output = re.sub(pattern, process_pause_marker_match, script)
-    return output
+    At most `2 * max_workers` ranges are held in memory at once. Small objects are streamed with a single GET.
+    """
+    size = s3_client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    if size <= range_size:
+        body = s3_client.get_object(Bucket=bucket, Key=key)["Body"]
+        try:
+            return stream_audio(body, sink, chunk_size=chunk_size, progress=progress)
+        finally:
+            body.close()
 
+    def _get_range(start: int) -> bytes:
+        end = min(start + range_size, size) - 1
+        body = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")["Body"]
+        try:
+            return body.read()
+        finally:
+            body.close()
 
-def process_pause_marker_match(pause_marker_match: re.Match):
-    """Take the regex Match and process the string."""
-    return process_pause_marker(pause_marker_match.group(0))
+    starts = iter(range(0, size, range_size))
+    total_bytes = 0
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3-range") as pool:
+        in_flight = deque(pool.submit(_get_range, start) for start in itertools.islice(starts, 2 * max_workers))
+        while in_flight:
+            data = in_flight.popleft().result()
+            for start in itertools.islice(starts, 1):
+                in_flight.append(pool.submit(_get_range, start))
+            sink(memoryview(data))
+            total_bytes += len(data)
+            if progress:
+                progress(total_bytes)
+    if total_bytes != size:
+        raise RuntimeError(f"Downloaded {total_bytes} of {size} bytes from s3://{bucket}/{key}")
+    return total_bytes
 
 
-def process_pause_marker(pause_marker):
-    pattern = re.compile("\\[PAUSE (\\d+)(m|s)\\]", re.IGNORECASE)
-    time_component = pattern.search(pause_marker)
+def split_ssml_pauses(ssml_text: str) -> list[str | float]:
+    """Split a `<speak>` document into spoken SSML documents and pause durations in seconds, in order."""
+    wrapper = SSML_WRAPPER_PATTERN.match(ssml_text)
+    if not wrapper:
+        return [ssml_text]
 
-    break_marker = '<break time="10s" />'
+    opening, body, closing = wrapper.groups()
+    segments: list[str | float] = []
+    for i, piece in enumerate(SSML_BREAKS_PATTERN.split(body)):
+        if i % 2:  # Odd pieces are the captured runs of breaks
+            segments.append(break_seconds(piece))
+        elif piece.strip():
+            segments.append(f"{opening}{piece.strip()}{closing}")
+    return segments
+
+
+def break_seconds(ssml_text: str) -> float:
+    """Total time of the `<break>` tags in some SSML."""
+    return sum(
+        float(numeric) / (1000 if unit.lower() == "ms" else 1)
+        for numeric, unit in SSML_BREAK_TIME_PATTERN.findall(ssml_text)
+    )
+
+
+def exceeds_request_limits(
+    ssml_text: str, max_characters: int = MAX_SSML_CHARACTERS, max_billed_characters: int = MAX_BILLED_CHARACTERS
+) -> bool:
+    """True if the SSML is too long to synthesize in a single Polly request."""
+    return len(ssml_text) > max_characters or billed_characters(ssml_text) > max_billed_characters
+
+
+def billed_characters(ssml_text: str) -> int:
+    """Polly bills spoken characters only, SSML tags are free."""
+    return len(SSML_TAG_PATTERN.sub("", ssml_text))
+
+
+def split_ssml(
+    ssml_text: str, max_characters: int = MAX_SSML_CHARACTERS, max_billed_characters: int = MAX_BILLED_CHARACTERS
+) -> list[str]:
+    """Split a `<speak>` document into several valid documents that each fit in one Polly request.
+
+    Splits happen after runs of breaks, paragraphs or sentence endings, and every chunk is wrapped in
+    the same `<speak>`/`<prosody>` tags as the original. Only tags that do not span a split point
+    are supported, which holds for the output of `process_text_to_ssml`.
+    """
+    wrapper = SSML_WRAPPER_PATTERN.match(ssml_text)
+    if not wrapper or not exceeds_request_limits(ssml_text, max_characters, max_billed_characters):
+        return [ssml_text]
+
+    opening, body, closing = wrapper.groups()
+    max_body_characters = max_characters - len(opening) - len(closing)
+
+    # Pair each piece of text with the separator that follows it.
+    pieces = SSML_SPLIT_PATTERN.split(body)
+    units = [pieces[i] + (pieces[i + 1] if i + 1 < len(pieces) else "") for i in range(0, len(pieces), 2)]
+
+    chunks = []
+    current = ""
+    for unit in _split_oversized_units(units, max_body_characters, max_billed_characters):
+        candidate = current + unit
+        if current and (len(candidate) > max_body_characters or billed_characters(candidate) > max_billed_characters):
+            chunks.append(current)
+            current = unit
+        else:
+            current = candidate
+    if current.strip():
+        chunks.append(current)
+
+    return [f"{opening}{chunk}{closing}" for chunk in chunks]
+
+
+def _split_oversized_units(units: list[str], max_characters: int, max_billed_characters: int) -> Iterator[str]:
+    """Fall back to splitting between words and tags for a single unit longer than a whole request."""
+    for unit in units:
+        if len(unit) <= max_characters and billed_characters(unit) <= max_billed_characters:
+            yield unit
+            continue
+        current = ""
+        for word in SSML_TOKEN_PATTERN.findall(unit):
+            if current and len(current + word) > min(max_characters, max_billed_characters):
+                yield current
+                current = ""
+            current += word
+        if current:
+            yield current
+
+
+def stream_audio(
+    audio_stream: BinaryIO,
+    sink: AudioSink,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: ProgressCallback | None = None,
+) -> int:
+    """Copy an audio stream into a sink in fixed size chunks, reporting the running byte count to `progress`."""
+    total_bytes = 0
+    for chunk in iter_audio_chunks(audio_stream, chunk_size=chunk_size):
+        sink(chunk)
+        total_bytes += len(chunk)
+        if progress:
+            progress(total_bytes)
+    return total_bytes
+
+
+def iter_audio_chunks(audio_stream: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[memoryview]:
+    """Yield views over one reusable buffer as the audio stream is read.
+
+    Each yielded memoryview is only valid until the next chunk is requested,
+    so consumers that need to hold onto data must copy it with `bytes(chunk)`.
+    """
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    readinto = getattr(audio_stream, "readinto", None)
+    while True:
+        if readinto:
+            size = readinto(buffer)
+        else:
+            data = audio_stream.read(chunk_size)
+            size = len(data)
+            buffer[:size] = data
+        if not size:
+            break
+        yield view[:size]
+
+
+def synthesize_voices(
+    ssml_text: str,
+    jobs: list[tuple[SpeechSynthConfig, Path]],
+    polly_client=None,
+    max_workers: int = DEFAULT_SYNTH_CONCURRENCY,
+    cache: SynthesisCache | None = None,
+) -> list[SynthesisResult]:
+    """Synthesize the same SSML for several voices concurrently.
+
+    Each job pairs its own SpeechSynthConfig with an output file. Failures are captured per voice
+    rather than aborting the other renders. Results are returned in the same order as `jobs`.
+    """
+    # boto3 clients are thread-safe but creating them from the default session is not.
+    if not polly_client:
+        polly_client = create_client("polly")
+
+    def _synthesize(job: tuple[SpeechSynthConfig, Path]) -> SynthesisResult:
+        speech_synth_config, output_file = job
+        try:
+            synthesize_speech(
+                ssml_text,
+                speech_synth_config=speech_synth_config,
+                output_file=output_file,
+                polly_client=polly_client,
+                cache=cache,
+            )
+        except Exception as e:
+            logger.error(f"Synthesis failed for voice {speech_synth_config.voice}: {e}")
+            return SynthesisResult(voice=speech_synth_config.voice, output_file=output_file, error=e)
+        return SynthesisResult(voice=speech_synth_config.voice, output_file=output_file)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="polly") as pool:
+        return list(pool.map(metrics.in_current_context(_synthesize), jobs))
+
+
+def process_text_to_ssml(script: str, speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG) -> str:
+    """Compile a script into SSML with explicit medium pitch and volume, as `ssml_builder` used to emit."""
+    logger.debug(f"Compiling {len(script)} character script to SSML")
+    return "".join(
+        compile_ssml(
+            [script],
+            rate=speech_synth_config.voice_speed,
+            pitch="medium",
+            volume="medium",
+            pause_mode=speech_synth_config.pause_mode,
+        )
+    )
+
+
+def process_pause_markers(script, pause_mode: str = "ssml"):
+    """Process multiple pause markers in a longer multiline script."""
+    return PAUSE_MARKER_PATTERN.sub(lambda match: process_pause_marker_match(match, pause_mode), script)
+
+
+def process_pause_marker_match(pause_marker_match: re.Match, pause_mode: str = "ssml"):
+    """Take the regex Match and process the string."""
+    return process_pause_marker(pause_marker_match.group(0), pause_mode)
 
-    if time_component:
-        numeric, unit = time_component.group(1, 2)
-        multiplier = 60 if unit.lower() == "m" else 1
-        total_seconds = int(numeric) * multiplier
-        increments = int(total_seconds / 10)
-        output = break_marker * increments
-    else:
-        output = break_marker  # if in doubt just insert one valid one
 
-    return output
+def process_pause_marker(pause_marker, pause_mode: str = "ssml"):
+    """Convert a pause marker into SSML breaks. See `very_demure.ssml.pause_to_ssml`."""
+    return pause_marker_to_ssml(pause_marker, pause_mode)
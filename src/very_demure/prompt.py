@@ -2,6 +2,7 @@
 import logging
 
 # Our Libraries
+from very_demure.logs import log_payload
 from very_demure.schema import SpeechSynthConfig
 
 logger = logging.getLogger(__name__)
@@ -31,7 +32,7 @@ def generate_prompt(speech_synth_config: SpeechSynthConfig) -> str:
     prompt = f"""
         Write the text for a guided mindfulness meditation session which should last 
         {speech_synth_config.duration_minutes} minutes which should be around a word count
-         of {int(speech_synth_config.duration_minutes)*WORDS_PER_MINUTE} but must stay under 3000 characters.
+         of {int(speech_synth_config.duration_minutes)*WORDS_PER_MINUTE}.
         
         Do not mention this duration in the actual script.
 
@@ -48,7 +49,7 @@ def generate_prompt(speech_synth_config: SpeechSynthConfig) -> str:
         
     """
 
-    logger.info(prompt)
+    log_payload(logger, "prompt", prompt)
 
     return prompt
 
@@ -0,0 +1,193 @@
+# Standard Library
+import logging
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+# Our Libraries
+from very_demure.cache import ResponseCache
+from very_demure.clients import DEFAULT_REGION, SDK_BACKEND, aws_client
+from very_demure.ratelimit import retries_in_app
+from very_demure.schema import LLMProviderConfig, SpeechSynthConfig
+
+if TYPE_CHECKING:
+    # Our Libraries
+    from very_demure.pipeline import Clients
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LLMProvider:
+    """How to generate a script with one LLM backend.
+
+    `generate` and `stream` import their backend module when first called, so choosing a provider
+    never imports the SDKs of the others.
+    """
+
+    generate: Callable[..., str]
+    stream: Callable[..., Iterator[str]]
+
+
+def _bedrock_generate(
+    llm_config: LLMProviderConfig,
+    speech_synth_config: SpeechSynthConfig,
+    clients: "Clients",
+    response_cache: ResponseCache | None = None,
+    bypass_cache: bool = False,
+) -> str:
+    # Our Libraries
+    from very_demure.bedrock import generate_mindfulness_script
+
+    return generate_mindfulness_script(
+        client=clients.bedrock_runtime,
+        model=llm_config.model_id,
+        speech_synth_config=speech_synth_config,
+        cache=response_cache,
+        bypass_cache=bypass_cache,
+    )
+
+
+def _bedrock_stream(
+    llm_config: LLMProviderConfig, speech_synth_config: SpeechSynthConfig, clients: "Clients"
+) -> Iterator[str]:
+    # Our Libraries
+    from very_demure.bedrock import stream_mindfulness_script
+
+    return stream_mindfulness_script(
+        client=clients.bedrock_runtime, model=llm_config.model_id, speech_synth_config=speech_synth_config
+    )
+
+
+def _openai_generate(
+    llm_config: LLMProviderConfig,
+    speech_synth_config: SpeechSynthConfig,
+    clients: "Clients",
+    response_cache: ResponseCache | None = None,
+    bypass_cache: bool = False,
+) -> str:
+    # Our Libraries
+    from very_demure.openai import generate_mindfulness_script
+
+    return generate_mindfulness_script(
+        client=clients.openai,
+        model=llm_config.model_id,
+        speech_synth_config=speech_synth_config,
+        cache=response_cache,
+        bypass_cache=bypass_cache,
+    )
+
+
+def _openai_stream(
+    llm_config: LLMProviderConfig, speech_synth_config: SpeechSynthConfig, clients: "Clients"
+) -> Iterator[str]:
+    # Our Libraries
+    from very_demure.openai import stream_mindfulness_script
+
+    return stream_mindfulness_script(
+        client=clients.openai, model=llm_config.model_id, speech_synth_config=speech_synth_config
+    )
+
+
+def _fake_generate(
+    llm_config: LLMProviderConfig,
+    speech_synth_config: SpeechSynthConfig,
+    clients: "Clients",
+    response_cache: ResponseCache | None = None,
+    bypass_cache: bool = False,
+) -> str:
+    # Our Libraries
+    from very_demure.fakes import fake_generate
+
+    return fake_generate(llm_config, speech_synth_config, clients, response_cache, bypass_cache)
+
+
+def _fake_stream(
+    llm_config: LLMProviderConfig, speech_synth_config: SpeechSynthConfig, clients: "Clients"
+) -> Iterator[str]:
+    # Our Libraries
+    from very_demure.fakes import fake_stream
+
+    return fake_stream(llm_config, speech_synth_config, clients)
+
+
+LLM_PROVIDERS: dict[str, LLMProvider] = {
+    "bedrock": LLMProvider(generate=_bedrock_generate, stream=_bedrock_stream),
+    "openai": LLMProvider(generate=_openai_generate, stream=_openai_stream),
+    # Offline and deterministic, for load testing. See `very_demure.fakes`
+    "fake": LLMProvider(generate=_fake_generate, stream=_fake_stream),
+}
+
+
+def register_llm_provider(name: str, provider: LLMProvider) -> None:
+    LLM_PROVIDERS[name] = provider
+
+
+def get_llm_provider(name: str) -> LLMProvider:
+    try:
+        return LLM_PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Unfortunately {name} is not a supported LLM provider.") from None
+
+
+# Rate limited providers are retried by `limited_call`, so their SDKs make a single attempt instead of
+# multiplying every retry of ours by their own.
+
+
+def _boto3_client(service_name: str, provider: str) -> Callable[[str], Any]:
+    def _create(region_name: str) -> Any:
+        max_attempts = 1 if retries_in_app(provider) else None
+        return aws_client(service_name, region_name=region_name, max_attempts=max_attempts)
+
+    return _create
+
+
+def _openai_client(region_name: str) -> Any:
+    # Third Party
+    from openai import OpenAI
+
+    return OpenAI(max_retries=0) if retries_in_app("openai") else OpenAI()
+
+
+def _async_openai_client(region_name: str) -> Any:
+    # Third Party
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(max_retries=0) if retries_in_app("openai") else AsyncOpenAI()
+
+
+# `Clients` attribute -> factory taking the AWS region. See `.env.sample` for the credentials each one assumes.
+CLIENT_FACTORIES: dict[str, Callable[[str], Any]] = {
+    "openai": _openai_client,
+    "async_openai": _async_openai_client,
+    "polly": _boto3_client("polly", "polly"),
+    "bedrock_runtime": _boto3_client("bedrock-runtime", "bedrock"),
+    "s3": _boto3_client("s3", "s3"),
+}
+
+
+_client_overrides: dict[str, tuple[str, Callable[[str], Any]]] = {}
+
+
+def override_client(name: str, factory: Callable[[str], Any] | None, backend: str = "override") -> None:
+    """Construct the client called `name` with `factory` from now on, or with its SDK again when None.
+
+    `backend` names what answers in its place, so caches can keep its responses apart from the real service's.
+    """
+    if factory is None:
+        _client_overrides.pop(name, None)
+    else:
+        _client_overrides[name] = (backend, factory)
+
+
+def client_backend(name: str) -> str:
+    """What answers calls to the client called `name`, `SDK_BACKEND` unless it was overridden."""
+    override = _client_overrides.get(name)
+    return override[0] if override else SDK_BACKEND
+
+
+def create_client(name: str, region_name: str = DEFAULT_REGION) -> Any:
+    """Import the SDK for and construct the client called `name`, eg `polly`."""
+    override = _client_overrides.get(name)
+    factory = override[1] if override else CLIENT_FACTORIES[name]
+    return factory(region_name)
@@ -0,0 +1,214 @@
+# Standard Library
+import hashlib
+import json
+import logging
+import mimetypes
+import shutil
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+# Our Libraries
+from very_demure import metrics
+from very_demure.providers import create_client
+from very_demure.utils import PUBLISH_CLI_ARGS_CONFIG, cli_handle_args
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 12
+# Fingerprinted names change with their content, so browsers and CloudFront may keep them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Entry points keep their names, so they must be revalidated soon after a deploy
+ENTRY_POINT_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+ENTRY_POINT_SUFFIXES = {".html"}
+# Globs of the entry points in a publish, for deployments that upload them separately
+ENTRY_POINT_PATTERNS = [*(f"*{suffix}" for suffix in sorted(ENTRY_POINT_SUFFIXES)), MANIFEST_NAME]
+# HLS rendition directories reference their files by relative name, so they are fingerprinted as a whole
+BUNDLE_SUFFIXES = {".hls"}
+CONTENT_TYPES = {".m3u8": "application/vnd.apple.mpegurl", ".ogg": "audio/ogg", ".mp3": "audio/mpeg"}
+
+
+@dataclass
+class PublishSummary:
+    uploaded: int = 0
+    unchanged: int = 0
+    bytes_uploaded: int = 0
+
+
+def file_digest(path: Path, algorithm: str = "sha256") -> str:
+    digest = hashlib.new(algorithm)
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_hash(path: Path) -> str:
+    """Short hash of a file, or of the relative names and contents of every file in a directory."""
+    if path.is_file():
+        return file_digest(path)[:HASH_LENGTH]
+    digest = hashlib.sha256()
+    for file in sorted(file for file in path.rglob("*") if file.is_file()):
+        digest.update(file.relative_to(path).as_posix().encode() + b"\x00")
+        digest.update(file_digest(file).encode())
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def fingerprinted(path: str, digest: str) -> str:
+    """`assets/name.mp3` -> `assets/name.<digest>.mp3`."""
+    parent, _, name = path.rpartition("/")
+    stem, dot, suffix = name.rpartition(".")
+    hashed = f"{stem}.{digest}.{suffix}" if dot and stem else f"{name}.{digest}"
+    return f"{parent}/{hashed}" if parent else hashed
+
+
+def is_entry_point(key: str) -> bool:
+    return Path(key).name == MANIFEST_NAME or Path(key).suffix in ENTRY_POINT_SUFFIXES
+
+
+def cache_control(key: str) -> str:
+    return ENTRY_POINT_CACHE_CONTROL if is_entry_point(key) else IMMUTABLE_CACHE_CONTROL
+
+
+def content_type(key: str) -> str:
+    suffix = Path(key).suffix
+    return CONTENT_TYPES.get(suffix) or mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+def _assets(source: Path) -> Iterator[Path]:
+    """Files and bundle directories to publish, skipping hidden ones."""
+    for path in sorted(source.iterdir()):
+        if path.name.startswith("."):
+            continue
+        if path.is_dir() and path.suffix not in BUNDLE_SUFFIXES:
+            yield from _assets(path)
+        else:
+            yield path
+
+
+def fingerprint(source: Path, destination: Path) -> dict[str, str]:
+    """Copy `source` to `destination` with content hashed names and write the manifest of logical to hashed names.
+
+    HTML entry points keep their names, with quoted references to other assets rewritten to the hashed names.
+    `destination` is replaced, so it must be empty or an earlier publish.
+
+    Returns:
+        The manifest, eg `{"assets/session.mp3": "assets/session.1a2b3c4d5e6f.mp3"}`.
+    """
+    source, destination = source.resolve(), destination.resolve()
+    if destination == source or source in destination.parents:
+        raise ValueError(f"Unfortunately {destination} is inside the source {source}")
+    if destination.exists():
+        if any(destination.iterdir()) and not (destination / MANIFEST_NAME).exists():
+            raise ValueError(f"Unfortunately {destination} is not empty and not an earlier publish")
+        shutil.rmtree(destination)
+
+    manifest: dict[str, str] = {}
+    entry_points = []
+    for path in _assets(source):
+        logical = path.relative_to(source).as_posix()
+        if is_entry_point(logical):
+            entry_points.append(logical)
+            continue
+        hashed = fingerprinted(logical, content_hash(path))
+        target = destination / hashed
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if path.is_dir():
+            shutil.copytree(path, target)
+            for file in sorted(path.rglob("*.m3u8")):
+                inner = file.relative_to(path).as_posix()
+                manifest[f"{logical}/{inner}"] = f"{hashed}/{inner}"
+        else:
+            shutil.copy2(path, target)
+            manifest[logical] = hashed
+
+    for logical in entry_points:
+        target = destination / logical
+        target.parent.mkdir(parents=True, exist_ok=True)
+        html = rewrite_references((source / logical).read_text(), manifest, Path(logical).parent.as_posix())
+        target.write_text(html)
+    (destination / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    logger.info(f"Fingerprinted {len(manifest)} assets from {source} into {destination}")
+    return manifest
+
+
+def rewrite_references(html: str, manifest: dict[str, str], directory: str) -> str:
+    """Point quoted references in an HTML file in `directory` at the hashed names."""
+    prefix = "" if directory in ("", ".") else f"{directory}/"
+    for logical, hashed in manifest.items():
+        if logical.startswith(prefix):
+            for quote in ('"', "'"):
+                html = html.replace(f"{quote}{logical[len(prefix) :]}{quote}", f"{quote}{hashed[len(prefix) :]}{quote}")
+    return html
+
+
+def _remote_etags(s3_client, bucket: str, prefix: str) -> dict[str, str]:
+    etags = {}
+    for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+        for item in page.get("Contents", []):
+            etags[item["Key"]] = item["ETag"].strip('"')
+    return etags
+
+
+def upload_changed(
+    publish_dir: Path, bucket: str, s3_client=None, prefix: str = "", max_workers: int = 8
+) -> PublishSummary:
+    """Upload the objects of a publish that are not already in the bucket.
+
+    Hashed objects that exist are unchanged by definition, entry points are compared by their MD5 ETag.
+    Hashed objects go first so the new manifest and pages never reference objects that are not there yet.
+    Objects of earlier publishes are left in place for pages and players that still reference them.
+    """
+    if s3_client is None:
+        s3_client = create_client("s3")
+    prefix = f"{prefix.strip('/')}/" if prefix.strip("/") else ""
+    remote = _remote_etags(s3_client, bucket, prefix)
+    summary = PublishSummary()
+
+    files = sorted(file for file in publish_dir.rglob("*") if file.is_file())
+    keys = {file: prefix + file.relative_to(publish_dir).as_posix() for file in files}
+    changed = [
+        file
+        for file in files
+        if keys[file] not in remote or (is_entry_point(keys[file]) and file_digest(file, "md5") != remote[keys[file]])
+    ]
+    summary.unchanged = len(files) - len(changed)
+
+    def _put(file: Path) -> None:
+        key = keys[file]
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=file.read_bytes(),
+            CacheControl=cache_control(key),
+            ContentType=content_type(key),
+        )
+
+    hashed = [file for file in changed if not is_entry_point(keys[file])]
+    entry_points = [file for file in changed if is_entry_point(keys[file])]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="publish") as pool:
+        for batch in (hashed, entry_points):
+            list(pool.map(metrics.in_current_context(_put), batch))
+    summary.uploaded = len(changed)
+    summary.bytes_uploaded = sum(file.stat().st_size for file in changed)
+    metrics.increment("publish.uploaded", summary.uploaded)
+    metrics.increment("publish.unchanged", summary.unchanged)
+    logger.info(f"Uploaded {summary.uploaded} changed objects to s3://{bucket}/{prefix}, {summary.unchanged} unchanged")
+    return summary
+
+
+def main(args: list[str]) -> None:
+    """Entrypoint for `python -m very_demure publish dist/`."""
+    cli_args: dict[str, Any] = cli_handle_args(PUBLISH_CLI_ARGS_CONFIG, args)
+    logger.info(cli_args)
+
+    start = time.perf_counter()
+    publish_dir = Path(cli_args["publish_location"])
+    fingerprint(Path(cli_args["source"]), publish_dir)
+    if cli_args["bucket"]:
+        upload_changed(publish_dir, cli_args["bucket"], prefix=cli_args["key_prefix"])
+    logger.info(f"Published in {time.perf_counter() - start:.1f}s")
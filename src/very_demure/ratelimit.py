@@ -0,0 +1,368 @@
+# Standard Library
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, TypeVar
+
+# Our Libraries
+from very_demure import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Error codes AWS services use when a caller is over its quota
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "ProvisionedThroughputExceededException",
+    "SlowDown",
+}
+# Server errors the SDKs would retry themselves, had `limited_call` not taken their retries over
+TRANSIENT_ERROR_CODES = {
+    "InternalFailure",
+    "InternalServerError",
+    "InternalServerException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+}
+# Connection failures of botocore and openai, recognised by name so neither SDK is imported
+CONNECTION_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "ConnectTimeoutError",
+    "ConnectionClosedError",
+    "EndpointConnectionError",
+    "ReadTimeoutError",
+}
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """A provider quota. `burst` defaults to one second of requests."""
+
+    requests_per_second: float
+    burst: float | None = None
+    tokens_per_minute: float | None = None  # LLM token quota, charged after each response
+
+    def __post_init__(self):
+        if self.requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        if self.burst is not None and self.burst < 1:
+            raise ValueError("burst must be at least 1")
+        if self.tokens_per_minute is not None and self.tokens_per_minute <= 0:
+            raise ValueError("tokens_per_minute must be positive")
+
+    @classmethod
+    def from_dict(cls, values: dict[str, Any]) -> "RateLimit":
+        unknown = set(values) - {field.name for field in fields(cls)}
+        if unknown:
+            raise ValueError(f"Unfortunately {sorted(unknown)} are not rate limit settings")
+        return cls(**values)
+
+
+# Keyed by `provider:model` or just `provider`, the most specific match wins. Polly's "model" is the engine.
+# Conservative account defaults at the time of writing, raise them with --rate-limits to match your quotas.
+DEFAULT_RATE_LIMITS: dict[str, RateLimit] = {
+    "polly": RateLimit(requests_per_second=8, burst=10),
+    "polly:standard": RateLimit(requests_per_second=80, burst=100),
+    "polly:neural": RateLimit(requests_per_second=8, burst=10),
+    "polly-task": RateLimit(requests_per_second=10, burst=12),  # Starting and polling synthesis tasks
+    "bedrock": RateLimit(requests_per_second=100 / 60, burst=4, tokens_per_minute=300_000),
+    "openai": RateLimit(requests_per_second=500 / 60, burst=8, tokens_per_minute=30_000),
+}
+
+
+@dataclass(frozen=True)
+class BackoffPolicy:
+    """Full jitter exponential backoff, waiting at least as long as any `Retry-After` the provider sent."""
+
+    base: float = 0.5
+    cap: float = 20.0
+    max_attempts: int = 6  # Including the first request
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        backoff = random.uniform(0, min(self.cap, self.base * 2**attempt))
+        return max(backoff, retry_after or 0.0)
+
+
+DEFAULT_BACKOFF = BackoffPolicy()
+
+
+class AdaptiveTokenBucket:
+    """Token bucket whose refill rate adapts to throttling, additive increase and multiplicative decrease (AIMD).
+
+    Callers reserve tokens and are told how long to wait for them, so the same bucket paces threads with
+    `time.sleep` and asyncio tasks with `asyncio.sleep`. The lock is only held to do the arithmetic.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        min_rate: float | None = None,
+        increase: float | None = None,
+        decrease: float = 0.5,
+    ):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate if min_rate is not None else rate / 20
+        # By default a halved rate is back to full speed after 10 successful requests
+        self.increase = increase if increase is not None else rate / 20
+        self.decrease = decrease
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.last_decrease = float("-inf")
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float = 1) -> float:
+        """Take `amount` tokens, going into debt if needed. Returns the seconds to wait before using them."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def charge(self, amount: float) -> None:
+        """Take `amount` tokens after the fact, eg the tokens an LLM response used, delaying later reservations."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+
+    def on_success(self) -> None:
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self) -> None:
+        """Slow down, at most once per refill interval so a burst of throttled requests only counts once."""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_decrease < 1 / self.rate:
+                return
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = min(self.tokens, 0.0)
+            self.last_decrease = now
+
+
+class RateLimiter:
+    """Paces the requests, and optionally LLM tokens, sent to one provider and model."""
+
+    def __init__(self, name: str, limit: RateLimit):
+        self.name = name
+        self.limit = limit
+        self.requests = AdaptiveTokenBucket(
+            limit.requests_per_second, limit.burst or max(1.0, limit.requests_per_second)
+        )
+        self.tokens = (
+            AdaptiveTokenBucket(limit.tokens_per_minute / 60, limit.tokens_per_minute)
+            if limit.tokens_per_minute
+            else None
+        )
+
+    def _reserve(self) -> float:
+        delay = self.requests.reserve()
+        if self.tokens is not None:
+            # Token usage is only known afterwards, so wait until earlier responses are paid for
+            delay = max(delay, self.tokens.reserve(0))
+        if delay and metrics.enabled():
+            metrics.increment("ratelimit.wait_seconds", delay, limiter=self.name)
+        return delay
+
+    def acquire(self) -> None:
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def aacquire(self) -> None:
+        # Imported here as only async callers need it, and they have already imported it
+        # Standard Library
+        import asyncio
+
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def record_tokens(self, count: int) -> None:
+        if self.tokens is not None and count:
+            self.tokens.charge(count)
+
+    def on_success(self) -> None:
+        self.requests.on_success()
+
+    def on_throttle(self) -> None:
+        self.requests.on_throttle()
+
+
+_lock = threading.Lock()
+_limits: dict[str, RateLimit] = dict(DEFAULT_RATE_LIMITS)
+_limiters: dict[str, RateLimiter | None] = {}
+
+
+def configure_rate_limits(limits: Mapping[str, RateLimit]) -> None:
+    """Override the limits for some providers or models. Limiters created before are discarded."""
+    with _lock:
+        _limits.update(limits)
+        _limiters.clear()
+
+
+def load_rate_limits(path: str | Path) -> dict[str, RateLimit]:
+    """Read limits from JSON, eg `{"polly:neural": {"requests_per_second": 16, "burst": 20}}`."""
+    return {key: RateLimit.from_dict(values) for key, values in json.loads(Path(path).read_text()).items()}
+
+
+def reset_rate_limits(limits: Mapping[str, RateLimit] = DEFAULT_RATE_LIMITS) -> None:
+    """Replace every limit, eg with `{}` to stop limiting entirely."""
+    with _lock:
+        _limits.clear()
+        _limits.update(limits)
+        _limiters.clear()
+
+
+def retries_in_app(provider: str) -> bool:
+    """Whether `provider` or one of its models has a limit, so `limited_call` retries it and its SDK should not.
+
+    Retries in both would multiply, one throttle turning into every SDK attempt of every `limited_call` attempt.
+    """
+    with _lock:
+        return any(key == provider or key.startswith(f"{provider}:") for key in _limits)
+
+
+def rate_limiter(provider: str, model: str | None = None) -> RateLimiter | None:
+    """The process wide limiter for a provider and model, or None when neither has a limit."""
+    key = f"{provider}:{model}" if model else provider
+    try:
+        return _limiters[key]
+    except KeyError:
+        pass
+    with _lock:
+        if key not in _limiters:
+            limit = _limits.get(key) or _limits.get(provider)
+            _limiters[key] = RateLimiter(key, limit) if limit else None
+        return _limiters[key]
+
+
+def _error_details(e: BaseException) -> tuple[str | None, int | None, Mapping[str, str]]:
+    """Error code, HTTP status and headers from a botocore `ClientError` or an OpenAI `APIStatusError`."""
+    response = getattr(e, "response", None)
+    if isinstance(response, dict):  # botocore
+        response_metadata = response.get("ResponseMetadata", {})
+        return (
+            response.get("Error", {}).get("Code"),
+            response_metadata.get("HTTPStatusCode"),
+            response_metadata.get("HTTPHeaders", {}),
+        )
+    return None, getattr(e, "status_code", None), getattr(response, "headers", None) or {}
+
+
+def is_throttle(e: BaseException) -> bool:
+    code, status, _ = _error_details(e)
+    return code in THROTTLING_ERROR_CODES or status == 429
+
+
+def is_transient(e: BaseException) -> bool:
+    """A server error or dropped connection that is likely to succeed when retried."""
+    code, status, _ = _error_details(e)
+    if code in TRANSIENT_ERROR_CODES or (isinstance(status, int) and status >= 500):
+        return True
+    return any(cls.__name__ in CONNECTION_ERROR_NAMES for cls in type(e).__mro__)
+
+
+def retry_after(e: BaseException) -> float | None:
+    """Seconds the provider asked us to wait, from `retry-after-ms` or `retry-after` as seconds or a date."""
+    _, _, headers = _error_details(e)
+    headers = {key.lower(): value for key, value in headers.items()}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # Standard Library
+            from email.utils import parsedate_to_datetime
+
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        logger.debug(f"Ignoring unparseable Retry-After headers {headers}")
+        return None
+
+
+def _on_error(e: Exception, limiter: RateLimiter | None, attempt: int, policy: BackoffPolicy, name: str) -> float:
+    """Seconds to back off before retrying after `e`, re-raising it when it is not retryable or attempts ran out.
+
+    Only throttles slow the limiter down, transient errors are just retried.
+    """
+    throttled = is_throttle(e)
+    if not (throttled or is_transient(e)) or attempt + 1 >= policy.max_attempts:
+        raise e
+    if throttled and limiter is not None:
+        limiter.on_throttle()
+    delay = policy.delay(attempt, retry_after(e))
+    metrics.increment("ratelimit.throttled" if throttled else "ratelimit.transient", limiter=name)
+    logger.warning(
+        f"{name} {'throttled' if throttled else 'failed'} on attempt {attempt + 1}, retrying in {delay:.2f}s: {e}"
+    )
+    return delay
+
+
+def limited_call(
+    provider: str, model: str | None, function: Callable[[], T], policy: BackoffPolicy = DEFAULT_BACKOFF
+) -> T:
+    """Call `function` at the pace the provider allows, backing off and retrying when it is throttled anyway.
+
+    Transient server and connection errors are retried too, as the SDKs of limited providers make a single
+    attempt, see `retries_in_app`.
+    """
+    limiter = rate_limiter(provider, model)
+    name = limiter.name if limiter else provider
+    for attempt in itertools.count():
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            result = function()
+        except Exception as e:
+            time.sleep(_on_error(e, limiter, attempt, policy, name))
+            continue
+        if limiter is not None:
+            limiter.on_success()
+        return result
+
+
+async def alimited_call(
+    provider: str, model: str | None, function: Callable[[], Awaitable[T]], policy: BackoffPolicy = DEFAULT_BACKOFF
+) -> T:
+    """Async version of `limited_call`, sharing the same limiters."""
+    # Standard Library
+    import asyncio
+
+    limiter = rate_limiter(provider, model)
+    name = limiter.name if limiter else provider
+    for attempt in itertools.count():
+        if limiter is not None:
+            await limiter.aacquire()
+        try:
+            result = await function()
+        except Exception as e:
+            await asyncio.sleep(_on_error(e, limiter, attempt, policy, name))
+            continue
+        if limiter is not None:
+            limiter.on_success()
+        return result
@@ -0,0 +1,174 @@
+# Standard Library
+import logging
+import shutil
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+
+# Our Libraries
+from very_demure import metrics
+from very_demure.mp3 import iter_frames
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEGMENT_SECONDS = 6.0
+# HLS packed audio segments carry their start time in an ID3 PRIV frame owned by this identifier
+# https://datatracker.ietf.org/doc/html/rfc8216#section-3.4
+TIMESTAMP_OWNER = b"com.apple.streaming.transportStreamTimestamp"
+MPEG_TIMESCALE = 90_000
+MP3_CODEC = "mp4a.40.34"
+# ffmpeg output arguments for the extra renditions encoded when it is installed
+LOW_BITRATE_MP3_ARGS = ["-codec:a", "libmp3lame", "-b:a", "24k", "-ac", "1"]
+OPUS_ARGS = ["-codec:a", "libopus", "-b:a", "24k", "-application", "voip", "-ac", "1"]
+
+
+@dataclass(frozen=True)
+class Segment:
+    audio: bytes
+    start_seconds: float
+    duration_seconds: float
+
+
+@dataclass(frozen=True)
+class Rendition:
+    """One HLS variant stream of a session."""
+
+    name: str
+    playlist: Path
+    bandwidth: int  # Peak bits per second of any segment
+    average_bandwidth: int
+
+
+@dataclass(frozen=True)
+class PackagedSession:
+    master_playlist: Path
+    renditions: list[Rendition]
+    opus_file: Path | None = None
+
+
+def segment_mp3(data: bytes, segment_seconds: float = DEFAULT_SEGMENT_SECONDS) -> list[Segment]:
+    """Cut an MP3 into segments of at least `segment_seconds`, on frame boundaries, without re-encoding.
+
+    Each segment starts with the ID3 timestamp HLS packed audio requires, so players can start on any of them.
+    """
+    segments = []
+    frames: list[memoryview] = []
+    start = duration = 0.0
+    for header, frame in iter_frames(data):
+        frames.append(frame)
+        duration += header.duration_seconds
+        if duration >= segment_seconds:
+            segments.append(Segment(packed_audio_timestamp(start) + b"".join(frames), start, duration))
+            frames, start, duration = [], start + duration, 0.0
+    if frames:
+        segments.append(Segment(packed_audio_timestamp(start) + b"".join(frames), start, duration))
+    return segments
+
+
+def packed_audio_timestamp(start_seconds: float) -> bytes:
+    """An ID3v2.4 tag holding a PRIV frame with the 33 bit MPEG-2 presentation time of a segment."""
+    pts = round(start_seconds * MPEG_TIMESCALE) & (2**33 - 1)
+    frame_body = TIMESTAMP_OWNER + b"\x00" + pts.to_bytes(8, "big")
+    frame = b"PRIV" + _synchsafe(len(frame_body)) + b"\x00\x00" + frame_body
+    return b"ID3\x04\x00\x00" + _synchsafe(len(frame)) + frame
+
+
+def _synchsafe(value: int) -> bytes:
+    return bytes((value >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def media_playlist(segments: list[Segment], names: list[str]) -> str:
+    """A complete (VOD) HLS media playlist for `segments` served as `names`."""
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        # Each segment duration rounded to the nearest second must fit the target duration
+        f"#EXT-X-TARGETDURATION:{round(max((s.duration_seconds for s in segments), default=0))}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:VOD",
+        "#EXT-X-INDEPENDENT-SEGMENTS",
+    ]
+    for segment, name in zip(segments, names, strict=True):
+        lines += [f"#EXTINF:{segment.duration_seconds:.3f},", name]
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+def master_playlist(renditions: list[Rendition], directory: Path) -> str:
+    """An HLS multivariant playlist listing every rendition, highest bandwidth first."""
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-INDEPENDENT-SEGMENTS"]
+    for rendition in sorted(renditions, key=lambda rendition: rendition.bandwidth, reverse=True):
+        lines += [
+            f"#EXT-X-STREAM-INF:BANDWIDTH={rendition.bandwidth},"
+            f'AVERAGE-BANDWIDTH={rendition.average_bandwidth},CODECS="{MP3_CODEC}"',
+            rendition.playlist.relative_to(directory).as_posix(),
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def write_hls_rendition(
+    data: bytes, directory: Path, name: str, segment_seconds: float = DEFAULT_SEGMENT_SECONDS
+) -> Rendition:
+    """Segment an MP3 into `directory/name/` with its media playlist."""
+    rendition_dir = directory / name
+    rendition_dir.mkdir(parents=True, exist_ok=True)
+    segments = segment_mp3(data, segment_seconds)
+    if not segments:
+        raise ValueError(f"Unfortunately there are no MP3 frames to segment for the {name} rendition")
+
+    names = [f"segment-{i:05d}.mp3" for i in range(len(segments))]
+    for segment, segment_name in zip(segments, names, strict=True):
+        (rendition_dir / segment_name).write_bytes(segment.audio)
+    playlist = rendition_dir / "playlist.m3u8"
+    playlist.write_text(media_playlist(segments, names))
+
+    total_bytes = sum(len(segment.audio) for segment in segments)
+    metrics.increment("output.bytes_written", total_bytes, kind="segment")
+    total_seconds = sum(segment.duration_seconds for segment in segments)
+    return Rendition(
+        name=name,
+        playlist=playlist,
+        bandwidth=max(round(len(s.audio) * 8 / s.duration_seconds) for s in segments),
+        average_bandwidth=round(total_bytes * 8 / total_seconds),
+    )
+
+
+def transcode(ffmpeg: str, source: Path, destination: Path, output_args: list[str]) -> Path:
+    subprocess.run(
+        [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", str(source), *output_args, str(destination)],
+        check=True,
+        capture_output=True,
+    )
+    return destination
+
+
+def package_session(
+    mp3_file: Path,
+    output_location: Path,
+    segment_seconds: float = DEFAULT_SEGMENT_SECONDS,
+    ffmpeg: str | None = None,
+) -> PackagedSession:
+    """Write HLS renditions of a rendered session, plus an Ogg/Opus file, next to its MP3.
+
+    `<name>.hls/index.m3u8` lists the renditions so players start after the first few seconds of audio
+    rather than the whole file. The Polly MP3 is always segmented as is. With `ffmpeg` (found on the PATH
+    by default) a low bitrate MP3 rendition and `<name>.ogg` are encoded too.
+    """
+    ffmpeg = ffmpeg or shutil.which("ffmpeg")
+    hls_dir = output_location / f"{mp3_file.stem}.hls"
+    with metrics.span("package", session=mp3_file.stem, ffmpeg=bool(ffmpeg)):
+        renditions = [write_hls_rendition(mp3_file.read_bytes(), hls_dir, "mp3", segment_seconds)]
+
+        opus_file = None
+        if ffmpeg:
+            low_file = transcode(ffmpeg, mp3_file, hls_dir / "mp3-low.mp3", LOW_BITRATE_MP3_ARGS)
+            renditions.append(write_hls_rendition(low_file.read_bytes(), hls_dir, "mp3-low", segment_seconds))
+            low_file.unlink()
+            opus_file = transcode(ffmpeg, mp3_file, output_location / f"{mp3_file.stem}.ogg", OPUS_ARGS)
+        else:
+            logger.info("ffmpeg not found, packaging only the original MP3 rendition")
+
+        master = hls_dir / "index.m3u8"
+        master.write_text(master_playlist(renditions, hls_dir))
+    logger.info(f"Packaged {mp3_file.name} as {len(renditions)} HLS renditions in {hls_dir}")
+    return PackagedSession(master_playlist=master, renditions=renditions, opus_file=opus_file)
@@ -5,25 +5,31 @@ from dataclasses import dataclass
 logger = logging.getLogger(__name__)
 
 VALID_VOICES = ["Matthew", "Amy", "Ruth"]
+VALID_PAUSE_MODES = ["ssml", "silence"]
 
 
-@dataclass
+@dataclass(frozen=True)
 class SpeechSynthConfig:
     engine: str = "neural"
     voice: str = "Matthew"
     voice_speed: str = "slow"
     duration_minutes: str = "1"
     flavour: str = "sleepy"  # flavour = sleepy|morning|everyday
+    sample_rate: str = "24000"
+    output_format: str = "mp3"
+    pause_mode: str = "ssml"  # ssml = Polly <break> tags, silence = splice in locally generated silence
 
     def __post_init__(self):
         if self.voice not in VALID_VOICES:
             raise ValueError(f"Unfortunately {self.voice} is not one of {VALID_VOICES}.")
+        if self.pause_mode not in VALID_PAUSE_MODES:
+            raise ValueError(f"Unfortunately {self.pause_mode} is not one of {VALID_PAUSE_MODES}.")
 
 
 DEFAULT_SPEECH_CONFIG = SpeechSynthConfig()
 
 
-@dataclass
+@dataclass(frozen=True)
 class LLMProviderConfig:
     provider: str
     model_id: str
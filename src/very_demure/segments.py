@@ -0,0 +1,124 @@
+# Standard Library
+import hashlib
+import json
+import logging
+import re
+import threading
+import unicodedata
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+# Our Libraries
+from very_demure import metrics
+from very_demure.cache import DEFAULT_CACHE_DIR, SynthesisCache
+from very_demure.clients import SDK_BACKEND
+from very_demure.schema import SpeechSynthConfig
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEGMENT_STORE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2 GiB
+DEFAULT_SENTENCE_GAP_MS = 300  # Silence between sentences that were synthesized separately
+SENTENCE_SPLIT_PATTERN = re.compile("(?<=[.!?])\\s+|\\n\\s*\\n")
+WHITESPACE_PATTERN = re.compile("\\s+")
+
+
+def normalize_sentence(sentence: str) -> str:
+    """The form sentences are compared in, so spacing and Unicode composition differences still share audio."""
+    return WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFC", sentence)).strip()
+
+
+def split_sentences(ssml_body: str) -> list[str]:
+    """Normalized sentences of a piece of SSML without breaks, eg one spoken stretch between pauses."""
+    sentences = (normalize_sentence(sentence) for sentence in SENTENCE_SPLIT_PATTERN.split(ssml_body))
+    return [sentence for sentence in sentences if sentence]
+
+
+def segment_key(sentence: str, prosody: str, speech_synth_config: SpeechSynthConfig, backend: str = SDK_BACKEND) -> str:
+    """Content address of one sentence's audio. `prosody` is the opening tags the sentence is spoken inside.
+
+    `backend` is what synthesized it, as in `cache.synthesis_cache_key`.
+    """
+    key_material = {
+        "sentence": normalize_sentence(sentence),
+        "backend": backend,
+        "prosody": prosody,
+        "engine": speech_synth_config.engine,
+        "voice": speech_synth_config.voice,
+        "sample_rate": speech_synth_config.sample_rate,
+        "output_format": speech_synth_config.output_format,
+    }
+    return hashlib.sha256(json.dumps(key_material, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SegmentStats:
+    """Sentences spoken across every session assembled from the store, and how many had to be synthesized."""
+
+    sentences: int = 0
+    synthesized: int = 0
+    billed_characters_saved: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return 1 - self.synthesized / self.sentences if self.sentences else 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+class SegmentStore:
+    """Persistent per sentence audio, shared by every session and flavour rendered with the same voice.
+
+    Entries live in a `SynthesisCache`, so they are written atomically and evicted least recently used first.
+    """
+
+    def __init__(
+        self,
+        directory: Path = DEFAULT_CACHE_DIR / "segments",
+        max_bytes: int = DEFAULT_SEGMENT_STORE_MAX_BYTES,
+        sentence_gap_ms: int = DEFAULT_SENTENCE_GAP_MS,
+    ):
+        self.cache = SynthesisCache(directory, max_bytes=max_bytes, hardlink=False)
+        self.sentence_gap_ms = sentence_gap_ms
+        self.stats = SegmentStats()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        return self.cache.read(key)
+
+    def put(self, key: str, audio: bytes) -> None:
+        with self.cache.store(key, evict=False) as file:
+            file.write(audio)
+
+    def evict(self) -> None:
+        self.cache.evict()
+
+    def record(self, sentences: int, synthesized: int, billed_characters_saved: int) -> SegmentStats:
+        """Count one session's sentences, returning that session's stats."""
+        session = SegmentStats(sentences, synthesized, billed_characters_saved)
+        with self.lock:
+            self.stats.sentences += sentences
+            self.stats.synthesized += synthesized
+            self.stats.billed_characters_saved += billed_characters_saved
+        metrics.increment("cache.hit", sentences - synthesized, cache="segments")
+        metrics.increment("cache.miss", synthesized, cache="segments")
+        metrics.increment("polly.billed_characters_saved", billed_characters_saved)
+        logger.info(
+            f"Segment cache hit rate {session.hit_rate:.0%}: synthesized {synthesized} of {sentences} sentences, "
+            f"saving {billed_characters_saved} billed characters"
+        )
+        return session
+
+
+_store: SegmentStore | None = None
+
+
+def configure_segment_store(store: SegmentStore | None) -> SegmentStore | None:
+    """Assemble mp3 sessions from per sentence audio in `store` from now on, or stop when it is None."""
+    global _store
+    _store = store
+    return _store
+
+
+def segment_store() -> SegmentStore | None:
+    return _store
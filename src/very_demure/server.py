@@ -0,0 +1,303 @@
+# Standard Library
+import json
+import logging
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+# Our Libraries
+from very_demure import logs, metrics
+from very_demure.batch import BatchSession, session_from_entry, synthesize_session
+from very_demure.cache import DiskResponseCache, ResponseCache, SynthesisCache
+from very_demure.estimator import save_calibrations
+from very_demure.pipeline import (
+    Clients,
+    configure_services,
+    create_clients,
+    generate_script,
+    script_group_key,
+    script_to_ssml,
+    write_transcript,
+)
+from very_demure.polly import DEFAULT_SYNTH_CONCURRENCY
+from very_demure.providers import get_llm_provider
+from very_demure.utils import SERVE_CLI_ARGS_CONFIG, cli_handle_args
+
+logger = logging.getLogger(__name__)
+
+MAX_REQUEST_BYTES = 64 * 1024
+MAX_FINISHED_JOBS = 1000
+CONTENT_TYPES = {".mp3": "audio/mpeg", ".xml": "application/ssml+xml", ".json": "application/json"}
+
+
+@dataclass
+class Job:
+    id: str
+    session: BatchSession
+    status: str = "queued"  # queued|running|succeeded|failed
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+    audio: str | None = None
+    transcript: str | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.session.name,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "artifacts": {
+                kind: f"/artifacts/{name}"
+                for kind, name in (("audio", self.audio), ("transcript", self.transcript))
+                if name is not None
+            },
+        }
+
+
+class RenderService:
+    """Queue render jobs onto a worker pool, sharing warm clients and caches between them.
+
+    Identical in-flight requests are coalesced (single-flight): submitting a session that is already queued
+    or running returns the existing job. Sessions that only differ by voice also share one in-flight script
+    generation, so a burst of requests costs one LLM call per script and one Polly render per voice.
+    """
+
+    def __init__(
+        self,
+        clients: Clients,
+        output_location: Path,
+        response_cache: ResponseCache | None = None,
+        synthesis_cache: SynthesisCache | None = None,
+        max_workers: int = 4,
+        bypass_cache: bool = False,
+        max_finished_jobs: int = MAX_FINISHED_JOBS,
+    ):
+        self.clients = clients
+        self.output_location = output_location
+        self.response_cache = response_cache
+        self.synthesis_cache = synthesis_cache
+        self.bypass_cache = bypass_cache
+        self.max_finished_jobs = max_finished_jobs
+        self.output_location.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._in_flight: dict[BatchSession, Job] = {}
+        self._scripts: dict[tuple, Future[tuple[str, Path]]] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="serve")
+
+    def submit(self, session: BatchSession) -> tuple[Job, bool]:
+        """Queue a render of `session`. Returns the job and whether it was coalesced into an existing one."""
+        with self._lock:
+            job = self._in_flight.get(session)
+            if job is not None:
+                return job, True
+            job = Job(id=uuid.uuid4().hex, session=session)
+            self._jobs[job.id] = job
+            self._in_flight[session] = job
+        self._pool.submit(self._run, job)
+        return job, False
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _run(self, job: Job) -> None:
+        job.status, job.started_at = "running", time.time()
+        try:
+            with logs.job(job.id), metrics.span("render", command="serve", job=job.id, session=job.session.name):
+                ssml_script, transcript = self._script(job.session)
+                job.transcript = transcript.name
+                result = synthesize_session(
+                    job.session, ssml_script, self.clients, self.output_location, self.synthesis_cache
+                )
+            if not result.ok:
+                raise RuntimeError(result.error)
+            job.audio = Path(result.output_file).name
+            job.status = "succeeded"
+        except Exception as e:
+            logger.error(f"Job {job.id} {job.session.name} failed: {e}")
+            job.error, job.status = repr(e), "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._in_flight.pop(job.session, None)
+                self._prune()
+            save_calibrations()
+            metrics.flush()
+
+    def _script(self, session: BatchSession) -> tuple[str, Path]:
+        """Generate, compile and save the script for a session, sharing one generation between concurrent callers."""
+        key = script_group_key(session.llm_config, session.speech_synth_config)
+        with self._lock:
+            future = self._scripts.get(key)
+            owner = future is None
+            if owner:
+                future = self._scripts[key] = Future()
+        if not owner:
+            return future.result()
+
+        llm_config, group_conf = key
+        try:
+            script = generate_script(
+                llm_config,
+                group_conf,
+                self.clients,
+                response_cache=self.response_cache,
+                bypass_cache=self.bypass_cache,
+            )
+            ssml_script = script_to_ssml(script, group_conf)
+            future.set_result(
+                (ssml_script, write_transcript(ssml_script, llm_config, group_conf, self.output_location))
+            )
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._scripts.pop(key, None)
+        return future.result()
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond `max_finished_jobs`. Must be called holding the lock."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over a `RenderService`.
+
+    POST /jobs              queue a render, the body uses the same keys as a batch manifest line
+    GET  /jobs              every known job
+    GET  /jobs/<id>         one job's status and artifact URLs
+    GET  /artifacts/<name>  a rendered MP3 or transcript
+    GET  /healthz           liveness
+    """
+
+    server: "RenderServer"
+
+    def do_GET(self) -> None:
+        service = self.server.service
+        if self.path == "/healthz":
+            return self._send_json(HTTPStatus.OK, {"status": "ok"})
+        if self.path == "/jobs":
+            return self._send_json(HTTPStatus.OK, {"jobs": [job.as_dict() for job in service.jobs()]})
+        if self.path.startswith("/jobs/"):
+            job = service.get(self.path.removeprefix("/jobs/"))
+            if job is None:
+                return self._send_error(HTTPStatus.NOT_FOUND, "No such job.")
+            return self._send_json(HTTPStatus.OK, job.as_dict())
+        if self.path.startswith("/artifacts/"):
+            return self._send_artifact(self.path.removeprefix("/artifacts/"))
+        return self._send_error(HTTPStatus.NOT_FOUND, "Not found.")
+
+    def do_POST(self) -> None:
+        if self.path != "/jobs":
+            return self._send_error(HTTPStatus.NOT_FOUND, "Not found.")
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError("Content-Length cannot be negative.")
+            if length > MAX_REQUEST_BYTES:
+                return self._send_error(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large.")
+            entry = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(entry, dict):
+                raise ValueError("Expected a JSON object.")
+            session = session_from_entry(entry)
+            get_llm_provider(session.llm_config.provider)
+        except ValueError as e:  # Includes JSONDecodeError
+            return self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+
+        job, coalesced = self.server.service.submit(session)
+        status = HTTPStatus.OK if coalesced else HTTPStatus.ACCEPTED
+        self._send_json(status, {**job.as_dict(), "coalesced": coalesced}, location=f"/jobs/{job.id}")
+
+    def _send_artifact(self, name: str) -> None:
+        output_location = self.server.service.output_location.resolve()
+        artifact = (output_location / name).resolve()
+        if artifact.parent != output_location or not artifact.is_file():
+            return self._send_error(HTTPStatus.NOT_FOUND, "No such artifact.")
+
+        with artifact.open("rb") as file:
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", CONTENT_TYPES.get(artifact.suffix, "application/octet-stream"))
+            self.send_header("Content-Length", str(artifact.stat().st_size))
+            self.end_headers()
+            shutil.copyfileobj(file, self.wfile)
+
+    def _send_json(self, status: HTTPStatus, payload: dict[str, Any], location: str | None = None) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if location:
+            self.send_header("Location", location)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: HTTPStatus, message: str) -> None:
+        self._send_json(status, {"error": message})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class RenderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: RenderService):
+        super().__init__(address, RenderRequestHandler)
+        self.service = service
+
+
+def main(args: list[str]) -> None:
+    """Entrypoint for `python -m very_demure serve`."""
+    cli_args = cli_handle_args(SERVE_CLI_ARGS_CONFIG, args)
+    logger.info(cli_args)
+
+    workers = int(cli_args["workers"])
+    configure_services(cli_args, max_pool_connections=workers * DEFAULT_SYNTH_CONCURRENCY)
+    cache_dir = Path(cli_args["cache_dir"])
+    service = RenderService(
+        clients=create_clients(),
+        output_location=Path(cli_args["output_location"]),
+        response_cache=DiskResponseCache(cache_dir / "llm"),
+        synthesis_cache=SynthesisCache(cache_dir / "polly"),
+        max_workers=workers,
+        bypass_cache=cli_args["no_llm_cache"],
+    )
+
+    metrics.configure(cli_args["metrics_out"])
+    server = RenderServer((cli_args["bind"], int(cli_args["port"])), service)
+    logger.info(f"Serving renders on http://{cli_args['bind']}:{server.server_address[1]}/jobs")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.shutdown(wait=False)
+        metrics.shutdown()
@@ -0,0 +1,94 @@
+# Standard Library
+import re
+from collections.abc import Iterable, Iterator
+
+VALID_PROSODY_RATES = ("x-slow", "slow", "medium", "fast", "x-fast")
+VALID_PROSODY_PITCHES = ("x-low", "low", "medium", "high", "x-high")
+VALID_PROSODY_VOLUMES = ("silent", "x-soft", "soft", "medium", "loud", "x-loud")
+PROSODY_RATE_PATTERN = re.compile("^\\d+%$")
+PROSODY_PITCH_PATTERN = re.compile("^[+-]+\\d+(\\.\\d+)*%$")
+
+PAUSE_MARKER_PATTERN = re.compile("\\[PAUSE (\\d+)(m|s)\\]", re.IGNORECASE)
+# Everything the compiler rewrites, matched in one pass: pause markers and XML special characters
+SCRIPT_TOKEN_PATTERN = re.compile("\\[PAUSE (\\d+)(m|s)\\]|([&<>])", re.IGNORECASE)
+# The tail of a chunk that might be the start of a pause marker completed by the next chunk
+PARTIAL_PAUSE_MARKER_PATTERN = re.compile("\\[(?:P(?:A(?:U(?:S(?:E(?: (?:\\d+[ms]?)?)?)?)?)?)?)?\\Z", re.IGNORECASE)
+
+MAX_BREAK_SECONDS = 10  # Polly ignores anything longer in a single <break>
+BREAK = '<break time="10s" />'
+XML_ESCAPES = {"&": "&amp;", "<": "&lt;", ">": "&gt;"}
+
+
+def compile_ssml(
+    chunks: Iterable[str],
+    rate: str = "medium",
+    pitch: str | None = None,
+    volume: str | None = None,
+    pause_mode: str = "ssml",
+) -> Iterator[str]:
+    """Compile a plain text script into SSML, yielding output as each chunk of input is processed.
+
+    `[PAUSE 20s]` markers become breaks (see `pause_marker_to_ssml`), XML special characters are escaped
+    and the whole script is wrapped in `<speak><prosody>`. Only the prosody attributes given are emitted.
+    A pause marker split across chunks is held back until it is complete, so any chunking of the same
+    script (eg a streamed LLM response) compiles to the same SSML.
+    """
+    yield f"<speak>{prosody_open_tag(rate, pitch, volume)}"
+
+    pending = ""
+    for chunk in chunks:
+        text = pending + chunk
+        partial = PARTIAL_PAUSE_MARKER_PATTERN.search(text)
+        cut = partial.start() if partial else len(text)
+        pending = text[cut:]
+        if cut:
+            yield compile_text(text[:cut], pause_mode)
+
+    if pending:
+        yield compile_text(pending, pause_mode)
+    yield "</prosody></speak>"
+
+
+def compile_text(text: str, pause_mode: str = "ssml") -> str:
+    """Compile a piece of script that does not end part way through a pause marker."""
+
+    def _token(match: re.Match) -> str:
+        if match.group(3):
+            return XML_ESCAPES[match.group(3)]
+        numeric, unit = match.group(1, 2)
+        return pause_to_ssml(int(numeric) * (60 if unit.lower() == "m" else 1), pause_mode)
+
+    return SCRIPT_TOKEN_PATTERN.sub(_token, text)
+
+
+def pause_to_ssml(total_seconds: int, pause_mode: str = "ssml") -> str:
+    """SSML for a pause of `total_seconds`.
+
+    Polly caps a single break at 10s so in `ssml` mode long pauses become several 10s breaks.
+    In `silence` mode the break is replaced by local silence before synthesis so it can be any length.
+    """
+    if pause_mode == "silence":
+        return f'<break time="{total_seconds}s" />'
+    return BREAK * (total_seconds // MAX_BREAK_SECONDS)
+
+
+def pause_marker_to_ssml(pause_marker: str, pause_mode: str = "ssml") -> str:
+    """Convert a single `[PAUSE 20s]` marker into SSML breaks, or one 10s break if it is not a valid marker."""
+    match = PAUSE_MARKER_PATTERN.search(pause_marker)
+    if match is None:
+        return BREAK  # if in doubt just insert one valid one
+    numeric, unit = match.groups()
+    return pause_to_ssml(int(numeric) * (60 if unit.lower() == "m" else 1), pause_mode)
+
+
+def prosody_open_tag(rate: str = "medium", pitch: str | None = None, volume: str | None = None) -> str:
+    """Opening `<prosody>` tag with only the attributes given, validated like `ssml_builder` does."""
+    if rate not in VALID_PROSODY_RATES and not PROSODY_RATE_PATTERN.match(rate):
+        raise ValueError(f"Unfortunately {rate} is not a valid prosody rate.")
+    if pitch is not None and pitch not in VALID_PROSODY_PITCHES and not PROSODY_PITCH_PATTERN.match(pitch):
+        raise ValueError(f"Unfortunately {pitch} is not a valid prosody pitch.")
+    if volume is not None and volume not in VALID_PROSODY_VOLUMES:
+        raise ValueError(f"Unfortunately {volume} is not a valid prosody volume.")
+
+    attributes = [("rate", rate), ("pitch", pitch), ("volume", volume)]
+    return "<prosody" + "".join(f' {name}="{value}"' for name, value in attributes if value is not None) + ">"
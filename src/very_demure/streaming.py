@@ -0,0 +1,215 @@
+# Standard Library
+import logging
+import queue
+import re
+import threading
+import time
+from collections.abc import Generator, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+
+# Our Libraries
+from very_demure import metrics
+from very_demure.cache import SCRIPT_MARKER
+from very_demure.mp3 import first_bitrate_kbps, iter_frames, silence
+from very_demure.pipeline import Clients, script_to_ssml, stream_script
+from very_demure.polly import DEFAULT_SYNTH_CONCURRENCY, AudioSink, stream_speech
+from very_demure.schema import (
+    DEFAULT_SPEECH_CONFIG,
+    LLMProviderConfig,
+    SpeechSynthConfig,
+)
+from very_demure.ssml import PAUSE_MARKER_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# A segment is complete at a pause marker, after a sentence ending followed by whitespace, or at a newline.
+SEGMENT_BOUNDARY_PATTERN = re.compile("(\\[PAUSE \\d+[ms]\\])|(?<=[.!?])\\s+|\\n", re.IGNORECASE)
+
+
+def iter_script_segments(deltas: Iterable[str]) -> Iterator[str]:
+    """Turn streamed LLM text into whole sentences and pause markers as soon as each one is complete.
+
+    Text before the opening `[SCRIPT]` marker is discarded and the stream is abandoned at the closing marker,
+    mirroring `cache.extract_script` for complete responses.
+    """
+    buffer = ""
+    started = False
+    for delta in deltas:
+        buffer += delta
+        if not started:
+            start = buffer.find(SCRIPT_MARKER)
+            if start == -1:
+                # Keep enough to complete a marker split across deltas
+                buffer = buffer[-(len(SCRIPT_MARKER) - 1) :]
+                continue
+            started = True
+            buffer = buffer[start + len(SCRIPT_MARKER) :]
+
+        end = buffer.find(SCRIPT_MARKER)
+        if end != -1:
+            yield from _split_segments(buffer[:end], final=True)
+            return
+        buffer = yield from _split_segments(buffer)
+
+    if not started:
+        raise ValueError(f"The streamed response never contained a {SCRIPT_MARKER} marker.")
+    yield from _split_segments(buffer, final=True)
+
+
+def _split_segments(text: str, final: bool = False) -> Generator[str, None, str]:
+    """Yield the complete segments in `text` and return the incomplete remainder."""
+    position = 0
+    for match in SEGMENT_BOUNDARY_PATTERN.finditer(text):
+        sentence = text[position : match.start()].strip()
+        if sentence:
+            yield sentence
+        if match.group(1):
+            yield match.group(1)
+        position = match.end()
+
+    remainder = text[position:]
+    if final and remainder.strip():
+        yield remainder.strip()
+        return ""
+    return remainder
+
+
+def pause_seconds(segment: str) -> int | None:
+    """Length of the pause if `segment` is a pause marker such as `[PAUSE 2m]`."""
+    pause = PAUSE_MARKER_PATTERN.fullmatch(segment)
+    if pause is None:
+        return None
+    numeric, unit = pause.groups()
+    return int(numeric) * (60 if unit.lower() == "m" else 1)
+
+
+def synthesize_stream(
+    segments: Iterable[str],
+    sink: AudioSink,
+    speech_synth_config: SpeechSynthConfig = DEFAULT_SPEECH_CONFIG,
+    polly_client=None,
+    max_workers: int = DEFAULT_SYNTH_CONCURRENCY,
+) -> int:
+    """Synthesize segments as they arrive and write their audio to `sink` in order.
+
+    Sentences are sent to Polly in parallel the moment they are complete. Pause markers always become
+    locally generated silence, at the bitrate of the speech. A writer thread passes each segment's audio to
+    `sink` as soon as it and every segment before it are ready. The pending queue is bounded, so a slow Polly
+    applies backpressure to the incoming text stream.
+    """
+    sample_rate = int(speech_synth_config.sample_rate)
+    # Spoken segments' audio, or the seconds of a pause
+    pending: queue.Queue[Future[bytes] | int | None] = queue.Queue(maxsize=max(1, max_workers) * 2)
+    errors: list[BaseException] = []
+    start = time.perf_counter()
+
+    def _synthesize_segment(segment: str) -> bytes:
+        buffer = BytesIO()
+        stream_speech(
+            script_to_ssml(segment, speech_synth_config),
+            sink=buffer.write,
+            speech_synth_config=speech_synth_config,
+            polly_client=polly_client,
+        )
+        return buffer.getvalue()
+
+    written: list[int] = []
+    writer = threading.Thread(
+        target=_write_in_order,
+        args=(pending, sink, sample_rate, errors, written, start),
+        name="stream-writer",
+        daemon=True,
+    )
+    writer.start()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="polly-stream") as pool:
+            for segment in segments:
+                if errors:
+                    break
+                seconds = pause_seconds(segment)
+                if seconds is None:
+                    pending.put(pool.submit(metrics.in_current_context(_synthesize_segment), segment))
+                else:
+                    pending.put(seconds)
+    finally:
+        pending.put(None)
+        writer.join()
+
+    if errors:
+        raise errors[0]
+    return sum(written)
+
+
+def _write_in_order(
+    pending: queue.Queue,
+    sink: AudioSink,
+    sample_rate: int,
+    errors: list[BaseException],
+    written: list[int],
+    start: float,
+) -> None:
+    """Writer thread: pass each segment's frames to `sink` in submission order until the end marker.
+
+    Pauses become silence at the bitrate of the first speech, so any before it wait until it is ready.
+    The first synthesis or sink error is recorded for the producer to raise, later segments are discarded.
+    """
+    bitrate_kbps: int | None = None
+    held: list[bytes | int] = []  # Audio and pause seconds waiting for the bitrate of the speech
+    while (item := pending.get()) is not None:
+        if errors:
+            continue  # Drain the queue so the producer never blocks
+        try:
+            if isinstance(item, Future):
+                item = item.result()
+                bitrate_kbps = bitrate_kbps or first_bitrate_kbps(item)
+            held.append(item)
+            if bitrate_kbps is not None:
+                _write_frames(held, sink, sample_rate, bitrate_kbps, written, start)
+        except BaseException as e:
+            # A failing sink, eg a closed pipe, must not end the thread or the producer blocks on a full queue
+            errors.append(e)
+    if errors:
+        return
+    try:
+        # Pauses with no speech at all keep the default bitrate
+        _write_frames(held, sink, sample_rate, bitrate_kbps, written, start)
+    except BaseException as e:
+        errors.append(e)
+
+
+def _write_frames(
+    held: list[bytes | int],
+    sink: AudioSink,
+    sample_rate: int,
+    bitrate_kbps: int | None,
+    written: list[int],
+    start: float,
+) -> None:
+    """Write and clear the held audio and pauses, each pause as silence at `bitrate_kbps`."""
+    for piece in held:
+        audio = piece if isinstance(piece, bytes) else silence(piece * 1000, sample_rate, bitrate_kbps=bitrate_kbps)
+        for _, frame in iter_frames(audio):
+            if not written:
+                logger.info(f"Time to first audio {time.perf_counter() - start:.2f}s")
+            sink(frame)
+            written.append(len(frame))
+    held.clear()
+
+
+def stream_session(
+    llm_config: LLMProviderConfig,
+    speech_synth_config: SpeechSynthConfig,
+    clients: Clients,
+    sink: AudioSink,
+    max_workers: int = DEFAULT_SYNTH_CONCURRENCY,
+) -> int:
+    """Generate and synthesize a session at the same time, streaming the audio into `sink`."""
+    deltas = stream_script(llm_config, speech_synth_config, clients)
+    return synthesize_stream(
+        iter_script_segments(deltas),
+        sink,
+        speech_synth_config=speech_synth_config,
+        polly_client=clients.polly,
+        max_workers=max_workers,
+    )
@@ -7,21 +7,33 @@ import os
 import sys
 from typing import Any
 
-# Third Party
-from dotenv import load_dotenv
-
-load_dotenv()
-
 logger = logging.getLogger(__name__)
 
 LOG_FORMAT: str = "%(levelname)s|%(asctime)s|%(filename)s:%(lineno)d - %(message)s"
-JSON_LOG_FORMAT: str = (
-    '{"level": "%(levelname)s", "time": "%(asctime)s",'
-    '"file": "%(pathname)s", "line": %(lineno)d, "message": "%(message)s"}'
-)
 ISO8601_DATE_FORMAT: str = "%Y-%m-%d %H:%M:%S"
 
 ENV_PREFIX = "VERYDEMURE_"
+DEFAULT_CACHE_DIR = ".cache/very_demure/"
+# Options of every command that renders sessions, merged into each so their flags and defaults never drift apart
+SESSION_CLI_ARGS_CONFIG = {
+    "cache-dir": DEFAULT_CACHE_DIR,
+    "no-llm-cache": {"action": "store_true", "help": "Always call the LLM, refreshing any cached script."},
+    "metrics-out": {"default": None, "help": "Append per stage spans and counters to this JSON lines file."},
+    "retry-mode": {"default": "standard", "choices": ["legacy", "standard", "adaptive"], "help": "botocore retries."},
+    "rate-limits": {"default": None, "help": "JSON file of per provider and model request and token quotas."},
+    "secondary-llm": {"default": None, "help": "provider:model raced against slow or failed script generation."},
+    "secondary-percentile": {"default": 0.95, "type": float, "help": "Primary latency percentile to hedge after."},
+    "secondary-budget": {"default": 0.1, "type": float, "help": "Most script generations to hedge, as a fraction."},
+    "synthesis": {"default": "sync", "choices": ["sync", "task", "fake"], "help": "Polly, Polly tasks or offline."},
+    "task-bucket": {"default": None, "help": "S3 bucket synthesis tasks write to, required with --synthesis task."},
+    "fake-behaviour": {"default": None, "help": "JSON file of latency and failures for --provider/--synthesis fake."},
+    "fit-duration": {"action": "store_true", "help": "Trim, pad or continue scripts to --duration before synthesis."},
+    "segment-cache": {"action": "store_true", "help": "Synthesize each sentence once per voice and reuse its audio."},
+    "duration-tolerance": {"default": 0.1, "type": float, "help": "Estimated duration error accepted, as a fraction."},
+}
+PACKAGE_CLI_ARGS_CONFIG = {
+    "package": {"action": "store_true", "help": "Also write HLS segment playlists and an Ogg/Opus rendition."},
+}
 CLI_ARGS_CONFIG = {
     "duration": None,
     "voice": "Matthew",
@@ -31,6 +43,47 @@ CLI_ARGS_CONFIG = {
     "model": "amazon.titan-text-premier-v1:0",
     "speed": "slow",
     "flavour": "sleepy",
+    "voices": None,  # Comma separated list of voices to render. Defaults to all VALID_VOICES.
+    "concurrency": 3,
+    "pause-mode": "ssml",  # ssml|silence
+    **SESSION_CLI_ARGS_CONFIG,
+    **PACKAGE_CLI_ARGS_CONFIG,
+}
+BATCH_CLI_ARGS_CONFIG = {
+    "manifest": {"positional": True, "help": "JSON lines file, one session or session matrix per line."},
+    "output-location": "./output/",
+    "summary": {"default": None, "help": "Where to write the batch summary JSON. Defaults to the output location."},
+    "bedrock-concurrency": 4,
+    "openai-concurrency": 4,
+    "polly-concurrency": 8,
+    "async": {"action": "store_true", "help": "Overlap script generation and synthesis with the asyncio pipeline."},
+    **SESSION_CLI_ARGS_CONFIG,
+    **PACKAGE_CLI_ARGS_CONFIG,
+}
+SERVE_CLI_ARGS_CONFIG = {
+    "bind": {"default": "127.0.0.1", "help": "Address to listen on."},
+    "port": {"default": 8080, "type": int},
+    "output-location": "./output/",
+    "workers": {"default": 4, "type": int, "help": "Jobs rendered at the same time."},
+    **SESSION_CLI_ARGS_CONFIG,
+}
+PUBLISH_CLI_ARGS_CONFIG = {
+    "source": {"positional": True, "nargs": "?", "default": "./dist/", "help": "Site and rendered audio to publish."},
+    "publish-location": {"default": "./publish/", "help": "Where to write the fingerprinted assets and manifest."},
+    "bucket": {"default": None, "help": "S3 bucket to upload changed objects to, skipped when not set."},
+    "key-prefix": {"default": "", "help": "Prefix for the uploaded object keys."},
+}
+CALIBRATE_CLI_ARGS_CONFIG = {
+    "renders": {"positional": True, "nargs": "?", "default": "./output/", "help": "Output location of past renders."},
+    "cache-dir": DEFAULT_CACHE_DIR,
+    "speech-marks": {"action": "store_true", "help": "Also calibrate from Polly speech marks for each transcript."},
+}
+
+ASSEMBLE_CLI_ARGS_CONFIG = {
+    "inputs": {"positional": True, "nargs": "+", "help": "Rendered MP3s to join, in order."},
+    "output": {"default": "./dist/assets/assembled.mp3", "help": "Where to write the joined MP3."},
+    "gap": {"default": 0, "type": int, "help": "Milliseconds of silence between inputs."},
+    "title": {"default": None, "help": "Title to tag the joined MP3 with."},
 }
 
 
@@ -38,16 +91,31 @@ def sanitise_model_name(model_name: str) -> str:
     return model_name.replace(":", "_").replace(".", "_").replace("-", "_")
 
 
+def parse_voices(voices: str | None, default: list[str]) -> list[str]:
+    """Parse a comma separated list of voices, falling back to a default list."""
+    if not voices:
+        return list(default)
+    return [voice.strip() for voice in voices.split(",") if voice.strip()]
+
+
 def __argparse_factory(config: dict[str, Any]) -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
+    short_flags_used = set()
     for flag, flag_kwargs in config.items():
         lowered_flag = flag.lower()
+        if isinstance(flag_kwargs, dict) and flag_kwargs.get("positional"):
+            parser.add_argument(lowered_flag, **{k: v for k, v in flag_kwargs.items() if k != "positional"})
+            continue
+
         short_flag = f"-{lowered_flag[0]}"
         long_flag = f"--{lowered_flag}"
-        if isinstance(type(flag_kwargs), dict):
-            parser.add_argument(short_flag, long_flag, **flag_kwargs)
+        # First flag to claim a short flag keeps it, later ones are long flag only.
+        flags = [long_flag] if short_flag in short_flags_used else [short_flag, long_flag]
+        short_flags_used.add(short_flag)
+        if isinstance(flag_kwargs, dict):
+            parser.add_argument(*flags, **flag_kwargs)
         else:
-            parser.add_argument(short_flag, long_flag, default=flag_kwargs)
+            parser.add_argument(*flags, default=flag_kwargs)
     return parser
 
 
@@ -0,0 +1,53 @@
+# Standard Library
+import json
+import threading
+from io import BytesIO
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.ratelimit import reset_rate_limits
+
+
+class FakePollyClient:
+    def __init__(self, fail_voices=()):
+        self.fail_voices = set(fail_voices)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def synthesize_speech(self, **kwargs):
+        with self.lock:
+            self.calls.append(kwargs)
+        if kwargs["VoiceId"] in self.fail_voices:
+            raise RuntimeError("boom")
+        return {"AudioStream": BytesIO(kwargs["VoiceId"].encode())}
+
+
+class FakeBedrockRuntimeClient:
+    def __init__(self, output_text="Preamble [SCRIPT]Breathe in.[SCRIPT]"):
+        self.output_text = output_text
+        self.calls = []
+
+    def invoke_model(self, **kwargs):
+        self.calls.append(kwargs)
+        body = json.dumps({"results": [{"outputText": self.output_text}]}).encode()
+        return {"body": BytesIO(body)}
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limits():
+    """The fakes have no quotas, so only tests of the rate limiter itself pace their calls."""
+    reset_rate_limits({})
+    yield
+    reset_rate_limits()
+
+
+@pytest.fixture
+def fake_polly_client():
+    return FakePollyClient()
+
+
+@pytest.fixture
+def fake_bedrock_runtime_client():
+    return FakeBedrockRuntimeClient()
@@ -0,0 +1,72 @@
+# Standard Library
+import struct
+from pathlib import Path
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.assemble import assemble
+from very_demure.mp3 import (
+    duration_seconds,
+    id3v2_length,
+    iter_frames,
+    parse_frame_header,
+    silence,
+)
+
+SAMPLE = Path(__file__).parent.parent / "docs" / "samples" / "neural-Matthew-1.mp3"
+
+
+def info_counts(data: bytes) -> tuple[bytes, int, int]:
+    """The tag, frame count and byte count of the info frame after any ID3 tag."""
+    offset = id3v2_length(data)
+    header = parse_frame_header(data, offset)
+    tag, _, frames, byte_count = struct.unpack_from(">4sIII", data, offset + 4 + header.side_info_length)
+    return tag, frames, byte_count
+
+
+def test_assemble_joins_frames_with_gaps_at_the_same_bitrate(tmp_path):
+    # Given
+    sample = SAMPLE.read_bytes()
+    sample_frames = sum(1 for _ in iter_frames(sample))
+
+    # When
+    assembly = assemble([SAMPLE, SAMPLE], tmp_path / "double.mp3", gap_ms=2000, title="Morning and everyday")
+
+    # Then
+    data = (tmp_path / "double.mp3").read_bytes()
+    gap_frames = sum(1 for _ in iter_frames(silence(2000, 24000)))
+    assert assembly.frames == 2 * sample_frames + gap_frames
+    assert duration_seconds(data) == pytest.approx(2 * duration_seconds(sample) + 2, abs=0.03)
+    assert b"Morning and everyday" in data[: id3v2_length(data)]
+    tag, frames, byte_count = info_counts(data)
+    assert (tag, frames) == (b"Info", assembly.frames)
+    assert byte_count == len(data) - id3v2_length(data)
+
+
+def test_assemble_without_gaps_is_constant_bitrate(tmp_path):
+    assembly = assemble([SAMPLE, SAMPLE], tmp_path / "double.mp3")
+
+    data = (tmp_path / "double.mp3").read_bytes()
+    assert info_counts(data)[:2] == (b"Info", assembly.frames)
+    assert id3v2_length(data) == 0
+    assert [bytes(frame) for _, frame in iter_frames(data)] == 2 * [
+        bytes(frame) for _, frame in iter_frames(SAMPLE.read_bytes())
+    ]
+
+
+def test_assemble_refuses_mismatched_sample_rates(tmp_path):
+    (tmp_path / "22k.mp3").write_bytes(silence(1000, 22050))
+
+    with pytest.raises(ValueError):
+        assemble([SAMPLE, tmp_path / "22k.mp3"], tmp_path / "out.mp3")
+    assert not list(tmp_path.glob("*out.mp3*"))
+
+
+def test_assemble_can_replace_an_input(tmp_path):
+    (tmp_path / "session.mp3").write_bytes(silence(1000, 24000))
+
+    assemble([tmp_path / "session.mp3", tmp_path / "session.mp3"], tmp_path / "session.mp3")
+
+    assert duration_seconds((tmp_path / "session.mp3").read_bytes()) == pytest.approx(2, abs=0.05)
@@ -0,0 +1,89 @@
+# Standard Library
+import asyncio
+import time
+from types import SimpleNamespace
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.async_pipeline import render_sessions
+from very_demure.batch import expand_manifest_entry
+from very_demure.pipeline import Clients
+
+
+class FakeAsyncCompletions:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(self.delay)
+        message = SimpleNamespace(content="Sure [SCRIPT]Breathe in.[SCRIPT]")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class SlowPollyClient:
+    def __init__(self, fake_polly_client, delay):
+        self.fake_polly_client = fake_polly_client
+        self.delay = delay
+
+    def synthesize_speech(self, **kwargs):
+        time.sleep(self.delay)
+        return self.fake_polly_client.synthesize_speech(**kwargs)
+
+
+def test_render_sessions(tmp_path, fake_polly_client):
+    # Given
+    completions = FakeAsyncCompletions()
+    clients = Clients(
+        polly=fake_polly_client, async_openai=SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    )
+    sessions = expand_manifest_entry(
+        {"provider": "openai", "model": "gpt-4o-mini", "matrix": {"voices": ["Amy", "Ruth"], "durations": [1, 2, 3]}}
+    )
+
+    # When
+    results = asyncio.run(render_sessions(sessions, clients, output_location=tmp_path, queue_size=1))
+
+    # Then
+    assert [call["model"] for call in completions.calls] == ["gpt-4o-mini"] * 3
+    assert len(fake_polly_client.calls) == 6
+    assert all(result.ok for result in results)
+    assert [result.name for result in results] == [session.name for session in sessions]
+
+
+def test_render_sessions_overlaps_stages(tmp_path, fake_polly_client):
+    # Given 4 scripts taking 0.1s each and 4 syntheses taking 0.1s each
+    completions = FakeAsyncCompletions(delay=0.1)
+    clients = Clients(
+        polly=SlowPollyClient(fake_polly_client, delay=0.1),
+        async_openai=SimpleNamespace(chat=SimpleNamespace(completions=completions)),
+    )
+    sessions = expand_manifest_entry({"provider": "openai", "matrix": {"durations": [1, 2, 3, 4]}})
+
+    # When
+    start = time.perf_counter()
+    asyncio.run(render_sessions(sessions, clients, output_location=tmp_path, script_concurrency=1, synth_concurrency=1))
+    elapsed = time.perf_counter() - start
+
+    # Then the stages overlap, taking ~0.5s rather than the sequential 0.8s
+    assert elapsed < 0.75
+
+
+def test_render_sessions_cancellation(tmp_path, fake_polly_client):
+    completions = FakeAsyncCompletions(delay=10)
+    clients = Clients(
+        polly=fake_polly_client, async_openai=SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    )
+    sessions = expand_manifest_entry({"provider": "openai"})
+
+    async def _cancel_soon():
+        task = asyncio.create_task(render_sessions(sessions, clients, output_location=tmp_path))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(asyncio.wait_for(_cancel_soon(), timeout=2))
@@ -0,0 +1,98 @@
+# Standard Library
+import json
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.batch import (
+    expand_manifest_entry,
+    load_manifest,
+    run_batch,
+    session_from_entry,
+    summarise,
+)
+from very_demure.pipeline import Clients, script_output_name
+
+
+def test_expand_manifest_entry_matrix():
+    sessions = expand_manifest_entry(
+        {"provider": "openai", "model": "gpt-4o", "matrix": {"voices": ["Amy", "Ruth"], "durations": [5, 10]}}
+    )
+
+    assert len(sessions) == 4
+    assert {s.speech_synth_config.voice for s in sessions} == {"Amy", "Ruth"}
+    assert {s.speech_synth_config.duration_minutes for s in sessions} == {"5", "10"}
+    assert all(s.llm_config.provider == "openai" for s in sessions)
+
+
+def test_expand_manifest_entry_rejects_unknown_matrix_keys():
+    with pytest.raises(ValueError):
+        expand_manifest_entry({"matrix": {"colours": ["red"]}})
+
+
+def test_session_keys_are_cli_flags_or_config_fields():
+    flags = session_from_entry({"model": "gpt-4o", "speed": "x-slow", "pause-mode": "silence", "duration": 5})
+    config_fields = session_from_entry(
+        {"model_id": "gpt-4o", "voice_speed": "x-slow", "pause_mode": "silence", "duration_minutes": "5"}
+    )
+
+    assert flags == config_fields
+    assert flags.speech_synth_config.voice_speed == "x-slow"
+    with pytest.raises(ValueError, match="pause_mod"):
+        session_from_entry({"pause_mod": "silence"})
+    for entry in [{"speed": ["x-slow"]}, {"model": {"a": 1}}, {"duration": True}]:
+        with pytest.raises(ValueError, match="must be a string"):
+            session_from_entry(entry)
+
+
+def test_sessions_differing_in_speed_or_pause_mode_have_their_own_outputs():
+    sessions = expand_manifest_entry({"matrix": {"voices": ["Amy"]}}) + [
+        session_from_entry({"voice": "Amy", "speed": "x-slow"}),
+        session_from_entry({"voice": "Amy", "pause-mode": "silence"}),
+    ]
+
+    assert len({session.name for session in sessions}) == 3
+    assert len({script_output_name(s.llm_config, s.speech_synth_config) for s in sessions}) == 3
+
+
+def test_load_manifest_deduplicates(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text('{"voice": "Amy"}\n\n{"matrix": {"voices": ["Amy", "Ruth"]}}\n')
+
+    sessions = load_manifest(manifest)
+
+    assert [s.speech_synth_config.voice for s in sessions] == ["Amy", "Ruth"]
+
+
+def test_run_batch_shares_scripts_between_voices(tmp_path, fake_bedrock_runtime_client, fake_polly_client):
+    # Given
+    sessions = expand_manifest_entry(
+        {"matrix": {"voices": ["Amy", "Matthew", "Ruth"], "flavours": ["sleepy", "morning"]}}
+    )
+    fake_polly_client.fail_voices = {"Ruth"}
+    clients = Clients(polly=fake_polly_client, bedrock_runtime=fake_bedrock_runtime_client)
+
+    # When
+    results = run_batch(sessions, clients, output_location=tmp_path)
+    summary = summarise(results, wall_seconds=1.0)
+
+    # Then
+    assert len(fake_bedrock_runtime_client.calls) == 2
+    assert len(fake_polly_client.calls) == 6
+    assert [result.name for result in results] == [session.name for session in sessions]
+    assert summary["succeeded"] == 4
+    assert summary["failed"] == 2
+    assert len(list(tmp_path.glob("*.ssml.xml"))) == 2
+    assert (tmp_path / f"{sessions[0].name}.mp3").read_bytes() == b"Amy"
+    json.dumps(summary)
+
+
+def test_run_batch_records_script_failures(tmp_path, fake_polly_client):
+    sessions = expand_manifest_entry({"provider": "nope", "matrix": {"voices": ["Amy", "Ruth"]}})
+
+    results = run_batch(sessions, Clients(polly=fake_polly_client), output_location=tmp_path)
+
+    assert [result.ok for result in results] == [False, False]
+    assert "nope" in results[0].error
+    assert fake_polly_client.calls == []
@@ -0,0 +1,37 @@
+# Our Libraries
+from very_demure.bedrock import generate_mindfulness_script
+from very_demure.cache import DiskResponseCache
+
+
+def test_generate_mindfulness_script(fake_bedrock_runtime_client):
+    client = fake_bedrock_runtime_client
+
+    script = generate_mindfulness_script(client)
+
+    assert script == "Breathe in."
+    assert client.calls[0]["modelId"] == "amazon.titan-text-premier-v1:0"
+
+
+def test_generate_mindfulness_script_cached(tmp_path, fake_bedrock_runtime_client):
+    # Given
+    client = fake_bedrock_runtime_client
+    cache = DiskResponseCache(tmp_path)
+
+    # When
+    first = generate_mindfulness_script(client, cache=cache)
+    second = generate_mindfulness_script(client, cache=cache)
+    bypassed = generate_mindfulness_script(client, cache=cache, bypass_cache=True)
+
+    # Then
+    assert first == second == bypassed == "Breathe in."
+    assert len(client.calls) == 2
+
+
+def test_generate_mindfulness_script_cache_keyed_by_config(tmp_path, fake_bedrock_runtime_client):
+    client = fake_bedrock_runtime_client
+    cache = DiskResponseCache(tmp_path)
+
+    generate_mindfulness_script(client, cache=cache, config={"temperature": 0.1})
+    generate_mindfulness_script(client, cache=cache, config={"temperature": 0.9})
+
+    assert len(client.calls) == 2
@@ -0,0 +1,131 @@
+# Standard Library
+import os
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.cache import (
+    DiskResponseCache,
+    ResponseCache,
+    SynthesisCache,
+    cached_script,
+    synthesis_cache_key,
+)
+from very_demure.polly import synthesize_speech
+from very_demure.schema import SpeechSynthConfig
+
+
+def test_synthesis_cache_key_varies_by_voice():
+    amy = synthesis_cache_key("<speak>hi</speak>", SpeechSynthConfig(voice="Amy"))
+    ruth = synthesis_cache_key("<speak>hi</speak>", SpeechSynthConfig(voice="Ruth"))
+
+    assert amy != ruth
+    assert amy == synthesis_cache_key("<speak>hi</speak>", SpeechSynthConfig(voice="Amy"))
+
+
+def test_synthesize_speech_cache_hit_skips_polly(tmp_path, fake_polly_client):
+    # Given
+    cache = SynthesisCache(tmp_path / "cache")
+    polly_client = fake_polly_client
+    ss_conf = SpeechSynthConfig(voice="Amy")
+
+    # When
+    synthesize_speech("<speak>hi</speak>", ss_conf, tmp_path / "a.mp3", polly_client=polly_client, cache=cache)
+    synthesize_speech("<speak>hi</speak>", ss_conf, tmp_path / "b.mp3", polly_client=polly_client, cache=cache)
+
+    # Then
+    assert len(polly_client.calls) == 1
+    assert (tmp_path / "a.mp3").read_bytes() == b"Amy"
+    assert (tmp_path / "b.mp3").read_bytes() == b"Amy"
+
+
+def test_synthesize_speech_does_not_write_through_hardlink(tmp_path, fake_polly_client):
+    # Given
+    cache = SynthesisCache(tmp_path / "cache")
+    output_file = tmp_path / "out.mp3"
+    synthesize_speech("<speak>hi</speak>", SpeechSynthConfig(voice="Amy"), output_file, fake_polly_client, cache=cache)
+
+    # When
+    synthesize_speech("<speak>hi</speak>", SpeechSynthConfig(voice="Ruth"), output_file, fake_polly_client)
+
+    # Then
+    key = synthesis_cache_key("<speak>hi</speak>", SpeechSynthConfig(voice="Amy"))
+    assert cache.path(key).read_bytes() == b"Amy"
+    assert output_file.read_bytes() == b"Ruth"
+
+
+def test_synthesize_speech_writes_audio_larger_than_the_cache(tmp_path, fake_polly_client):
+    # Given
+    cache = SynthesisCache(tmp_path / "cache", max_bytes=1)
+
+    # When
+    output_file = synthesize_speech(
+        "<speak>hi</speak>", SpeechSynthConfig(voice="Amy"), tmp_path / "a.mp3", fake_polly_client, cache=cache
+    )
+
+    # Then
+    assert output_file.read_bytes() == b"Amy"
+    assert list(cache.directory.iterdir()) == []
+
+
+def test_synthesis_cache_evicts_least_recently_used(tmp_path):
+    # Given
+    cache = SynthesisCache(tmp_path, max_bytes=8)
+    for i, key in enumerate(["old", "new"]):
+        with cache.store(key) as file:
+            file.write(b"1234")
+        os.utime(cache.path(key), (i, i))
+
+    # When
+    with cache.store("newest") as file:
+        file.write(b"1234")
+
+    # Then
+    assert "old" not in cache
+    assert "new" in cache
+    assert "newest" in cache
+    assert cache.total_bytes == 8
+
+
+def test_disk_response_cache_ttl_and_max_entries(tmp_path):
+    # Given
+    cache = DiskResponseCache(tmp_path, ttl_seconds=60, max_entries=2)
+
+    # When
+    cache.set("a", "A")
+    cache.set("b", "B")
+    os.utime(cache.path("a"), (0, 0))
+    cache.set("c", "C")
+
+    # Then
+    assert cache.get("a") is None
+    assert cache.get("b") == "B"
+    assert cache.get("c") == "C"
+
+    # Expired entries are dropped
+    cache.ttl_seconds = -1
+    assert cache.get("b") is None
+
+
+def test_responses_without_a_script_are_not_cached(tmp_path):
+    # Given
+    cache = DiskResponseCache(tmp_path)
+    responses = iter(["Sorry, I cannot help with that.", "Sure! [SCRIPT]Breathe in.[SCRIPT]"])
+
+    # When
+    with pytest.raises(ValueError):
+        cached_script(cache, "key", lambda: next(responses))
+    script = cached_script(cache, "key", lambda: next(responses))
+
+    # Then
+    assert script == cached_script(cache, "key", lambda: pytest.fail("cached")) == "Breathe in."
+
+
+def test_response_caches_implement_get_and_set():
+    class GetOnlyCache(ResponseCache):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyCache()
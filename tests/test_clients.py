@@ -0,0 +1,66 @@
+# Standard Library
+from concurrent.futures import ThreadPoolExecutor
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure import clients
+from very_demure.clients import (
+    AWSClientSettings,
+    aws_client,
+    aws_client_settings,
+    clear_aws_clients,
+    configure_aws_clients,
+    ensure_pool_size,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    monkeypatch.setattr(clients, "_settings", AWSClientSettings())
+    clear_aws_clients()
+    yield
+    clear_aws_clients()
+
+
+def test_aws_client_is_cached_per_service_and_region():
+    polly = aws_client("polly", region_name="us-east-1")
+
+    assert aws_client("polly", region_name="us-east-1") is polly
+    assert aws_client("polly", region_name="eu-west-2") is not polly
+    assert aws_client("bedrock-runtime", region_name="us-east-1") is not polly
+
+
+def test_aws_client_is_created_once_under_concurrency():
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        created = set(pool.map(lambda _: id(aws_client("polly")), range(64)))
+
+    assert len(created) == 1
+
+
+def test_aws_client_uses_tuned_config():
+    # Given
+    configure_aws_clients(retry_mode="adaptive", max_attempts=5, read_timeout=30)
+    ensure_pool_size(48)
+
+    # When
+    config = aws_client("polly").meta.config
+
+    # Then
+    assert config.max_pool_connections == 48
+    assert config.read_timeout == 30
+    assert config.tcp_keepalive is True
+    assert config.retries == {"mode": "adaptive", "total_max_attempts": 5}
+
+
+def test_ensure_pool_size_only_grows():
+    ensure_pool_size(64)
+    ensure_pool_size(8)
+
+    assert aws_client_settings().max_pool_connections == 64
+
+
+def test_invalid_retry_mode():
+    with pytest.raises(ValueError):
+        configure_aws_clients(retry_mode="eventually")
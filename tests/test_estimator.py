@@ -0,0 +1,209 @@
+# Standard Library
+import shutil
+from dataclasses import replace
+from pathlib import Path
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure import estimator as estimator_cli
+from very_demure import polly, providers
+from very_demure.estimator import (
+    DurationEstimator,
+    FitPolicy,
+    calibrate_from_renders,
+    configure_duration_fit,
+    fit_script,
+    pause_seconds,
+    record_render,
+    save_calibrations,
+    ssml_features,
+)
+from very_demure.pipeline import (
+    Clients,
+    audio_output_name,
+    generate_script,
+    script_output_name,
+    script_to_ssml,
+)
+from very_demure.providers import LLMProvider
+from very_demure.schema import LLMProviderConfig, SpeechSynthConfig
+
+SAMPLES = Path(__file__).parent.parent / "docs" / "samples"
+CONFIG = SpeechSynthConfig(voice_speed="medium", duration_minutes="2")
+SENTENCE = "Breathe in slowly and let your shoulders soften."  # 8 words
+
+
+@pytest.fixture(autouse=True)
+def no_duration_fit():
+    yield
+    configure_duration_fit(None)
+
+
+@pytest.fixture
+def estimator():
+    """Calibrated to exactly half a second per word and a quarter second per sentence at the medium rate."""
+    estimator = DurationEstimator()
+    for sentences, rests in ((2, 1), (5, 0), (3, 7)):
+        ssml = script_to_ssml(" ".join([SENTENCE] * sentences + ["Rest."] * rests), CONFIG)
+        estimator.calibrate(ssml, CONFIG, sentences * (8 * 0.5 + 0.25) + rests * (0.5 + 0.25))
+    return estimator
+
+
+def script(sentences: int, pause: str = "") -> str:
+    return "\n".join(f"{SENTENCE} {pause}".strip() for _ in range(sentences))
+
+
+def test_ssml_features():
+    features = ssml_features(script_to_ssml(f"{SENTENCE} [PAUSE 25s] Rest & relax.", CONFIG))
+
+    assert features == ssml_features(f'<speak><prosody rate="medium">{SENTENCE} <break time="20000ms"/>Rest relax.')
+    assert (features.words, features.sentences, features.break_seconds, features.rate) == (10, 2, 20, "medium")
+
+
+def test_calibration_learns_word_and_sentence_seconds(estimator):
+    assert estimator.coefficients(CONFIG, "medium") == pytest.approx((0.5, 0.25))
+    assert estimator.estimate_script(script(10, "[PAUSE 30s]"), CONFIG) == pytest.approx(10 * (4.25 + 30))
+    # Other voices borrow the pooled calibration until they have their own
+    assert estimator.coefficients(replace(CONFIG, voice="Amy"), "medium") == pytest.approx((0.5, 0.25))
+    assert estimator.coefficients(CONFIG, "x-slow") != pytest.approx((0.5, 0.25))
+
+
+def test_calibrations_are_saved_and_loaded(estimator, tmp_path):
+    estimator.path = tmp_path / "durations.json"
+    estimator.save()
+
+    loaded = DurationEstimator.load(estimator.path)
+
+    assert loaded.coefficients(CONFIG, "medium") == pytest.approx((0.5, 0.25))
+
+
+def test_calibrate_from_past_renders(tmp_path):
+    # Given
+    llm_config = LLMProviderConfig(provider="bedrock", model_id="amazon.titan-text-premier-v1:0")
+    render = SpeechSynthConfig(voice="Matthew", voice_speed="x-slow")
+    shutil.copy(SAMPLES / "neural-Matthew-1.txt", tmp_path / f"{script_output_name(llm_config, render)}.ssml.xml")
+    shutil.copy(SAMPLES / "neural-Matthew-1.mp3", tmp_path / f"{audio_output_name(llm_config, render)}.mp3")
+    estimator = DurationEstimator(tmp_path / "durations.json")
+
+    # When
+    used = calibrate_from_renders(estimator, tmp_path)
+
+    # Then
+    assert used == 1
+    ssml = (SAMPLES / "neural-Matthew-1.txt").read_text()
+    assert estimator.estimate(ssml, SpeechSynthConfig(voice="Matthew")) == pytest.approx(213, abs=1)
+    assert (tmp_path / "durations.json").exists()
+
+
+def test_renders_are_calibrated_once_and_saved_when_done(tmp_path):
+    # Given
+    llm_config = LLMProviderConfig(provider="bedrock", model_id="amazon.titan-text-premier-v1:0")
+    render = SpeechSynthConfig(voice="Matthew", voice_speed="x-slow")
+    shutil.copy(SAMPLES / "neural-Matthew-1.txt", tmp_path / f"{script_output_name(llm_config, render)}.ssml.xml")
+    audio_file = tmp_path / f"{audio_output_name(llm_config, render)}.mp3"
+    shutil.copy(SAMPLES / "neural-Matthew-1.mp3", audio_file)
+    configure_duration_fit(DurationEstimator(tmp_path / "durations.json"), FitPolicy())
+
+    # When
+    record_render((SAMPLES / "neural-Matthew-1.txt").read_text(), render, audio_file)
+    saved_while_rendering = (tmp_path / "durations.json").exists()
+    save_calibrations()
+    reloaded = DurationEstimator.load(tmp_path / "durations.json")
+    used = calibrate_from_renders(reloaded, tmp_path)
+
+    # Then
+    assert not saved_while_rendering
+    assert used == 0
+    assert reloaded.calibrations and all(calibration.samples == 1 for calibration in reloaded.calibrations.values())
+
+
+def test_speech_marks_are_fetched_for_every_voice_a_transcript_was_rendered_with(monkeypatch, tmp_path):
+    # Given
+    llm_config = LLMProviderConfig(provider="bedrock", model_id="amazon.titan-text-premier-v1:0")
+    render = SpeechSynthConfig(voice="Matthew", voice_speed="x-slow")
+    shutil.copy(SAMPLES / "neural-Matthew-1.txt", tmp_path / f"{script_output_name(llm_config, render)}.ssml.xml")
+    for voice in ("Amy", "Matthew"):
+        audio_file = tmp_path / f"{audio_output_name(llm_config, replace(render, voice=voice))}.mp3"
+        shutil.copy(SAMPLES / "neural-Matthew-1.mp3", audio_file)
+    fetched = []
+
+    def fake_fetch_speech_marks(ssml_text, speech_synth_config):
+        fetched.append(speech_synth_config.voice)
+        return ssml_text, [{"time": 1000, "type": "word", "value": "Breathe"}]
+
+    monkeypatch.setattr(polly, "fetch_speech_marks", fake_fetch_speech_marks)
+
+    # When
+    estimator_cli.main([str(tmp_path), "--cache-dir", str(tmp_path / "cache"), "--speech-marks"])
+
+    # Then
+    assert sorted(fetched) == ["Amy", "Matthew"]
+
+
+def test_speech_marks_calibrate_to_the_last_word(estimator):
+    ssml = script_to_ssml(script(4), CONFIG)
+    marks = [{"time": 1000 * i, "type": "word", "value": "x"} for i in range(32)]
+
+    estimator.calibrate_from_speech_marks(ssml, replace(CONFIG, voice="Ruth"), marks)
+
+    assert estimator.estimate(ssml, replace(CONFIG, voice="Ruth")) == pytest.approx(31.5)
+
+
+def test_scripts_close_to_the_duration_are_accepted(estimator):
+    fit = fit_script(script(5, "[PAUSE 20s]"), CONFIG, estimator)
+
+    assert fit.actions == ()
+    assert fit.estimated_seconds == pytest.approx(5 * 24.25)
+
+
+def test_long_scripts_have_pauses_shortened_then_lines_dropped(estimator):
+    # Given
+    long_pauses = script(4, "[PAUSE 1m]")
+    too_many_lines = script(40)
+
+    # When
+    shortened = fit_script(long_pauses, CONFIG, estimator)
+    dropped = fit_script(too_many_lines, CONFIG, estimator)
+
+    # Then
+    assert shortened.actions == ("trimmed",)
+    assert sum(pause_seconds(shortened.script)) == 100
+    assert dropped.estimated_seconds <= 120 * 1.1
+    assert len(dropped.script.splitlines()) == 31
+
+
+def test_short_scripts_are_padded_or_continued(estimator):
+    # Given
+    continuations = []
+
+    def _continue(config):
+        continuations.append(config.duration_minutes)
+        return script(12, "[PAUSE 10s]")
+
+    # When
+    padded = fit_script(script(4, "[PAUSE 10s]"), CONFIG, estimator, FitPolicy(pad_limit=0.5))
+    continued = fit_script(script(2), CONFIG, estimator, continue_with=_continue)
+
+    # Then
+    assert padded.actions == ("padded",)
+    assert abs(padded.estimated_seconds - 120) <= 12
+    assert continued.actions[0] == "continued"
+    assert continuations == ["2"]
+    assert abs(continued.estimated_seconds - 120) <= 12
+
+
+def test_generate_script_fits_the_duration_when_configured(monkeypatch, estimator):
+    # Given
+    def _generate(llm_config, speech_synth_config, clients, response_cache=None, bypass_cache=False):
+        return script(4, "[PAUSE 2m]")
+
+    monkeypatch.setitem(providers.LLM_PROVIDERS, "long", LLMProvider(generate=_generate, stream=None))
+    configure_duration_fit(estimator, FitPolicy())
+
+    # When
+    generated = generate_script(LLMProviderConfig("long", "model"), CONFIG, Clients())
+
+    # Then
+    assert abs(estimator.estimate_script(generated, CONFIG) - 120) <= 12
@@ -0,0 +1,130 @@
+# Standard Library
+import json
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure import batch
+from very_demure.cache import SynthesisCache
+from very_demure.estimator import DurationEstimator, configure_duration_fit
+from very_demure.fakes import (
+    FakeBackend,
+    FakeBehaviour,
+    FakeConfig,
+    FakePollyClient,
+    configure_fakes,
+    fake_script,
+    load_fake_config,
+)
+from very_demure.mp3 import duration_seconds
+from very_demure.pipeline import script_to_ssml
+from very_demure.polly import process_text_to_ssml, synthesize_speech
+from very_demure.providers import create_client
+from very_demure.ratelimit import is_throttle
+from very_demure.schema import SpeechSynthConfig
+from very_demure.segments import SegmentStore, configure_segment_store
+
+
+@pytest.fixture(autouse=True)
+def real_clients():
+    yield
+    configure_fakes(FakeConfig())
+
+
+def test_fake_scripts_are_seeded_and_sized_to_the_duration():
+    ten_minutes = SpeechSynthConfig(duration_minutes="10")
+
+    script = fake_script(ten_minutes, seed=1)
+
+    assert script == fake_script(ten_minutes, seed=1)
+    assert script != fake_script(ten_minutes, seed=2)
+    assert script.count("[SCRIPT]") == 2 and "[PAUSE " in script
+    body = script.split("[SCRIPT]")[1]
+    assert DurationEstimator().estimate_script(body, ten_minutes) == pytest.approx(600, rel=0.15)
+    assert len(fake_script(SpeechSynthConfig(duration_minutes="1"))) < len(script) / 5
+
+
+def test_fake_polly_returns_mp3_as_long_as_the_ssml():
+    config = SpeechSynthConfig(duration_minutes="5")
+    ssml = script_to_ssml(fake_script(config).split("[SCRIPT]")[1], config)
+
+    response = FakePollyClient().synthesize_speech(
+        Text=ssml, VoiceId="Matthew", Engine="neural", OutputFormat="mp3", SampleRate="24000", TextType="ssml"
+    )
+
+    audio = response["AudioStream"].read()
+    assert duration_seconds(audio) == pytest.approx(DurationEstimator().estimate(ssml, config), abs=0.05)
+    assert len(audio) == pytest.approx(duration_seconds(audio) * 48000 / 8, rel=0.01)
+
+
+def test_fake_backends_inject_throttles_and_errors():
+    # Given
+    backend = FakeBackend("polly", FakeBehaviour(throttle_rate=0.2, error_rate=0.1), seed=3)
+
+    # When
+    failures = []
+    for _ in range(1000):
+        try:
+            backend.call("SynthesizeSpeech")
+        except Exception as e:
+            failures.append(is_throttle(e))
+
+    # Then
+    assert failures.count(True) == pytest.approx(200, abs=40)
+    assert failures.count(False) == pytest.approx(100, abs=30)
+
+
+def test_load_fake_config(tmp_path):
+    path = tmp_path / "fakes.json"
+    path.write_text(json.dumps({"seed": 7, "llm": {"latency_seconds": 2, "latency_sigma": 0.5}}))
+
+    assert load_fake_config(path) == FakeConfig(llm=FakeBehaviour(latency_seconds=2, latency_sigma=0.5), seed=7)
+    with pytest.raises(ValueError):
+        FakeBehaviour.from_dict({"latency": 2})
+
+
+def test_batch_runs_offline_with_fake_providers(tmp_path):
+    # Given
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(json.dumps({"provider": "fake", "matrix": {"voices": ["Amy", "Ruth"], "durations": [2]}}))
+    output = tmp_path / "output"
+
+    # When
+    batch.main([str(manifest), "--synthesis", "fake", "--output-location", str(output), "--cache-dir", str(tmp_path)])
+
+    # Then
+    assert isinstance(create_client("polly"), FakePollyClient)
+    summary = json.loads(next(output.glob("*summary*.json")).read_text())
+    assert summary["failed"] == 0
+    for audio_file in output.glob("*.mp3"):
+        assert duration_seconds(audio_file.read_bytes()) == pytest.approx(120, rel=0.15)
+    assert len(list(output.glob("*.mp3"))) == 2
+
+
+@pytest.mark.parametrize("segment_cache", [False, True])
+def test_fake_audio_never_answers_or_calibrates_real_renders(tmp_path, segment_cache):
+    # Given
+    cache = SynthesisCache(tmp_path / "polly")
+    configure_segment_store(SegmentStore(tmp_path / "segments") if segment_cache else None)
+    estimator = DurationEstimator()
+    configure_duration_fit(estimator)
+    config = SpeechSynthConfig()
+    ssml = process_text_to_ssml("Breathe in slowly. Breathe out.", config)
+    configure_fakes(FakeConfig(), synthesis=True)
+    try:
+        synthesize_speech(ssml, config, tmp_path / "fake.mp3", polly_client=create_client("polly"), cache=cache)
+        calibrated_by_fakes = dict(estimator.calibrations)
+
+        # When
+        configure_fakes(FakeConfig())
+        real_polly = FakePollyClient()
+        synthesize_speech(ssml, config, tmp_path / "real.mp3", polly_client=real_polly, cache=cache)
+    finally:
+        configure_segment_store(None)
+        configure_duration_fit(None)
+
+    # Then
+    assert real_polly.backend.calls > 0
+    assert calibrated_by_fakes == {}
+    assert estimator.calibrations
@@ -0,0 +1,166 @@
+# Standard Library
+import threading
+import time
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure import providers
+from very_demure.cache import DiskResponseCache, cached_script
+from very_demure.hedging import (
+    HedgePolicy,
+    Hedger,
+    configure_hedging,
+    parse_llm,
+    policy_from_args,
+)
+from very_demure.pipeline import Clients, generate_script
+from very_demure.providers import LLMProvider
+from very_demure.schema import DEFAULT_SPEECH_CONFIG, LLMProviderConfig
+
+PRIMARY = LLMProviderConfig(provider="bedrock", model_id="amazon.titan-text-premier-v1:0")
+SECONDARY = LLMProviderConfig(provider="openai", model_id="gpt-4o")
+
+
+class FakeGenerate:
+    """Generates `<provider> script` after the delay configured for the provider, or raises its error."""
+
+    def __init__(self, delays=None, errors=None, scripts=None):
+        self.delays = delays or {}
+        self.errors = errors or {}
+        self.scripts = scripts or {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, config):
+        with self.lock:
+            self.calls.append(config.provider)
+        time.sleep(self.delays.get(config.provider, 0))
+        if config.provider in self.errors:
+            raise self.errors[config.provider]
+        return self.scripts.get(config.provider, f"{config.provider} script")
+
+
+@pytest.fixture(autouse=True)
+def no_hedging():
+    yield
+    configure_hedging(None)
+
+
+def test_fast_primary_is_not_hedged():
+    hedger = Hedger(HedgePolicy(secondary=SECONDARY, initial_delay=1))
+    generate = FakeGenerate()
+
+    assert hedger.call(PRIMARY, generate) == "bedrock script"
+    assert generate.calls == ["bedrock"]
+
+
+def test_slow_primary_is_hedged_and_the_first_valid_script_wins():
+    # Given
+    hedger = Hedger(HedgePolicy(secondary=SECONDARY, initial_delay=0.05, budget=1))
+    generate = FakeGenerate(delays={"bedrock": 0.5})
+
+    # When
+    start = time.monotonic()
+    script = hedger.call(PRIMARY, generate)
+
+    # Then
+    assert script == "openai script"
+    assert time.monotonic() - start < 0.4
+    assert generate.calls == ["bedrock", "openai"]
+    assert hedger.hedges == 1
+
+
+def test_failed_or_invalid_primary_falls_back_without_budget():
+    hedger = Hedger(HedgePolicy(secondary=SECONDARY, initial_delay=10, budget=0))
+
+    assert hedger.call(PRIMARY, FakeGenerate(errors={"bedrock": RuntimeError("boom")})) == "openai script"
+    assert hedger.call(PRIMARY, FakeGenerate(scripts={"bedrock": "  "})) == "openai script"
+    with pytest.raises(RuntimeError, match="boom"):
+        hedger.call(PRIMARY, FakeGenerate(errors={"bedrock": RuntimeError("boom"), "openai": ValueError("bang")}))
+    assert hedger.hedges == 0
+
+
+def test_hedges_are_capped_by_the_budget():
+    # Given
+    hedger = Hedger(HedgePolicy(secondary=SECONDARY, initial_delay=0.01, budget=0.5))
+    generate = FakeGenerate(delays={"bedrock": 0.05})
+
+    # When
+    scripts = [hedger.call(PRIMARY, generate) for _ in range(4)]
+
+    # Then
+    assert scripts.count("openai script") == 2
+    assert hedger.hedges == 2
+
+
+def test_deadline_follows_the_latency_percentile():
+    hedger = Hedger(HedgePolicy(secondary=SECONDARY, initial_delay=5, min_samples=10, percentile=0.9))
+    name = "bedrock:amazon.titan-text-premier-v1:0"
+    assert hedger.deadline(name) == 5
+
+    for seconds in range(1, 11):
+        hedger._window(name).add(seconds / 10)
+
+    assert hedger.deadline(name) == 1.0
+
+
+def test_only_provider_calls_feed_the_latency_window(tmp_path):
+    # Given
+    hedger = Hedger(HedgePolicy(secondary=SECONDARY, initial_delay=1))
+    cache = DiskResponseCache(tmp_path)
+    generate = FakeGenerate(delays={"bedrock": 0.01})
+
+    def _cached_generate(config):
+        return cached_script(cache, "key", lambda: f"[SCRIPT]{generate(config)}")
+
+    # When
+    scripts = [hedger.call(PRIMARY, _cached_generate) for _ in range(3)]
+
+    # Then
+    assert scripts == ["bedrock script"] * 3
+    assert generate.calls == ["bedrock"]
+    assert len(hedger._window("bedrock:amazon.titan-text-premier-v1:0").latencies) == 1
+
+
+def test_calls_share_the_hedgers_threads():
+    hedger = Hedger(HedgePolicy(secondary=SECONDARY, initial_delay=1), max_workers=2)
+    threads = set()
+
+    for _ in range(5):
+        hedger.call(PRIMARY, lambda config: threads.add(threading.current_thread()) or "script")
+
+    assert len(threads) <= 2
+    hedger.close()
+
+
+def test_generate_script_hedges_when_configured(monkeypatch):
+    # Given
+    def _generate(delay, text):
+        def _fake(llm_config, speech_synth_config, clients, response_cache=None, bypass_cache=False):
+            time.sleep(delay)
+            return text
+
+        return LLMProvider(generate=_fake, stream=None)
+
+    monkeypatch.setitem(providers.LLM_PROVIDERS, "slow", _generate(1, "slow script"))
+    monkeypatch.setitem(providers.LLM_PROVIDERS, "fast", _generate(0, "fast script"))
+    configure_hedging(HedgePolicy(secondary=parse_llm("fast:model"), initial_delay=0.01, budget=1))
+
+    # When
+    script = generate_script(LLMProviderConfig("slow", "model"), DEFAULT_SPEECH_CONFIG, Clients())
+
+    # Then
+    assert script == "fast script"
+
+
+def test_policy_from_args():
+    assert policy_from_args({"secondary_llm": None}) is None
+    policy = policy_from_args({"secondary_llm": "bedrock:amazon.titan-text-premier-v1:0", "secondary_percentile": 0.99})
+    assert policy.secondary == PRIMARY
+    assert policy.percentile == 0.99
+    with pytest.raises(ValueError):
+        parse_llm("openai")
+    with pytest.raises(ValueError):
+        HedgePolicy(secondary=SECONDARY, percentile=99)
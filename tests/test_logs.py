@@ -0,0 +1,111 @@
+# Standard Library
+import hashlib
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure import metrics
+from very_demure.logs import (
+    PayloadPolicy,
+    configure_logging,
+    configure_logging_from_env,
+    configure_payload_logging,
+    job,
+    log_payload,
+    payload_policy,
+    shutdown_logging,
+)
+
+logger = logging.getLogger("very_demure.test_logs")
+
+
+@pytest.fixture
+def json_logs():
+    """Configure JSON logging into a buffer, returning a function that flushes and parses it."""
+    stream = io.StringIO()
+    root_level = logging.getLogger().level
+
+    def _configure(payloads: PayloadPolicy | None = None):
+        configure_logging(logging.DEBUG, json_format=True, payloads=payloads, stream=stream)
+
+    def _records() -> list[dict]:
+        shutdown_logging()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    _configure.records = _records
+    yield _configure
+    shutdown_logging()
+    configure_payload_logging(PayloadPolicy())
+    logging.getLogger().setLevel(root_level)
+
+
+def test_records_carry_the_job_id_across_thread_pools(json_logs):
+    # Given
+    json_logs()
+
+    # When
+    with job("job-1"), ThreadPoolExecutor(max_workers=2) as pool:
+        logger.info("in the job")
+        pool.submit(metrics.in_current_context(lambda: logger.info("in a worker"))).result()
+    logger.info("after the job")
+
+    # Then
+    records = json_logs.records()
+    assert [(record["message"], record["job_id"]) for record in records] == [
+        ("in the job", "job-1"),
+        ("in a worker", "job-1"),
+        ("after the job", None),
+    ]
+    assert records[0]["level"] == "INFO" and records[0]["file"] == "test_logs.py"
+
+
+def test_payloads_are_truncated_and_hashed(json_logs):
+    # Given
+    json_logs(PayloadPolicy(mode="full", max_characters=10))
+    prompt = "Breathe in slowly. " * 100
+
+    # When
+    log_payload(logger, "prompt", prompt)
+
+    # Then
+    (record,) = json_logs.records()
+    assert record["payload"] == {
+        "name": "prompt",
+        "characters": len(prompt),
+        "sha256": hashlib.sha256(prompt.encode()).hexdigest(),
+        "excerpt": prompt[:10],
+    }
+    assert len(record["message"]) < 100
+
+
+@pytest.mark.parametrize(
+    "policy,expected",
+    [(PayloadPolicy(mode="off"), 0), (PayloadPolicy(sample_rate=0.0), 0), (PayloadPolicy(sample_rate=1.0), 20)],
+)
+def test_payload_logs_are_sampled_or_off(json_logs, policy, expected):
+    json_logs(policy)
+
+    for _ in range(20):
+        log_payload(logger, "ssml", "<speak>Hello.</speak>")
+
+    assert len(json_logs.records()) == expected
+
+
+def test_production_switches_payloads_off(monkeypatch):
+    monkeypatch.setenv("VERYDEMURE_ENV", "production")
+    root_level = logging.getLogger().level
+    try:
+        configure_logging_from_env()
+        assert payload_policy().mode == "off"
+
+        monkeypatch.setenv("VERYDEMURE_LOG_PAYLOADS", "sampled")
+        configure_logging_from_env()
+        assert payload_policy().mode == "sampled"
+    finally:
+        shutdown_logging()
+        logging.getLogger().setLevel(root_level)
@@ -0,0 +1,88 @@
+# Standard Library
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure import metrics
+from very_demure.polly import synthesize_speech
+
+
+@pytest.fixture
+def metrics_out(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    metrics.configure(path)
+    yield path
+    metrics.shutdown()
+
+
+def read_records(path):
+    metrics.shutdown()
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_disabled_metrics_are_noops():
+    def function():
+        return 1
+
+    with metrics.span("anything", key="value") as span:
+        span.set("more", 1)
+    metrics.increment("counter")
+
+    assert span is metrics.NOOP_SPAN
+    assert metrics.in_current_context(function) is function
+    assert not metrics.enabled()
+
+
+def test_nested_spans_and_counters(metrics_out):
+    # Given
+    with metrics.span("render", command="test"), metrics.span("stage") as stage:
+        stage.set("items", 3)
+        metrics.increment("bytes", 10, kind="audio")
+        metrics.increment("bytes", 5, kind="audio")
+        metrics.increment("bytes", 1, kind="transcript")
+
+    with pytest.raises(RuntimeError), metrics.span("broken"):
+        raise RuntimeError("boom")
+
+    # When
+    records = read_records(metrics_out)
+
+    # Then
+    spans = {record["name"]: record for record in records if record["type"] == "span"}
+    counters = {record["attributes"]["kind"]: record["value"] for record in records if record["type"] == "counter"}
+    assert spans["stage"]["parent_span_id"] == spans["render"]["span_id"]
+    assert spans["stage"]["trace_id"] == spans["render"]["trace_id"]
+    assert spans["stage"]["attributes"] == {"items": 3}
+    assert spans["render"]["parent_span_id"] is None
+    assert spans["broken"]["status"] == "ERROR"
+    assert spans["broken"]["trace_id"] != spans["render"]["trace_id"]
+    assert counters == {"audio": 15, "transcript": 1}
+
+
+def test_in_current_context_keeps_parent_across_threads(metrics_out):
+    def work(i):
+        with metrics.span("work", i=i):
+            pass
+
+    with metrics.span("parent"), ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(metrics.in_current_context(work), range(8)))
+
+    spans = [record for record in read_records(metrics_out) if record["type"] == "span"]
+    parent = next(span for span in spans if span["name"] == "parent")
+    assert sum(span["parent_span_id"] == parent["span_id"] for span in spans) == 8
+
+
+def test_synthesize_speech_records_polly_metrics(metrics_out, tmp_path, fake_polly_client):
+    synthesize_speech("<speak>Hello there.</speak>", output_file=tmp_path / "out.mp3", polly_client=fake_polly_client)
+
+    records = read_records(metrics_out)
+
+    names = [record["name"] for record in records if record["type"] == "span"]
+    counters = {record["name"]: record["value"] for record in records if record["type"] == "counter"}
+    assert names == ["polly.request", "polly.synthesize"]
+    assert counters["polly.billed_characters"] == len("Hello there.")
+    assert counters["polly.requests"] == 1
+    assert counters["output.bytes_written"] == len("Matthew")
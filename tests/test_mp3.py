@@ -0,0 +1,76 @@
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.mp3 import (
+    duration_seconds,
+    iter_frames,
+    parse_frame_header,
+    silence,
+    silent_frame,
+)
+
+# MPEG2 Layer III, 8kbps, 24000Hz, mono. 72 * 8000 / 24000 = 24 bytes per frame.
+HEADER = bytes([0xFF, 0xF3, 0x14, 0xC0])
+
+
+def make_frame(fill: int = 0) -> bytes:
+    return HEADER + bytes([fill]) * 20
+
+
+def test_parse_frame_header():
+    header = parse_frame_header(make_frame())
+
+    assert header.sample_rate == 24000
+    assert header.bitrate_kbps == 8
+    assert header.frame_length == 24
+    assert header.samples_per_frame == 576
+
+
+def test_iter_frames_strips_tags():
+    # Given
+    id3v2 = b"ID3" + bytes([4, 0, 0, 0, 0, 0, 2]) + b"xx"
+    info_frame = HEADER + bytes(9) + b"Info" + bytes(7)
+    id3v1 = b"TAG" + bytes(125)
+    data = id3v2 + info_frame + make_frame(1) + make_frame(2) + id3v1
+
+    # When
+    frames = [bytes(frame) for _, frame in iter_frames(data)]
+
+    # Then
+    assert frames == [make_frame(1), make_frame(2)]
+    assert duration_seconds(data) == 2 * 576 / 24000
+
+
+def test_iter_frames_resynchronises_after_junk():
+    data = make_frame(1) + b"junk" + make_frame(2)
+
+    assert [bytes(frame) for _, frame in iter_frames(data)] == [make_frame(1), make_frame(2)]
+
+
+def test_silence_duration_matches_request():
+    # Given
+    audio = silence(60_000, 24000)
+
+    # When
+    frames = list(iter_frames(audio))
+
+    # Then
+    assert len(frames) == 2500  # 60s * 24000Hz / 576 samples per frame
+    assert abs(duration_seconds(audio) - 60) < 0.03
+    assert all(header.sample_rate == 24000 for header, _ in frames)
+    assert silence(60_000, 24000) is audio  # Cached per duration
+
+
+def test_silent_frame_mpeg1():
+    header = parse_frame_header(silent_frame(44100))
+
+    assert header.sample_rate == 44100
+    assert header.samples_per_frame == 1152
+
+
+def test_silent_frame_at_a_bitrate():
+    assert parse_frame_header(silent_frame(24000, bitrate_kbps=48)).bitrate_kbps == 48
+    assert parse_frame_header(silent_frame(24000)).bitrate_kbps == 8
+    with pytest.raises(ValueError):
+        silent_frame(24000, bitrate_kbps=320)
@@ -0,0 +1,59 @@
+# Standard Library
+from types import SimpleNamespace
+
+# Our Libraries
+from very_demure.cache import DiskResponseCache
+from very_demure.openai import generate_mindfulness_script
+from very_demure.pipeline import Clients, generate_script, stream_script
+from very_demure.schema import LLMProviderConfig, SpeechSynthConfig
+
+
+class FakeCompletions:
+    def __init__(self, content):
+        self.content = content
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get("stream"):
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.content))])])
+        message = SimpleNamespace(content=self.content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeOpenAI:
+    def __init__(self, content="Sure! [SCRIPT]Breathe in.[SCRIPT]"):
+        self.chat = SimpleNamespace(completions=FakeCompletions(content))
+
+
+def test_generate_mindfulness_script_cached(tmp_path):
+    # Given
+    client = FakeOpenAI()
+    cache = DiskResponseCache(tmp_path)
+
+    # When
+    first = generate_mindfulness_script(client, cache=cache)
+    second = generate_mindfulness_script(client, cache=cache)
+
+    # Then
+    assert first == second == "Breathe in."
+    assert len(client.chat.completions.calls) == 1
+
+    # Different model is a different cache entry
+    generate_mindfulness_script(client, model="gpt-4o-mini", cache=cache)
+    assert len(client.chat.completions.calls) == 2
+
+
+def test_provider_calls_the_configured_model():
+    # Given
+    client = FakeOpenAI()
+    llm_config = LLMProviderConfig(provider="openai", model_id="gpt-4o-mini")
+
+    # When
+    script = generate_script(llm_config, SpeechSynthConfig(), Clients(openai=client))
+    streamed = "".join(stream_script(llm_config, SpeechSynthConfig(), Clients(openai=client)))
+
+    # Then
+    assert script == "Breathe in."
+    assert streamed == "Sure! [SCRIPT]Breathe in.[SCRIPT]"
+    assert [call["model"] for call in client.chat.completions.calls] == ["gpt-4o-mini", "gpt-4o-mini"]
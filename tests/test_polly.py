@@ -1,15 +1,34 @@
 # Standard Library
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from pathlib import Path
 
 # Third Party
 import pytest
 
 # Our Libraries
+from very_demure.fakes import FakePollyClient
+from very_demure.mp3 import duration_seconds, iter_frames
+from very_demure.pipeline import configure_services
 from very_demure.polly import (
+    SynthesisTaskConfig,
+    SynthesisTaskWaiter,
+    billed_characters,
+    configure_synthesis_tasks,
+    download_s3_object,
+    iter_audio_chunks,
     process_pause_marker,
     process_pause_markers,
     process_text_to_ssml,
+    split_ssml,
+    split_ssml_pauses,
+    stream_speech,
+    stream_speech_task,
+    synthesize_speech,
+    synthesize_voices,
 )
 from very_demure.schema import SpeechSynthConfig
 
@@ -56,6 +75,10 @@ def test_process_pause_marker(test_case, expectation):
     assert result == expectation
 
 
+def test_process_pause_marker_silence_mode():
+    assert process_pause_marker("[PAUSE 25s]", pause_mode="silence") == '<break time="25s" />'
+
+
 test_pause_markers_scenarios = {
     "single line": ("[PAUSE 20s][PAUSE 1m]", '<break time="10s" />' * 8),
     "multi-line": (
@@ -76,3 +99,314 @@ def test_process_pause_markers(test_case, expectation):
 
     # Then
     assert result == expectation
+
+
+def test_synthesize_voices(tmp_path, fake_polly_client):
+    # Given
+    polly_client = fake_polly_client
+    polly_client.fail_voices = {"Ruth"}
+    jobs = [(SpeechSynthConfig(voice=voice), tmp_path / f"{voice}.mp3") for voice in ["Amy", "Matthew", "Ruth"]]
+
+    # When
+    results = synthesize_voices("<speak>hi</speak>", jobs, polly_client=polly_client, max_workers=2)
+
+    # Then
+    assert [result.voice for result in results] == ["Amy", "Matthew", "Ruth"]
+    assert [result.ok for result in results] == [True, True, False]
+    assert (tmp_path / "Amy.mp3").read_bytes() == b"Amy"
+    assert (tmp_path / "Matthew.mp3").read_bytes() == b"Matthew"
+    assert sorted(call["VoiceId"] for call in polly_client.calls) == ["Amy", "Matthew", "Ruth"]
+
+
+def test_iter_audio_chunks_reuses_buffer():
+    # Given
+    audio_stream = BytesIO(bytes(range(10)))
+
+    # When
+    chunks = [bytes(chunk) for chunk in iter_audio_chunks(audio_stream, chunk_size=4)]
+
+    # Then
+    assert chunks == [bytes([0, 1, 2, 3]), bytes([4, 5, 6, 7]), bytes([8, 9])]
+
+
+def test_stream_speech_to_sink(fake_polly_client):
+    # Given
+    received = bytearray()
+    progress = []
+
+    # When
+    total_bytes = stream_speech(
+        "<speak>hi</speak>",
+        sink=received.extend,
+        speech_synth_config=SpeechSynthConfig(voice="Matthew"),
+        polly_client=fake_polly_client,
+        chunk_size=3,
+        progress=progress.append,
+    )
+
+    # Then
+    assert total_bytes == len(b"Matthew")
+    assert bytes(received) == b"Matthew"
+    assert progress == [3, 6, 7]
+
+
+def test_split_ssml_short_script_is_unchanged():
+    ssml = '<speak><prosody rate="slow">Hello.</prosody></speak>'
+
+    assert split_ssml(ssml) == [ssml]
+
+
+def test_split_ssml_long_script():
+    # Given
+    script = " ".join(f"Sentence number {i} is here." for i in range(400)) + "\n\n[PAUSE 1m]\n\nThe end."
+    ssml = process_text_to_ssml(script)
+
+    # When
+    chunks = split_ssml(ssml, max_characters=1000, max_billed_characters=500)
+
+    # Then
+    opening, closing = '<speak><prosody rate="slow" pitch="medium" volume="medium">', "</prosody></speak>"
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.startswith(opening)
+        assert chunk.endswith(closing)
+        assert len(chunk) <= 1000
+        assert billed_characters(chunk) <= 500
+    body = slice(len(opening), -len(closing))
+    assert "".join(chunk[body] for chunk in chunks) == ssml[body]
+
+
+def test_split_ssml_never_splits_inside_tags():
+    ssml = "<speak>" + '<break time="10s" />' * 100 + "</speak>"
+
+    chunks = split_ssml(ssml, max_characters=300)
+
+    assert len(chunks) > 1
+    assert all(chunk.count("<break") * len('<break time="10s" />') == len(chunk) - 15 for chunk in chunks)
+
+
+class FakeMp3PollyClient:
+    """Returns one 24 byte MPEG2 Layer III frame per request, filled with the request number."""
+
+    def __init__(self):
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def synthesize_speech(self, **kwargs):
+        with self.lock:
+            self.requests.append(kwargs["Text"])
+            fill = len(self.requests)
+        frame = bytes([0xFF, 0xF3, 0x14, 0xC0]) + bytes([fill]) * 20
+        return {"AudioStream": BytesIO(b"ID3" + bytes([4, 0, 0, 0, 0, 0, 0]) + frame)}
+
+
+def test_synthesize_speech_chunks_long_scripts(tmp_path):
+    # Given
+    polly_client = FakeMp3PollyClient()
+    script = " ".join(f"Sentence number {i} is here." for i in range(400))
+    ssml = process_text_to_ssml(script)
+
+    # When
+    output_file = synthesize_speech(ssml, output_file=tmp_path / "long.mp3", polly_client=polly_client)
+
+    # Then
+    data = output_file.read_bytes()
+    assert len(polly_client.requests) > 1
+    assert len(data) == 24 * len(polly_client.requests)
+    assert not data.startswith(b"ID3")
+    # Frames are joined in script order regardless of which request finished first
+    order = [polly_client.requests.index(chunk) + 1 for chunk in split_ssml(ssml)]
+    assert [data[i * 24 + 4] for i in range(len(order))] == order
+
+
+def test_split_ssml_pauses():
+    ssml = '<speak><prosody rate="slow">Hello.\n\n<break time="10s" /><break time="500ms" />\n\nBye.</prosody></speak>'
+
+    assert split_ssml_pauses(ssml) == [
+        '<speak><prosody rate="slow">Hello.</prosody></speak>',
+        10.5,
+        '<speak><prosody rate="slow">Bye.</prosody></speak>',
+    ]
+
+
+def test_synthesize_speech_with_local_silence(tmp_path):
+    # Given
+    polly_client = FakeMp3PollyClient()
+    ss_conf = SpeechSynthConfig(pause_mode="silence")
+    ssml = process_text_to_ssml("Hello.\n[PAUSE 90s]\nBye.", speech_synth_config=ss_conf)
+
+    # When
+    output_file = synthesize_speech(ssml, ss_conf, output_file=tmp_path / "out.mp3", polly_client=polly_client)
+
+    # Then
+    assert '<break time="90s" />' in ssml
+    assert all("<break" not in request for request in polly_client.requests)
+    assert len(polly_client.requests) == 2
+    assert abs(duration_seconds(output_file.read_bytes()) - 90 - 2 * 576 / 24000) < 0.03
+
+
+def test_local_silence_has_the_bitrate_of_the_speech(tmp_path):
+    # Given
+    ss_conf = SpeechSynthConfig(pause_mode="silence")
+    ssml = process_text_to_ssml("[PAUSE 10s]\nHello.\n[PAUSE 5s]\nBye.", speech_synth_config=ss_conf)
+
+    # When
+    output_file = synthesize_speech(ssml, ss_conf, output_file=tmp_path / "out.mp3", polly_client=FakePollyClient())
+
+    # Then
+    assert {header.bitrate_kbps for header, _ in iter_frames(output_file.read_bytes())} == {48}
+    assert duration_seconds(output_file.read_bytes()) > 15
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects = {}
+        self.ranges = []
+        self.deleted = []
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self.objects[(Bucket, Key)]
+        if Range:
+            self.ranges.append(Range)
+            start, end = map(int, Range.removeprefix("bytes=").split("-"))
+            data = data[start : end + 1]
+        return {"Body": BytesIO(data)}
+
+    def delete_object(self, Bucket, Key):
+        self.deleted.append(Key)
+        del self.objects[(Bucket, Key)]
+
+
+class FakePollyTaskClient:
+    """Tasks complete after `polls_until_done` status checks, writing `<voice> audio` to the fake S3."""
+
+    def __init__(self, s3, polls_until_done=2, fail=False):
+        self.s3 = s3
+        self.polls_until_done = polls_until_done
+        self.fail = fail
+        self.tasks = {}
+        self.poll_threads = set()
+        self.lock = threading.Lock()
+
+    def start_speech_synthesis_task(self, **kwargs):
+        with self.lock:
+            task_id = f"task-{len(self.tasks)}"
+            self.tasks[task_id] = {"kwargs": kwargs, "polls": 0}
+        return {"SynthesisTask": {"TaskId": task_id, "TaskStatus": "scheduled"}}
+
+    def get_speech_synthesis_task(self, TaskId):
+        with self.lock:
+            self.poll_threads.add(threading.current_thread().ident)
+            task = self.tasks[TaskId]
+            task["polls"] += 1
+            if task["polls"] < self.polls_until_done:
+                return {"SynthesisTask": {"TaskId": TaskId, "TaskStatus": "inProgress"}}
+        if self.fail:
+            return {"SynthesisTask": {"TaskId": TaskId, "TaskStatus": "failed", "TaskStatusReason": "bad SSML"}}
+        kwargs = task["kwargs"]
+        key = f"{kwargs['OutputS3KeyPrefix']}.{TaskId}.mp3"
+        self.s3.objects[(kwargs["OutputS3BucketName"], key)] = f"{kwargs['VoiceId']} audio".encode()
+        uri = f"https://s3.us-east-1.amazonaws.com/{kwargs['OutputS3BucketName']}/{key}"
+        return {"SynthesisTask": {"TaskId": TaskId, "TaskStatus": "completed", "OutputUri": uri}}
+
+
+@pytest.fixture
+def task_waiter():
+    waiter = configure_synthesis_tasks(SynthesisTaskConfig(output_bucket="bucket", poll_interval=0.01))
+    yield waiter
+    configure_synthesis_tasks(None)
+
+
+def test_download_s3_object_fetches_ranges_in_parallel_and_writes_in_order():
+    # Given
+    s3 = FakeS3Client()
+    s3.objects[("bucket", "key")] = bytes(range(256)) * 4
+    buffer = BytesIO()
+
+    # When
+    total = download_s3_object(s3, "bucket", "key", buffer.write, range_size=100, max_workers=3)
+
+    # Then
+    assert total == 1024
+    assert buffer.getvalue() == bytes(range(256)) * 4
+    assert len(s3.ranges) == 11
+    assert s3.ranges[-1] == "bytes=1000-1023"
+
+
+def test_stream_speech_task_polls_then_downloads(task_waiter):
+    # Given
+    s3 = FakeS3Client()
+    polly = FakePollyTaskClient(s3, polls_until_done=3)
+    buffer = BytesIO()
+
+    # When
+    total = stream_speech_task(
+        "<speak>Hello</speak>", buffer.write, SpeechSynthConfig(voice="Amy"), polly_client=polly, s3_client=s3
+    )
+
+    # Then
+    assert buffer.getvalue() == b"Amy audio"
+    assert total == 9
+    assert polly.tasks["task-0"]["polls"] == 3
+    assert polly.tasks["task-0"]["kwargs"]["OutputS3BucketName"] == "bucket"
+    assert s3.objects == {}  # Deleted once downloaded
+
+
+def test_stream_speech_task_raises_for_failed_tasks(task_waiter):
+    polly = FakePollyTaskClient(FakeS3Client(), fail=True)
+
+    with pytest.raises(RuntimeError, match="bad SSML"):
+        stream_speech_task("<speak>Hello</speak>", BytesIO().write, polly_client=polly, s3_client=FakeS3Client())
+
+
+def test_synthesis_tasks_share_one_poller(tmp_path, task_waiter):
+    # Given
+    s3 = FakeS3Client()
+    polly = FakePollyTaskClient(s3, polls_until_done=2)
+    jobs = [(SpeechSynthConfig(voice=voice), tmp_path / f"{voice}.mp3") for voice in ["Amy", "Ruth", "Matthew"] * 20]
+
+    # When
+    with ThreadPoolExecutor(max_workers=60) as pool:
+        list(
+            pool.map(
+                lambda job: synthesize_speech(
+                    "<speak>Hi</speak>", job[0], output_file=job[1], polly_client=polly, s3_client=s3
+                ),
+                jobs,
+            )
+        )
+
+    # Then
+    assert len(polly.tasks) == 60
+    assert (tmp_path / "Ruth.mp3").read_bytes() == b"Ruth audio"
+    assert sum(task["polls"] for task in polly.tasks.values()) == 120
+    assert len(polly.poll_threads) < 3  # One poller, restarted if it ever ran out of tasks
+    assert task_waiter.pending == {}
+
+
+def test_notify_polls_a_task_immediately():
+    # Given
+    waiter = SynthesisTaskWaiter(SynthesisTaskConfig(output_bucket="bucket", poll_interval=30))
+    s3 = FakeS3Client()
+    polly = FakePollyTaskClient(s3, polls_until_done=1)
+    threading.Timer(0.05, waiter.notify, args=["task-0"]).start()
+
+    # When
+    start = time.monotonic()
+    stream_speech_task("<speak>Hi</speak>", BytesIO().write, polly_client=polly, s3_client=s3, waiter=waiter)
+
+    # Then
+    assert time.monotonic() - start < 5
+
+
+def test_stream_speech_task_needs_configuring():
+    with pytest.raises(ValueError):
+        stream_speech_task("<speak>Hi</speak>", BytesIO().write, polly_client=object(), s3_client=object())
+
+
+def test_task_synthesis_needs_a_bucket():
+    with pytest.raises(ValueError, match="task-bucket"):
+        configure_services({"synthesis": "task"}, max_pool_connections=1)
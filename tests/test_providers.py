@@ -0,0 +1,105 @@
+# Standard Library
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.clients import clear_aws_clients
+from very_demure.pipeline import Clients, generate_script
+from very_demure.providers import (
+    LLM_PROVIDERS,
+    LLMProvider,
+    create_client,
+    get_llm_provider,
+    register_llm_provider,
+)
+from very_demure.ratelimit import DEFAULT_RATE_LIMITS, reset_rate_limits
+from very_demure.schema import LLMProviderConfig, SpeechSynthConfig
+
+HEAVY_MODULES = ["boto3", "botocore", "openai", "httpx", "mypy_boto3_bedrock_runtime", "asyncio"]
+
+
+def test_cli_import_does_not_import_provider_sdks():
+    # Given
+    code = f"import sys, very_demure.__main__; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+
+    # When
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    # Then
+    assert result.stdout.strip() == "[]"
+
+
+def test_clients_construct_each_client_once_on_first_use():
+    # Given
+    created = []
+    lock = threading.Lock()
+
+    def factory(name):
+        with lock:
+            created.append(name)
+        return object()
+
+    clients = Clients(polly="explicit", factory=factory)
+
+    # When
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        bedrock_clients = set(pool.map(lambda _: clients.bedrock_runtime, range(32)))
+
+    # Then
+    assert len(bedrock_clients) == 1
+    assert clients.polly == "explicit"
+    assert created == ["bedrock_runtime"]
+
+
+def test_clients_without_factory_are_none():
+    assert Clients().openai is None
+
+
+def test_unknown_provider():
+    with pytest.raises(ValueError):
+        get_llm_provider("carrier-pigeon")
+
+
+def test_generate_script_uses_registered_provider(monkeypatch):
+    # Given
+    monkeypatch.setitem(LLM_PROVIDERS, "echo", None)
+    register_llm_provider(
+        "echo",
+        LLMProvider(
+            generate=lambda llm_config, ss_conf, clients, **_: f"{llm_config.model_id} {ss_conf.flavour}",
+            stream=lambda llm_config, ss_conf, clients: iter([]),
+        ),
+    )
+
+    # When
+    script = generate_script(
+        LLMProviderConfig(provider="echo", model_id="parrot"), SpeechSynthConfig(flavour="morning"), Clients()
+    )
+
+    # Then
+    assert script == "parrot morning"
+
+
+def test_sdks_leave_retries_to_the_rate_limiter(monkeypatch):
+    # Given
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    clear_aws_clients()
+
+    # When
+    reset_rate_limits({})
+    unlimited = create_client("polly"), create_client("openai")
+    reset_rate_limits(DEFAULT_RATE_LIMITS)
+    limited = create_client("polly"), create_client("openai")
+
+    # Then
+    assert unlimited[0].meta.config.retries["total_max_attempts"] == 3
+    assert unlimited[1].max_retries == 2
+    assert limited[0].meta.config.retries["total_max_attempts"] == 1
+    assert limited[1].max_retries == 0
+    assert create_client("s3").meta.config.retries["total_max_attempts"] == 3
+    clear_aws_clients()
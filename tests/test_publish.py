@@ -0,0 +1,140 @@
+# Standard Library
+import fnmatch
+import hashlib
+import json
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.publish import (
+    ENTRY_POINT_CACHE_CONTROL,
+    ENTRY_POINT_PATTERNS,
+    IMMUTABLE_CACHE_CONTROL,
+    fingerprint,
+    fingerprinted,
+    is_entry_point,
+    upload_changed,
+)
+
+
+class FakePaginator:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def paginate(self, Bucket, Prefix):
+        yield {"Contents": [{"Key": key, "ETag": f'"{etag}"'} for key, (etag, _) in self.objects.items()]}
+
+
+class FakeS3Client:
+    """Keeps put objects, with their MD5 as the ETag like a single part upload."""
+
+    def __init__(self):
+        self.objects = {}
+        self.puts = []
+
+    def get_paginator(self, name):
+        return FakePaginator(self.objects)
+
+    def put_object(self, Bucket, Key, Body, CacheControl, ContentType):
+        self.puts.append((Key, CacheControl, ContentType))
+        self.objects[Key] = (hashlib.md5(Body).hexdigest(), Body)
+
+
+@pytest.fixture
+def site(tmp_path):
+    source = tmp_path / "dist"
+    (source / "assets" / "session.hls" / "mp3").mkdir(parents=True)
+    (source / "assets" / "session.mp3").write_bytes(b"audio")
+    (source / "assets" / "session.hls" / "index.m3u8").write_text("mp3/playlist.m3u8\n")
+    (source / "assets" / "session.hls" / "mp3" / "playlist.m3u8").write_text("segment-00000.mp3\n")
+    (source / "index.html").write_text('<audio src="assets/session.mp3"></audio><a href="assets/session.mp3.txt">')
+    return source
+
+
+def test_fingerprinted_names():
+    assert fingerprinted("assets/session.mp3", "abc") == "assets/session.abc.mp3"
+    assert fingerprinted("session.hls", "abc") == "session.abc.hls"
+    assert fingerprinted("LICENSE", "abc") == "LICENSE.abc"
+
+
+def test_entry_point_patterns_match_the_entry_points(site, tmp_path):
+    # Given
+    fingerprint(site, tmp_path / "publish")
+
+    # When
+    keys = [
+        file.relative_to(tmp_path / "publish").as_posix()
+        for file in (tmp_path / "publish").rglob("*")
+        if file.is_file()
+    ]
+
+    # Then
+    for key in keys:
+        matched = any(fnmatch.fnmatch(key.rsplit("/", 1)[-1], pattern) for pattern in ENTRY_POINT_PATTERNS)
+        assert matched == is_entry_point(key), key
+
+
+def test_fingerprint_writes_a_manifest_and_rewrites_entry_points(site, tmp_path):
+    # Given
+    destination = tmp_path / "publish"
+
+    # When
+    manifest = fingerprint(site, destination)
+
+    # Then
+    hashed_mp3 = manifest["assets/session.mp3"]
+    assert hashed_mp3.startswith("assets/session.") and (destination / hashed_mp3).read_bytes() == b"audio"
+    hashed_hls = manifest["assets/session.hls/index.m3u8"]
+    assert (destination / hashed_hls).parent.joinpath("mp3", "playlist.m3u8").exists()
+    assert json.loads((destination / "manifest.json").read_text()) == manifest
+    html = (destination / "index.html").read_text()
+    assert f'src="{hashed_mp3}"' in html
+    assert 'href="assets/session.mp3.txt"' in html
+
+
+def test_fingerprints_only_change_with_content(site, tmp_path):
+    # Given
+    first = fingerprint(site, tmp_path / "publish")
+
+    # When
+    (site / "assets" / "session.hls" / "mp3" / "playlist.m3u8").write_text("segment-00001.mp3\n")
+    second = fingerprint(site, tmp_path / "publish")
+
+    # Then
+    assert second["assets/session.mp3"] == first["assets/session.mp3"]
+    assert second["assets/session.hls/index.m3u8"] != first["assets/session.hls/index.m3u8"]
+
+
+def test_fingerprint_refuses_to_replace_other_directories(site, tmp_path):
+    (tmp_path / "important").mkdir()
+    (tmp_path / "important" / "notes.txt").write_text("keep me")
+
+    with pytest.raises(ValueError):
+        fingerprint(site, tmp_path / "important")
+    with pytest.raises(ValueError):
+        fingerprint(site, site / "publish")
+
+
+def test_only_changed_objects_are_uploaded(site, tmp_path):
+    # Given
+    publish_dir = tmp_path / "publish"
+    s3_client = FakeS3Client()
+    fingerprint(site, publish_dir)
+    first = upload_changed(publish_dir, "bucket", s3_client, prefix="site")
+
+    # When
+    (site / "assets" / "session.mp3").write_bytes(b"new audio")
+    fingerprint(site, publish_dir)
+    s3_client.puts.clear()
+    second = upload_changed(publish_dir, "bucket", s3_client, prefix="site")
+
+    # Then
+    assert first.uploaded == 5
+    assert (second.uploaded, second.unchanged) == (3, 2)  # The new MP3 and the entry points referencing it
+    keys = [key for key, _, _ in s3_client.puts]
+    assert keys[-2:] == ["site/index.html", "site/manifest.json"]  # After the assets they reference
+    cache_controls = {key: cache_control for key, cache_control, _ in s3_client.puts}
+    assert cache_controls["site/index.html"] == ENTRY_POINT_CACHE_CONTROL
+    assert cache_controls[keys[0]] == IMMUTABLE_CACHE_CONTROL
+    assert ("site/assets/session.mp3" not in s3_client.objects) and keys[0].endswith(".mp3")
@@ -0,0 +1,202 @@
+# Standard Library
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure import ratelimit
+from very_demure.ratelimit import (
+    AdaptiveTokenBucket,
+    BackoffPolicy,
+    RateLimit,
+    alimited_call,
+    configure_rate_limits,
+    is_throttle,
+    is_transient,
+    limited_call,
+    load_rate_limits,
+    rate_limiter,
+    retry_after,
+)
+
+
+class ClientError(Exception):
+    """Shaped like botocore's ClientError."""
+
+    def __init__(self, code, headers=None):
+        super().__init__(code)
+        self.response = {
+            "Error": {"Code": code},
+            "ResponseMetadata": {"HTTPStatusCode": 400, "HTTPHeaders": headers or {}},
+        }
+
+
+class Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class RateLimitError(Exception):
+    """Shaped like openai's APIStatusError."""
+
+    status_code = 429
+
+    def __init__(self, headers=None):
+        super().__init__("429")
+        self.response = Response(headers or {})
+
+
+class Flaky:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(ratelimit.time, "sleep", delays.append)
+    return delays
+
+
+def test_bucket_paces_after_burst():
+    bucket = AdaptiveTokenBucket(rate=10, capacity=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_bucket_decreases_multiplicatively_and_recovers_additively():
+    # Given
+    bucket = AdaptiveTokenBucket(rate=10, capacity=10)
+
+    # When
+    bucket.on_throttle()
+    bucket.on_throttle()  # The same throttling episode
+
+    # Then
+    assert bucket.rate == 5
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+    for _ in range(10):
+        bucket.on_success()
+    assert bucket.rate == 10
+
+
+def test_sustained_throughput_sits_at_the_limit():
+    # Given
+    configure_rate_limits({"fake": RateLimit(requests_per_second=100, burst=1)})
+
+    # When
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: limited_call("fake", None, lambda: "ok"), range(31)))
+    elapsed = time.monotonic() - start
+
+    # Then
+    assert results == ["ok"] * 31
+    assert 0.28 <= elapsed < 1.0
+
+
+def test_throttles_are_retried_with_backoff_honouring_retry_after(sleeps):
+    configure_rate_limits({"fake": RateLimit(requests_per_second=1000)})
+    flaky = Flaky([ClientError("ThrottlingException"), RateLimitError({"Retry-After": "3"})])
+
+    assert limited_call("fake", "model", flaky, BackoffPolicy(base=0.1, cap=1)) == "ok"
+    assert flaky.calls == 3
+    assert max(sleeps) == 3  # Alongside sub second waits for the backoff and the slowed down bucket
+    assert sum(sleeps) < 3.2
+    assert rate_limiter("fake", "model").requests.rate < 1000
+
+
+def test_other_errors_and_exhausted_retries_raise(sleeps):
+    with pytest.raises(ClientError, match="ValidationException"):
+        limited_call("fake", None, Flaky([ClientError("ValidationException")]))
+    assert sleeps == []
+
+    flaky = Flaky([RateLimitError()] * 3)
+    with pytest.raises(RateLimitError):
+        limited_call("fake", None, flaky, BackoffPolicy(max_attempts=3))
+    assert flaky.calls == 3
+
+
+def test_transient_errors_are_retried_without_slowing_down(sleeps):
+    # Given
+    class EndpointConnectionError(Exception):
+        pass
+
+    configure_rate_limits({"fake": RateLimit(requests_per_second=1000)})
+    flaky = Flaky([ClientError("ServiceUnavailableException"), EndpointConnectionError()])
+
+    # When
+    result = limited_call("fake", None, flaky, BackoffPolicy(base=0.1, cap=1))
+
+    # Then
+    assert result == "ok" and flaky.calls == 3
+    assert rate_limiter("fake").requests.rate == 1000
+    assert is_transient(RateLimitError()) is False
+
+
+def test_async_calls_share_the_limiter():
+    configure_rate_limits({"fake": RateLimit(requests_per_second=100, burst=1)})
+    flaky = Flaky([RateLimitError({"retry-after-ms": "10"})])
+
+    async def _call():
+        return flaky()
+
+    async def _main():
+        return await asyncio.gather(*(alimited_call("fake", None, _call) for _ in range(5)))
+
+    assert asyncio.run(_main()) == ["ok"] * 5
+    assert flaky.calls == 6
+
+
+def test_recorded_tokens_delay_later_requests():
+    configure_rate_limits({"fake": RateLimit(requests_per_second=1000, tokens_per_minute=600)})
+    limiter = rate_limiter("fake")
+
+    limiter.record_tokens(610)
+
+    assert limiter.tokens.reserve(0) == pytest.approx(1.0, abs=0.05)
+
+
+def test_is_throttle_and_retry_after():
+    assert is_throttle(ClientError("TooManyRequestsException"))
+    assert is_throttle(RateLimitError())
+    assert not is_throttle(ValueError())
+    assert retry_after(RateLimitError({"retry-after-ms": "250"})) == 0.25
+    assert retry_after(ClientError("Throttling", {"retry-after": "2"})) == 2
+    assert 55 < retry_after(RateLimitError({"Retry-After": formatdate(time.time() + 60, usegmt=True)})) <= 60
+    assert retry_after(RateLimitError({"Retry-After": "soon"})) is None
+    assert retry_after(ValueError()) is None
+
+
+def test_load_rate_limits(tmp_path):
+    limits_file = tmp_path / "limits.json"
+    limits_file.write_text(json.dumps({"polly:neural": {"requests_per_second": 16, "burst": 20}}))
+
+    assert load_rate_limits(limits_file) == {"polly:neural": RateLimit(requests_per_second=16, burst=20)}
+
+    limits_file.write_text(json.dumps({"polly": {"tps": 16}}))
+    with pytest.raises(ValueError):
+        load_rate_limits(limits_file)
+
+
+def test_rate_limiter_prefers_the_most_specific_limit():
+    configure_rate_limits({"fake": RateLimit(requests_per_second=1), "fake:big": RateLimit(requests_per_second=50)})
+
+    assert rate_limiter("fake", "big").limit.requests_per_second == 50
+    assert rate_limiter("fake", "small").limit.requests_per_second == 1
+    assert rate_limiter("unlimited") is None
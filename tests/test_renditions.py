@@ -0,0 +1,72 @@
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.mp3 import duration_seconds, id3v2_length, iter_frames, silence
+from very_demure.renditions import (
+    MPEG_TIMESCALE,
+    TIMESTAMP_OWNER,
+    package_session,
+    packed_audio_timestamp,
+    segment_mp3,
+)
+
+FRAME_SECONDS = 576 / 24000
+
+
+def test_segments_are_cut_on_frame_boundaries():
+    # Given
+    audio = silence(15_000, 24000)
+
+    # When
+    segments = segment_mp3(audio, segment_seconds=6)
+
+    # Then
+    assert [round(segment.start_seconds) for segment in segments] == [0, 6, 12]
+    assert all(6 <= segment.duration_seconds < 6 + FRAME_SECONDS for segment in segments[:-1])
+    assert sum(segment.duration_seconds for segment in segments) == pytest.approx(duration_seconds(audio))
+    rejoined = b"".join(bytes(frame) for segment in segments for _, frame in iter_frames(segment.audio))
+    assert rejoined == b"".join(bytes(frame) for _, frame in iter_frames(audio))
+
+
+def test_segments_start_with_their_timestamp():
+    tag = packed_audio_timestamp(6.0)
+
+    assert tag.startswith(b"ID3\x04")
+    assert id3v2_length(tag) == len(tag)
+    assert tag[-8:] == (6 * MPEG_TIMESCALE).to_bytes(8, "big")
+    assert TIMESTAMP_OWNER + b"\x00" in tag
+
+
+def test_package_session_without_ffmpeg(tmp_path, monkeypatch):
+    # Given
+    monkeypatch.setenv("PATH", "")
+    mp3_file = tmp_path / "session.mp3"
+    mp3_file.write_bytes(silence(13_000, 24000))
+
+    # When
+    packaged = package_session(mp3_file, tmp_path)
+
+    # Then
+    hls_dir = tmp_path / "session.hls"
+    assert packaged.master_playlist == hls_dir / "index.m3u8"
+    assert packaged.opus_file is None
+    assert [rendition.name for rendition in packaged.renditions] == ["mp3"]
+    master = packaged.master_playlist.read_text()
+    assert 'CODECS="mp4a.40.34"' in master
+    assert master.endswith("mp3/playlist.m3u8\n")
+
+    playlist = (hls_dir / "mp3" / "playlist.m3u8").read_text().splitlines()
+    assert "#EXT-X-TARGETDURATION:6" in playlist
+    assert playlist[-1] == "#EXT-X-ENDLIST"
+    segment_names = [line for line in playlist if line.startswith("segment-")]
+    assert segment_names == ["segment-00000.mp3", "segment-00001.mp3", "segment-00002.mp3"]
+    assert all((hls_dir / "mp3" / name).exists() for name in segment_names)
+
+
+def test_package_session_rejects_files_without_frames(tmp_path):
+    mp3_file = tmp_path / "session.mp3"
+    mp3_file.write_bytes(b"not audio")
+
+    with pytest.raises(ValueError):
+        package_session(mp3_file, tmp_path)
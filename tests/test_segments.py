@@ -0,0 +1,110 @@
+# Standard Library
+import threading
+from dataclasses import replace
+from io import BytesIO
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.mp3 import duration_seconds, iter_frames
+from very_demure.polly import (
+    process_text_to_ssml,
+    stream_speech_segments,
+    synthesize_speech,
+)
+from very_demure.schema import SpeechSynthConfig
+from very_demure.segments import (
+    SegmentStore,
+    configure_segment_store,
+    segment_key,
+    split_sentences,
+)
+
+CONFIG = SpeechSynthConfig()
+FRAME_SECONDS = 576 / 24000
+
+
+class FakeMp3PollyClient:
+    """Returns one 24 byte MPEG2 Layer III frame per request, filled with the request number."""
+
+    def __init__(self):
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def synthesize_speech(self, **kwargs):
+        with self.lock:
+            self.requests.append(kwargs["Text"])
+            fill = len(self.requests)
+        return {"AudioStream": BytesIO(bytes([0xFF, 0xF3, 0x14, 0xC0]) + bytes([fill]) * 20)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    yield configure_segment_store(SegmentStore(tmp_path / "segments", sentence_gap_ms=0))
+    configure_segment_store(None)
+
+
+def render(script: str, store: SegmentStore, polly_client: FakeMp3PollyClient, config=CONFIG) -> bytes:
+    audio = BytesIO()
+    stream_speech_segments(
+        process_text_to_ssml(script, config), audio.write, config, polly_client=polly_client, store=store
+    )
+    return audio.getvalue()
+
+
+def test_split_sentences_normalizes_spacing_and_composition():
+    assert split_sentences("Breathe  in.\nHold   it! Café time?") == ["Breathe in.", "Hold it!", "Café time?"]
+
+
+def test_segment_keys_depend_on_the_voice_not_the_spacing():
+    prosody = '<speak><prosody rate="slow">'
+
+    assert segment_key("Breathe in.", prosody, CONFIG) == segment_key(" Breathe \n in. ", prosody, CONFIG)
+    assert segment_key("Breathe in.", prosody, CONFIG) != segment_key(
+        "Breathe in.", prosody, replace(CONFIG, voice="Amy")
+    )
+    assert segment_key("Breathe in.", prosody, CONFIG) != segment_key("Breathe in.", "<speak>", CONFIG)
+
+
+def test_only_new_sentences_are_synthesized(store):
+    # Given
+    polly_client = FakeMp3PollyClient()
+    first = render("Breathe in. Breathe out.\nRelax your jaw.", store, polly_client)
+
+    # When
+    second = render("Breathe in. Breathe out.\nSoften your shoulders. Breathe in.", store, polly_client)
+
+    # Then
+    assert len(polly_client.requests) == 4
+    assert "Soften your shoulders." in polly_client.requests[-1]
+    assert [frame[4] for _, frame in iter_frames(first)] == [1, 2, 3]
+    assert [frame[4] for _, frame in iter_frames(second)] == [1, 2, 4, 1]
+    assert (store.stats.sentences, store.stats.synthesized) == (7, 4)
+    assert store.stats.hit_rate == pytest.approx(3 / 7)
+    assert store.stats.billed_characters_saved > 0
+
+
+def test_pauses_and_sentence_gaps_are_local_silence(store):
+    # Given
+    polly_client = FakeMp3PollyClient()
+    store.sentence_gap_ms = 300
+
+    # When
+    audio = render("Hello. Welcome.\n[PAUSE 20s]\nBye.", store, polly_client)
+
+    # Then
+    assert all("<break" not in request for request in polly_client.requests)
+    assert len(polly_client.requests) == 3
+    assert duration_seconds(audio) == pytest.approx(20.3 + 3 * FRAME_SECONDS, abs=0.05)
+
+
+def test_synthesize_speech_uses_the_configured_store(store, tmp_path):
+    polly_client = FakeMp3PollyClient()
+    ssml = process_text_to_ssml("Hello. Bye.")
+
+    synthesize_speech(ssml, output_file=tmp_path / "first.mp3", polly_client=polly_client)
+    synthesize_speech(ssml, output_file=tmp_path / "second.mp3", polly_client=polly_client)
+
+    assert len(polly_client.requests) == 2
+    assert (tmp_path / "first.mp3").read_bytes() == (tmp_path / "second.mp3").read_bytes()
@@ -0,0 +1,143 @@
+# Standard Library
+import http.client
+import json
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.pipeline import Clients
+from very_demure.server import RenderServer, RenderService
+
+
+class BlockingBedrockRuntimeClient:
+    """Holds every LLM call until `release` is set, so requests pile up while a script is in flight."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = client.calls
+        self.release = threading.Event()
+
+    def invoke_model(self, **kwargs):
+        self.release.wait(timeout=5)
+        return self.client.invoke_model(**kwargs)
+
+
+@pytest.fixture
+def render_server(tmp_path, fake_polly_client, fake_bedrock_runtime_client):
+    bedrock = BlockingBedrockRuntimeClient(fake_bedrock_runtime_client)
+    service = RenderService(
+        Clients(polly=fake_polly_client, bedrock_runtime=bedrock), output_location=tmp_path, max_workers=4
+    )
+    server = RenderServer(("127.0.0.1", 0), service)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, bedrock
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+
+def call(server, path, payload=None):
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    data = json.dumps(payload).encode() if payload is not None else None
+    try:
+        with urlopen(Request(url, data=data, method="POST" if data else "GET"), timeout=5) as response:
+            body = response.read()
+            return response.status, response.headers["Content-Type"], body
+    except HTTPError as e:
+        return e.code, e.headers["Content-Type"], e.read()
+
+
+def post_with_length(server, content_length, body=b"{}"):
+    """POST /jobs with a Content-Length header that may not match, or even be, a length."""
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    try:
+        connection.putrequest("POST", "/jobs")
+        connection.putheader("Content-Length", content_length)
+        connection.endheaders(body)
+        return connection.getresponse().status
+    finally:
+        connection.close()
+
+
+def wait_for(server, job_id):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        job = json.loads(call(server, f"/jobs/{job_id}")[2])
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_identical_requests_are_coalesced(render_server):
+    # Given
+    server, bedrock = render_server
+
+    # When
+    first = call(server, "/jobs", {"voice": "Amy"})
+    second = call(server, "/jobs", {"voice": "Amy"})
+    bedrock.release.set()
+
+    # Then
+    assert first[0] == 202
+    assert second[0] == 200
+    assert json.loads(first[2])["id"] == json.loads(second[2])["id"]
+    assert json.loads(second[2])["coalesced"] is True
+    job = wait_for(server, json.loads(first[2])["id"])
+    assert job["status"] == "succeeded"
+    assert len(bedrock.calls) == 1
+
+    status, content_type, body = call(server, job["artifacts"]["audio"])
+    assert (status, content_type, body) == (200, "audio/mpeg", b"Amy")
+    assert call(server, job["artifacts"]["transcript"])[1] == "application/ssml+xml"
+
+
+def test_voices_share_one_script_generation(render_server, fake_polly_client):
+    # Given
+    server, bedrock = render_server
+
+    # When
+    job_ids = [json.loads(call(server, "/jobs", {"voice": voice})[2])["id"] for voice in ("Amy", "Ruth")]
+    bedrock.release.set()
+
+    # Then
+    assert len(set(job_ids)) == 2
+    assert [wait_for(server, job_id)["status"] for job_id in job_ids] == ["succeeded", "succeeded"]
+    assert len(bedrock.calls) == 1
+    assert len(fake_polly_client.calls) == 2
+
+
+def test_finished_jobs_are_not_coalesced(render_server):
+    server, bedrock = render_server
+    bedrock.release.set()
+
+    first = json.loads(call(server, "/jobs", {"voice": "Amy"})[2])
+    wait_for(server, first["id"])
+    second = json.loads(call(server, "/jobs", {"voice": "Amy"})[2])
+
+    assert second["id"] != first["id"]
+    assert second["coalesced"] is False
+
+
+def test_invalid_requests_are_rejected(render_server):
+    server, _ = render_server
+
+    assert call(server, "/jobs", {"voice": "Nobody"})[0] == 400
+    assert call(server, "/jobs", {"provider": "nope"})[0] == 400
+    assert call(server, "/jobs", ["not", "an", "object"])[0] == 400
+    assert call(server, "/jobs", {"voice_sped": "x-slow"})[0] == 400
+    assert call(server, "/jobs", {"speed": "x-slow", "voice_speed": "fast"})[0] == 400
+    assert call(server, "/jobs", {"speed": ["x-slow"]})[0] == 400
+    assert call(server, "/jobs", {"flavour": ["sleepy"]})[0] == 400
+    assert call(server, "/jobs", {"model": {"a": 1}})[0] == 400
+    assert post_with_length(server, "many") == 400
+    assert post_with_length(server, "-1") == 400
+    assert call(server, "/jobs/unknown")[0] == 404
+    assert call(server, "/artifacts/../secret.mp3")[0] == 404
+    assert call(server, "/healthz")[0] == 200
@@ -0,0 +1,61 @@
+# Standard Library
+from pathlib import Path
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.ssml import compile_ssml, prosody_open_tag
+
+TEST_SCRIPTS_PATH = Path("tests/test_polly_scripts")
+
+test_scenarios = {
+    f.name: (f.read_text(), (f.parent / f.name.replace("-test.txt", "-expectation.ssml.xml")).read_text())
+    for f in TEST_SCRIPTS_PATH.glob("*-test.txt")
+}
+
+
+def chunked(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 5, 11, 100000])
+@pytest.mark.parametrize("test_case,expectation", test_scenarios.values(), ids=test_scenarios.keys())
+def test_compile_ssml_is_independent_of_chunking(test_case, expectation, size):
+    # Given
+    chunks = chunked(test_case, size)
+
+    # When
+    result = "".join(compile_ssml(chunks, rate="slow", pitch="medium", volume="medium"))
+
+    # Then
+    assert result == expectation
+
+
+def test_compile_ssml_escapes_and_omits_default_prosody():
+    result = "".join(compile_ssml(["Fish & chips <3 [PAU", "SE 10s] [PAUSED] [pause 2", "5s]"], rate="x-slow"))
+
+    assert result == (
+        '<speak><prosody rate="x-slow">Fish &amp; chips &lt;3 <break time="10s" /> [PAUSED] '
+        '<break time="10s" /><break time="10s" /></prosody></speak>'
+    )
+
+
+def test_compile_ssml_silence_mode():
+    result = "".join(compile_ssml(["Hello.[PAUSE 1m]"], pause_mode="silence"))
+
+    assert result == '<speak><prosody rate="medium">Hello.<break time="60s" /></prosody></speak>'
+
+
+def test_compile_ssml_holds_back_unterminated_marker():
+    assert "".join(compile_ssml(["End [PAUSE 3"])) == '<speak><prosody rate="medium">End [PAUSE 3</prosody></speak>'
+
+
+@pytest.mark.parametrize("kwargs", [{"rate": "glacial"}, {"pitch": "loud"}, {"volume": "high"}])
+def test_prosody_open_tag_invalid(kwargs):
+    with pytest.raises(ValueError):
+        prosody_open_tag(**kwargs)
+
+
+def test_prosody_open_tag_percentages():
+    assert prosody_open_tag("80%", "+5%") == '<prosody rate="80%" pitch="+5%">'
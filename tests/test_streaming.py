@@ -0,0 +1,146 @@
+# Standard Library
+import json
+import threading
+from io import BytesIO
+from types import SimpleNamespace
+
+# Third Party
+import pytest
+
+# Our Libraries
+from very_demure.fakes import FakePollyClient
+from very_demure.mp3 import duration_seconds, iter_frames
+from very_demure.pipeline import Clients
+from very_demure.schema import LLMProviderConfig, SpeechSynthConfig
+from very_demure.streaming import (
+    iter_script_segments,
+    stream_session,
+    synthesize_stream,
+)
+
+FRAME = bytes([0xFF, 0xF3, 0x14, 0xC0]) + bytes(20)
+
+
+def chunked(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+class FakeMp3PollyClient:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.texts = []
+        self.lock = threading.Lock()
+
+    def synthesize_speech(self, **kwargs):
+        with self.lock:
+            self.texts.append(kwargs["Text"])
+        if self.fail_on and self.fail_on in kwargs["Text"]:
+            raise RuntimeError("boom")
+        return {"AudioStream": BytesIO(FRAME)}
+
+
+class FakeStreamingBedrockRuntimeClient:
+    def __init__(self, output_text):
+        self.output_text = output_text
+
+    def invoke_model_with_response_stream(self, **kwargs):
+        events = [
+            {"chunk": {"bytes": json.dumps({"outputText": part}).encode()}} for part in chunked(self.output_text, 3)
+        ]
+        return {"body": iter(events)}
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_iter_script_segments(size):
+    response = "Sure! [SCRIPT]Welcome. Breathe in!\n[PAUSE 20s]\nRelax now? Yes[SCRIPT] Hope that helps."
+
+    segments = list(iter_script_segments(chunked(response, size)))
+
+    assert segments == ["Welcome.", "Breathe in!", "[PAUSE 20s]", "Relax now?", "Yes"]
+
+
+def test_iter_script_segments_without_end_marker():
+    assert list(iter_script_segments(["[SCRIPT]One. Two"])) == ["One.", "Two"]
+
+
+def test_iter_script_segments_requires_marker():
+    with pytest.raises(ValueError):
+        list(iter_script_segments(["no markers here"]))
+
+
+def test_synthesize_stream_orders_audio_and_splices_silence():
+    # Given
+    polly_client = FakeMp3PollyClient()
+    received = bytearray()
+
+    # When
+    synthesize_stream(["One.", "[PAUSE 1m]", "Two."], received.extend, polly_client=polly_client)
+
+    # Then
+    assert len(polly_client.texts) == 2
+    assert "[PAUSE" not in "".join(polly_client.texts)
+    assert abs(duration_seconds(bytes(received)) - (60 + 2 * 576 / 24000)) < 0.03
+    assert bytes(received[:24]) == FRAME
+
+
+def test_synthesize_stream_splices_silence_at_the_bitrate_of_the_speech():
+    # Given
+    audio = bytearray()
+
+    # When
+    synthesize_stream(["[PAUSE 2s]", "One.", "[PAUSE 3s]", "Two."], audio.extend, polly_client=FakePollyClient())
+
+    # Then
+    assert {header.bitrate_kbps for header, _ in iter_frames(bytes(audio))} == {48}
+    assert duration_seconds(bytes(audio)) > 5
+
+
+def test_synthesize_stream_raises_segment_errors():
+    with pytest.raises(RuntimeError):
+        synthesize_stream(["One.", "Two.", "Three."], bytearray().extend, polly_client=FakeMp3PollyClient("Two"))
+
+
+def test_synthesize_stream_raises_sink_errors_without_blocking():
+    # Given
+    def closed_pipe(frame):
+        raise BrokenPipeError()
+
+    # When / Then: more segments than the pending queue holds, so a dead writer would block the producer
+    with pytest.raises(BrokenPipeError):
+        synthesize_stream(
+            [f"Sentence {i}." for i in range(20)], closed_pipe, polly_client=FakeMp3PollyClient(), max_workers=1
+        )
+
+
+def test_stream_session_bedrock():
+    # Given
+    clients = Clients(
+        polly=FakeMp3PollyClient(),
+        bedrock_runtime=FakeStreamingBedrockRuntimeClient("[SCRIPT]Hello there. [PAUSE 10s] Goodbye.[SCRIPT]"),
+    )
+    received = bytearray()
+
+    # When
+    stream_session(
+        LLMProviderConfig(provider="bedrock", model_id="amazon.titan-text-premier-v1:0"),
+        SpeechSynthConfig(),
+        clients,
+        received.extend,
+    )
+
+    # Then
+    assert len(clients.polly.texts) == 2
+    assert abs(duration_seconds(bytes(received)) - (10 + 2 * 576 / 24000)) < 0.03
+
+
+def test_stream_session_openai():
+    deltas = chunked("[SCRIPT]Hello there.[SCRIPT]", 4)
+    chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))]) for delta in deltas]
+    openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **_: iter(chunks))))
+    clients = Clients(polly=FakeMp3PollyClient(), openai=openai_client)
+
+    total_bytes = stream_session(
+        LLMProviderConfig(provider="openai", model_id="gpt-4o"), SpeechSynthConfig(), clients, bytearray().extend
+    )
+
+    assert total_bytes == len(FRAME)
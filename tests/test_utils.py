@@ -0,0 +1,15 @@
+# Our Libraries
+from very_demure.utils import CLI_ARGS_CONFIG, cli_handle_args, parse_voices
+
+
+def test_parse_voices():
+    assert parse_voices("Amy, Ruth", default=["Matthew"]) == ["Amy", "Ruth"]
+    assert parse_voices(None, default=["Matthew"]) == ["Matthew"]
+
+
+def test_cli_handle_args_voices_and_concurrency():
+    cli_args = cli_handle_args(CLI_ARGS_CONFIG, ["-v", "Amy", "--voices", "Amy,Ruth", "--concurrency", "2"])
+
+    assert cli_args["voice"] == "Amy"
+    assert cli_args["voices"] == "Amy,Ruth"
+    assert cli_args["concurrency"] == "2"